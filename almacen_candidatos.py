@@ -0,0 +1,209 @@
+"""
+Almacén de candidatos en memoria compartido por todas las sesiones del proceso
+Una sola copia de la base, su índice de búsqueda y su matriz de estadísticas, protegida
+por un candado de lectores/escritor; las sesiones solo guardan su estado de vista
+"""
+import sys
+import threading
+from contextlib import contextmanager
+import numpy as np
+from asignacion_candidatos import asignar_vacantes, candidatos_necesarios
+from busqueda_candidatos import IndicePuntuaciones
+from estadisticas_candidatos import MatrizPuntuaciones
+from indice_respuestas import IndiceRespuestas, similitud
+from tabla_candidatos import TablaCandidatos
+
+class CandadoLecturaEscritura:
+    """Muchos lectores a la vez o un solo escritor; un escritor en espera frena a los lectores nuevos"""
+    def __init__(self):
+        self._condicion = threading.Condition()
+        self._lectores = 0
+        self._escribiendo = False
+        self._escritores_esperando = 0
+
+    @contextmanager
+    def lectura(self):
+        with self._condicion:
+            while self._escribiendo or self._escritores_esperando:
+                self._condicion.wait()
+            self._lectores += 1
+        try:
+            yield
+        finally:
+            with self._condicion:
+                self._lectores -= 1
+                if not self._lectores:
+                    self._condicion.notify_all()
+
+    @contextmanager
+    def escritura(self):
+        with self._condicion:
+            self._escritores_esperando += 1
+            while self._escribiendo or self._lectores:
+                self._condicion.wait()
+            self._escritores_esperando -= 1
+            self._escribiendo = True
+        try:
+            yield
+        finally:
+            with self._condicion:
+                self._escribiendo = False
+                self._condicion.notify_all()
+
+class AlmacenCandidatos:
+    """Base de candidatos de solo lectura en su mayor parte, con índices y matriz de puntuaciones
+
+    Misma interfaz de consulta que AlmacenSQLite (contar, buscar, estadisticas,
+    obtener, agregar). Los candidatos se guardan en una TablaCandidatos
+    compacta; los devueltos son diccionarios decodificados al vuelo, así que
+    modificarlos no cambia el almacén. Las filas son posiciones en la tabla.
+    "candidatos" puede ser cualquier iterable (se consume por lotes).
+    """
+    def __init__(self, base_datos):
+        self.metadatos = {clave: valor for clave, valor in base_datos.items() if clave != "candidatos"}
+        self.tabla = TablaCandidatos(base_datos.get("candidatos", ()))
+        valores = self.tabla.valores_puntuaciones()
+        self.indice = IndicePuntuaciones(puestos=self.tabla.puestos, valores=valores)
+        self.matriz = MatrizPuntuaciones(puestos=self.tabla.puestos, valores=valores)
+        self.respuestas = IndiceRespuestas.desde_tabla(self.tabla)
+        self.candado = CandadoLecturaEscritura()
+        self._registros_incluidos = set()
+
+    def contar(self):
+        """Número de candidatos"""
+        with self.candado.lectura():
+            return len(self.tabla)
+
+    def agregar(self, candidato):
+        """Agrega un candidato y actualiza índices y matriz; devuelve su fila"""
+        with self.candado.escritura():
+            fila = self.tabla.agregar(candidato)
+            self.indice.agregar(candidato)
+            self.matriz.agregar(candidato)
+            self.respuestas.agregar(candidato)
+            return fila
+
+    def sincronizar_registro(self, registro):
+        """Incorpora los candidatos del registro duradero que aún no están en el almacén
+
+        Cada registro se identifica por (segmento, posición), así que no se
+        duplica aunque el registro se compacte mientras tanto. Devuelve cuántos
+        se agregaron; sin registros nuevos no se toma el candado de escritura.
+        """
+        aplicado = self.metadatos.get("registro_aplicado") or {}
+
+        def pendientes():
+            return [
+                (clave, candidato) for clave, candidato in
+                (((id_segmento, posicion), candidato) for id_segmento, posicion, candidato in registro.registros())
+                if clave not in self._registros_incluidos
+                and not (clave[0] == aplicado.get("id") and clave[1] < aplicado.get("posicion", 0))
+            ]
+
+        if not pendientes():
+            return 0
+        with self.candado.escritura():
+            nuevos = pendientes()
+            candidatos = [candidato for _, candidato in nuevos]
+            # Un solo bloque por estructura: el índice ordenado se fusiona una vez por puesto
+            self.tabla.extender(candidatos)
+            self.indice.extender(candidatos)
+            for candidato in candidatos:
+                self.matriz.agregar(candidato)
+            self.respuestas.extender(candidatos)
+            self._registros_incluidos.update(clave for clave, _ in nuevos)
+            return len(nuevos)
+
+    def buscar(self, puesto, puntuacion_minima, limite=10, filtro=None):
+        """(total, [(candidato, puntuación), ...]) con puntuación >= mínima, de mayor a menor
+
+        `filtro` (FiltroRespuestas) restringe la búsqueda a los candidatos cuyas
+        respuestas lo cumplen; se evalúa sobre el índice de bits de toda la base.
+        """
+        with self.candado.lectura():
+            seleccion = None if filtro is None or filtro.vacio() else self.respuestas.seleccionar(filtro)
+            total = self.indice.contar(puesto, puntuacion_minima, seleccion)
+            filas, puntuaciones = self.indice.buscar(puesto, puntuacion_minima, limite, seleccion)
+            return total, list(zip(self.tabla.obtener(filas), puntuaciones.tolist()))
+
+    def asignar(self, vacantes, puntuacion_minima=0, filtro=None):
+        """[(puesto, candidato, puntuación), ...] de la asignación global a {puesto: vacantes}
+
+        Cada candidato ocupa como mucho una vacante y se maximiza la suma de
+        puntuaciones; solo entran los mejores candidatos_necesarios de cada puesto.
+        """
+        with self.candado.lectura():
+            seleccion = None if filtro is None or filtro.vacio() else self.respuestas.seleccionar(filtro)
+            necesarios = candidatos_necesarios(vacantes)
+            mejores = {puesto: self.indice.buscar(puesto, puntuacion_minima, necesarios, seleccion)
+                       for puesto in vacantes}
+            asignaciones = asignar_vacantes(mejores, vacantes)
+            candidatos = self.tabla.obtener([fila for _, fila, _ in asignaciones])
+        return [(puesto, candidato, puntuacion)
+                for (puesto, _, puntuacion), candidato in zip(asignaciones, candidatos)]
+
+    def similares(self, candidato, k=5):
+        """[(candidato, similitud %), ...] de los k candidatos con respuestas más parecidas, sin él mismo
+
+        Recorre el índice de bits de respuestas (distancia euclídea exacta
+        sobre las 55 características); se actualiza con cada inserción.
+        """
+        with self.candado.lectura():
+            filas, distancias = self.respuestas.vecinos(candidato.get("respuestas_cuestionario", {}), k + 1)
+            vecinos = self.tabla.obtener(filas)
+        return [(vecino, similitud(distancia)) for vecino, distancia in zip(vecinos, distancias.tolist())
+                if vecino.get("id") != candidato.get("id")][:k]
+
+    def estadisticas(self):
+        """Agregados por puesto (cacheados en la matriz hasta la siguiente inserción)"""
+        with self.candado.lectura():
+            return self.matriz.estadisticas()
+
+    def obtener(self, filas):
+        """Candidatos de las filas dadas, en el mismo orden"""
+        with self.candado.lectura():
+            return self.tabla.obtener(filas)
+
+def tamano_profundo(objeto):
+    """Bytes aproximados de un objeto y todo lo que referencia (contenedores, objetos, arreglos)"""
+    vistos = set()
+    pendientes = [objeto]
+    total = 0
+    while pendientes:
+        actual = pendientes.pop()
+        if id(actual) in vistos:
+            continue
+        vistos.add(id(actual))
+        total += sys.getsizeof(actual)
+        if isinstance(actual, np.ndarray):
+            # getsizeof ya incluye los datos propios; las vistas apuntan a su base
+            if actual.base is not None:
+                pendientes.append(actual.base)
+        elif isinstance(actual, dict):
+            pendientes.extend(actual.keys())
+            pendientes.extend(actual.values())
+        elif isinstance(actual, (list, tuple, set, frozenset)):
+            pendientes.extend(actual)
+        elif isinstance(actual, type):
+            continue
+        else:
+            if hasattr(actual, "__dict__"):
+                pendientes.append(vars(actual))
+            # Objetos con __slots__ (p. ej. TablaCandidatos): sus atributos no están en __dict__
+            for clase in type(actual).__mro__:
+                for nombre in getattr(clase, "__slots__", ()):
+                    if hasattr(actual, nombre):
+                        pendientes.append(getattr(actual, nombre))
+    return total
+
+def informe_memoria(estado_sesion, almacen=None):
+    """Memoria del estado de una sesión y, opcionalmente, del almacén compartido (en bytes)
+
+    El almacén compartido no se cuenta dentro de la sesión porque la sesión no
+    lo referencia: lo obtiene de la caché del proceso en cada ejecución.
+    """
+    informe = {"sesion_bytes": tamano_profundo(dict(estado_sesion))}
+    if almacen is not None:
+        informe["almacen_bytes"] = tamano_profundo(almacen)
+        informe["candidatos"] = almacen.contar()
+    return informe
@@ -0,0 +1,488 @@
+"""
+Almacén opcional de candidatos en SQLite (modo WAL)
+Guarda candidatos, respuestas y puntuaciones por puesto en tablas indexadas para que la
+búsqueda y las estadísticas se resuelvan en SQL sin cargar toda la base en memoria
+"""
+import argparse
+import json
+import math
+import os
+import sqlite3
+import threading
+import time
+import numpy as np
+from asignacion_candidatos import asignar_vacantes, candidatos_necesarios
+from formato_candidatos import leer_base_datos
+from indice_respuestas import IndiceRespuestas, similitud
+from red_neuronal_puntuacion import PUESTOS, obtener_cache_puntuaciones
+from reevaluar_puntuaciones import reevaluar_cambios
+from estadisticas_candidatos import INTERVALOS_HISTOGRAMA, NUM_TOP, PERCENTILES
+
+# Si esta variable apunta a un archivo .sqlite la aplicación usa este almacén
+RUTA_SQLITE = os.environ.get("LINKENCHAMBA_SQLITE")
+
+# El índice de respuestas en memoria se guarda junto a la base cada tantas filas nuevas
+FILAS_PARA_GUARDAR_INDICE = 10000
+
+# Claves internas de la tabla metadatos (no son metadatos de la base)
+CLAVES_INTERNAS = ("revision", "vaciado")
+
+# Campos del candidato con columna propia; el resto se guarda como JSON en "extra"
+COLUMNAS_CANDIDATO = ("id", "nombre", "email", "telefono", "direccion", "fecha_registro", "version_modelo")
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS candidatos (
+    fila INTEGER PRIMARY KEY,
+    id TEXT,
+    nombre TEXT,
+    email TEXT,
+    telefono TEXT,
+    direccion TEXT,
+    fecha_registro TEXT,
+    version_modelo TEXT,
+    extra TEXT
+);
+CREATE TABLE IF NOT EXISTS respuestas (
+    fila INTEGER PRIMARY KEY REFERENCES candidatos(fila),
+    datos TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS puntuaciones (
+    puesto TEXT NOT NULL,
+    fila INTEGER NOT NULL REFERENCES candidatos(fila),
+    puntuacion REAL NOT NULL,
+    PRIMARY KEY (puesto, fila)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS metadatos (
+    clave TEXT PRIMARY KEY,
+    valor TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_puntuaciones_puesto ON puntuaciones (puesto, puntuacion DESC, fila);
+CREATE INDEX IF NOT EXISTS idx_candidatos_fecha ON candidatos (fecha_registro);
+"""
+
+def orden_puesto(puesto):
+    """Clave de orden: los puestos de PUESTOS primero y en su orden"""
+    posiciones = list(PUESTOS)
+    return (posiciones.index(puesto), "") if puesto in posiciones else (len(posiciones), puesto)
+
+class AlmacenSQLite:
+    """Base de datos de candidatos en SQLite, segura para usar desde varios hilos
+
+    Cada hilo abre su propia conexión (WAL permite lectores concurrentes con un
+    escritor). Toda escritura incrementa la revisión guardada en `metadatos`,
+    que invalida las estadísticas cacheadas.
+    """
+    def __init__(self, ruta):
+        self.ruta = ruta
+        self._local = threading.local()
+        self._candado = threading.Lock()
+        self._estadisticas = (None, None)
+        self._respuestas = (None, None, IndiceRespuestas(), np.empty(0, dtype=np.int64))
+        self._respuestas_sin_guardar = 0
+        with self._conexion() as conexion:
+            conexion.executescript(ESQUEMA)
+
+    def _conexion(self):
+        """Conexión del hilo actual (se abre la primera vez)"""
+        conexion = getattr(self._local, "conexion", None)
+        if conexion is None:
+            conexion = sqlite3.connect(self.ruta, timeout=30)
+            conexion.execute("PRAGMA journal_mode=WAL")
+            conexion.execute("PRAGMA synchronous=NORMAL")
+            conexion.execute("PRAGMA foreign_keys=ON")
+            self._local.conexion = conexion
+        return conexion
+
+    def cerrar(self):
+        """Cierra la conexión del hilo actual"""
+        conexion = getattr(self._local, "conexion", None)
+        if conexion is not None:
+            conexion.close()
+            self._local.conexion = None
+
+    # --- Escritura ---
+
+    def _insertar(self, conexion, candidatos):
+        """Inserta candidatos dentro de la transacción abierta; devuelve sus filas"""
+        filas = []
+        for candidato in candidatos:
+            extra = {k: v for k, v in candidato.items()
+                     if k not in COLUMNAS_CANDIDATO and k not in ("respuestas_cuestionario", "puntuaciones")}
+            cursor = conexion.execute(
+                "INSERT INTO candidatos (id, nombre, email, telefono, direccion, fecha_registro, version_modelo, extra)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [candidato.get(columna) for columna in COLUMNAS_CANDIDATO]
+                + [json.dumps(extra, ensure_ascii=False) if extra else None]
+            )
+            fila = cursor.lastrowid
+            filas.append(fila)
+            conexion.execute(
+                "INSERT INTO respuestas (fila, datos) VALUES (?, ?)",
+                (fila, json.dumps(candidato.get("respuestas_cuestionario", {}), ensure_ascii=False))
+            )
+            conexion.executemany(
+                "INSERT INTO puntuaciones (puesto, fila, puntuacion) VALUES (?, ?, ?)",
+                [(puesto, fila, puntuacion) for puesto, puntuacion in candidato.get("puntuaciones", {}).items()]
+            )
+        self._incrementar_revision(conexion)
+        return filas
+
+    def _incrementar_revision(self, conexion):
+        conexion.execute(
+            "INSERT INTO metadatos (clave, valor) VALUES ('revision', '1')"
+            " ON CONFLICT (clave) DO UPDATE SET valor = CAST(valor AS INTEGER) + 1"
+        )
+
+    def agregar(self, candidato):
+        """Registra un candidato; devuelve su fila"""
+        conexion = self._conexion()
+        with conexion:
+            return self._insertar(conexion, [candidato])[0]
+
+    def agregar_lote(self, candidatos):
+        """Registra varios candidatos en una sola transacción; devuelve sus filas"""
+        conexion = self._conexion()
+        with conexion:
+            return self._insertar(conexion, candidatos)
+
+    def guardar_metadatos(self, metadatos):
+        """Guarda los metadatos de la base (versión del modelo, definición de puestos...)"""
+        conexion = self._conexion()
+        with conexion:
+            conexion.executemany(
+                "INSERT OR REPLACE INTO metadatos (clave, valor) VALUES (?, ?)",
+                [(clave, json.dumps(valor, ensure_ascii=False)) for clave, valor in metadatos.items()
+                 if clave != "candidatos" and clave not in CLAVES_INTERNAS]
+            )
+
+    def vaciar(self):
+        """Borra todos los candidatos (antes de reimportar)
+
+        "vaciado" guarda la revisión del vaciado: las filas se vuelven a numerar
+        desde 1, así que invalida los índices de respuestas guardados.
+        """
+        conexion = self._conexion()
+        with conexion:
+            conexion.execute("DELETE FROM puntuaciones")
+            conexion.execute("DELETE FROM respuestas")
+            conexion.execute("DELETE FROM candidatos")
+            conexion.execute("DELETE FROM metadatos WHERE clave NOT IN ('revision', 'vaciado')")
+            self._incrementar_revision(conexion)
+            conexion.execute(
+                "INSERT OR REPLACE INTO metadatos (clave, valor) SELECT 'vaciado', valor FROM metadatos WHERE clave = 'revision'"
+            )
+
+    # --- Lectura ---
+
+    def revision(self):
+        """Contador de escrituras; cambia cada vez que cambian los datos"""
+        fila = self._conexion().execute("SELECT valor FROM metadatos WHERE clave = 'revision'").fetchone()
+        return int(fila[0]) if fila else 0
+
+    def metadatos(self):
+        """Metadatos guardados al importar"""
+        return {clave: json.loads(valor) for clave, valor in
+                self._conexion().execute("SELECT clave, valor FROM metadatos WHERE clave NOT IN ('revision', 'vaciado')")}
+
+    def contar(self):
+        """Número de candidatos"""
+        return self._conexion().execute("SELECT COUNT(*) FROM candidatos").fetchone()[0]
+
+    def obtener(self, filas):
+        """Candidatos completos de las filas dadas, en el mismo orden"""
+        filas = list(filas)
+        if not filas:
+            return []
+        conexion = self._conexion()
+        marcadores = ", ".join("?" * len(filas))
+        candidatos = {}
+        for registro in conexion.execute(
+            f"SELECT c.fila, c.id, c.nombre, c.email, c.telefono, c.direccion, c.fecha_registro,"
+            f" c.version_modelo, c.extra, r.datos FROM candidatos c LEFT JOIN respuestas r USING (fila)"
+            f" WHERE c.fila IN ({marcadores})", filas
+        ):
+            fila, *valores, extra, respuestas = registro
+            candidato = dict(zip(COLUMNAS_CANDIDATO, valores))
+            candidato["respuestas_cuestionario"] = json.loads(respuestas) if respuestas else {}
+            candidato["puntuaciones"] = {}
+            if extra:
+                candidato.update(json.loads(extra))
+            candidatos[fila] = candidato
+        for puesto, fila, puntuacion in conexion.execute(
+            f"SELECT puesto, fila, puntuacion FROM puntuaciones WHERE fila IN ({marcadores})", filas
+        ):
+            candidatos[fila]["puntuaciones"][puesto] = puntuacion
+        for candidato in candidatos.values():
+            # Mismo orden de puestos que PUESTOS
+            puntuaciones = candidato["puntuaciones"]
+            candidato["puntuaciones"] = {p: puntuaciones[p] for p in sorted(puntuaciones, key=orden_puesto)}
+        return [candidatos[fila] for fila in filas]
+
+    def iterar(self, tam_lote=10000):
+        """Itera todos los candidatos en orden de registro (por lotes)"""
+        ultima = 0
+        while True:
+            filas = [f for (f,) in self._conexion().execute(
+                "SELECT fila FROM candidatos WHERE fila > ? ORDER BY fila LIMIT ?", (ultima, tam_lote)
+            )]
+            if not filas:
+                return
+            yield from self.obtener(filas)
+            ultima = filas[-1]
+
+    def _ruta_indice_respuestas(self):
+        return None if self.ruta == ":memory:" else self.ruta + ".respuestas.npz"
+
+    def _cargar_indice_respuestas(self, vaciado):
+        """(índice, filas) guardados junto a la base, o None si no hay o son de antes de un vaciado"""
+        ruta = self._ruta_indice_respuestas()
+        if not ruta or not os.path.exists(ruta):
+            return None
+        try:
+            indice, extras = IndiceRespuestas.cargar(ruta)
+            if int(extras["vaciado"]) != vaciado or len(extras["filas"]) != len(indice):
+                return None
+            return indice, extras["filas"].astype(np.int64)
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def _indice_respuestas(self):
+        """(IndiceRespuestas, filas) de toda la tabla, en memoria y al día con la revisión
+
+        Solo se codifican las filas nuevas, y el índice se guarda junto a la
+        base (.respuestas.npz) cada FILAS_PARA_GUARDAR_INDICE filas nuevas, así
+        que un proceso nuevo no vuelve a decodificar todas las respuestas. Si se
+        borraron filas (vaciar) se reconstruye desde cero.
+        """
+        revision = self.revision()
+        with self._candado:
+            revision_cache, vaciado_cache, indice, filas = self._respuestas
+            if revision_cache == revision:
+                return indice, filas
+            conexion = self._conexion()
+            fila = conexion.execute("SELECT valor FROM metadatos WHERE clave = 'vaciado'").fetchone()
+            vaciado = int(fila[0]) if fila else 0
+            if revision_cache is None:
+                indice, filas = self._cargar_indice_respuestas(vaciado) or (indice, filas)
+            elif vaciado != vaciado_cache:
+                indice, filas = IndiceRespuestas(), np.empty(0, dtype=np.int64)
+            ultima = int(filas[-1]) if len(filas) else 0
+            conservadas = conexion.execute("SELECT COUNT(*) FROM respuestas WHERE fila <= ?", (ultima,)).fetchone()[0]
+            if conservadas != len(filas):
+                indice, filas, ultima = IndiceRespuestas(), np.empty(0, dtype=np.int64), 0
+            nuevas = []
+
+            def respuestas():
+                for fila, datos in conexion.execute(
+                    "SELECT fila, datos FROM respuestas WHERE fila > ? ORDER BY fila", (ultima,)
+                ):
+                    nuevas.append(fila)
+                    yield {"respuestas_cuestionario": json.loads(datos)}
+
+            indice.extender(respuestas())
+            filas = np.concatenate([filas, np.array(nuevas, dtype=np.int64)])
+            self._respuestas = (revision, vaciado, indice, filas)
+            self._respuestas_sin_guardar += len(nuevas)
+            ruta = self._ruta_indice_respuestas()
+            if ruta and self._respuestas_sin_guardar >= FILAS_PARA_GUARDAR_INDICE:
+                indice.guardar(ruta, filas=filas, vaciado=np.array(vaciado))
+                self._respuestas_sin_guardar = 0
+            return indice, filas
+
+    def buscar(self, puesto, puntuacion_minima, limite=10, filtro=None):
+        """(total, [(candidato, puntuación), ...]) con puntuación >= mínima, de mayor a menor
+
+        El filtro, el orden y el LIMIT se resuelven con el índice (puesto, puntuacion).
+        A igual puntuación se ordena por fila, igual que filtrar_candidatos. Con
+        `filtro` (FiltroRespuestas) las respuestas se evalúan en un índice de bits
+        en memoria y se recorren todas las filas sobre el umbral.
+        """
+        conexion = self._conexion()
+        if filtro is not None and not filtro.vacio():
+            indice, filas_indice = self._indice_respuestas()
+            marcadas = filas_indice[indice.seleccionar(filtro)[:len(filas_indice)]]
+            resultados = conexion.execute(
+                "SELECT fila, puntuacion FROM puntuaciones WHERE puesto = ? AND puntuacion >= ?"
+                " ORDER BY puntuacion DESC, fila",
+                (puesto, puntuacion_minima)
+            ).fetchall()
+            filas = np.fromiter((fila for fila, _ in resultados), dtype=np.int64, count=len(resultados))
+            coinciden = np.flatnonzero(np.isin(filas, marcadas))
+            filas = [resultados[i] for i in coinciden[:limite].tolist()]
+            candidatos = self.obtener([fila for fila, _ in filas])
+            return len(coinciden), [(candidato, puntuacion) for candidato, (_, puntuacion) in zip(candidatos, filas)]
+        total = conexion.execute(
+            "SELECT COUNT(*) FROM puntuaciones WHERE puesto = ? AND puntuacion >= ?",
+            (puesto, puntuacion_minima)
+        ).fetchone()[0]
+        filas = conexion.execute(
+            "SELECT fila, puntuacion FROM puntuaciones WHERE puesto = ? AND puntuacion >= ?"
+            " ORDER BY puntuacion DESC, fila LIMIT ?",
+            (puesto, puntuacion_minima, limite)
+        ).fetchall()
+        candidatos = self.obtener([fila for fila, _ in filas])
+        return total, [(candidato, puntuacion) for candidato, (_, puntuacion) in zip(candidatos, filas)]
+
+    def asignar(self, vacantes, puntuacion_minima=0, filtro=None):
+        """[(puesto, candidato, puntuación), ...] de la asignación global a {puesto: vacantes}
+
+        Los mejores candidatos_necesarios de cada puesto salen del índice
+        (puesto, puntuacion); con `filtro` se recorren todas las filas sobre el umbral.
+        """
+        conexion = self._conexion()
+        necesarios = candidatos_necesarios(vacantes)
+        marcadas = None
+        if filtro is not None and not filtro.vacio():
+            indice, filas_indice = self._indice_respuestas()
+            marcadas = filas_indice[indice.seleccionar(filtro)[:len(filas_indice)]]
+        mejores = {}
+        for puesto in vacantes:
+            consulta = ("SELECT fila, puntuacion FROM puntuaciones WHERE puesto = ? AND puntuacion >= ?"
+                        " ORDER BY puntuacion DESC, fila")
+            if marcadas is None:
+                resultados = conexion.execute(consulta + " LIMIT ?", (puesto, puntuacion_minima, necesarios)).fetchall()
+            else:
+                resultados = conexion.execute(consulta, (puesto, puntuacion_minima)).fetchall()
+            filas = np.fromiter((fila for fila, _ in resultados), dtype=np.int64, count=len(resultados))
+            puntuaciones = np.fromiter((p for _, p in resultados), dtype=np.float64, count=len(resultados))
+            if marcadas is not None:
+                coinciden = np.flatnonzero(np.isin(filas, marcadas))[:necesarios]
+                filas, puntuaciones = filas[coinciden], puntuaciones[coinciden]
+            mejores[puesto] = (filas, puntuaciones)
+        asignaciones = asignar_vacantes(mejores, vacantes)
+        candidatos = self.obtener([fila for _, fila, _ in asignaciones])
+        return [(puesto, candidato, puntuacion)
+                for (puesto, _, puntuacion), candidato in zip(asignaciones, candidatos)]
+
+    def similares(self, candidato, k=5):
+        """[(candidato, similitud %), ...] de los k candidatos con respuestas más parecidas, sin él mismo"""
+        indice, filas_indice = self._indice_respuestas()
+        posiciones, distancias = indice.vecinos(candidato.get("respuestas_cuestionario", {}), k + 1)
+        en_rango = posiciones < len(filas_indice)
+        posiciones, distancias = posiciones[en_rango], distancias[en_rango]
+        vecinos = self.obtener(filas_indice[posiciones].tolist())
+        return [(vecino, similitud(distancia)) for vecino, distancia in zip(vecinos, distancias.tolist())
+                if vecino.get("id") != candidato.get("id")][:k]
+
+    def _percentil(self, conexion, puesto, total, p):
+        """Percentil con interpolación lineal (como np.percentile) leyendo solo dos valores"""
+        posicion = (total - 1) * p / 100
+        inferior = math.floor(posicion)
+        valores = [v for (v,) in conexion.execute(
+            "SELECT puntuacion FROM puntuaciones WHERE puesto = ? ORDER BY puntuacion LIMIT 2 OFFSET ?",
+            (puesto, inferior)
+        )]
+        if len(valores) == 1 or posicion == inferior:
+            return valores[0]
+        return valores[0] + (valores[1] - valores[0]) * (posicion - inferior)
+
+    def estadisticas(self):
+        """Mismos agregados que calcular_estadisticas, calculados en SQL y cacheados por revisión
+
+        Las filas del top son filas de la tabla candidatos (ver `obtener`).
+        """
+        revision = self.revision()
+        with self._candado:
+            revision_cache, resultado = self._estadisticas
+            if revision_cache == revision:
+                return resultado
+
+        conexion = self._conexion()
+        agregados = {
+            puesto: (total, promedio, maximo, minimo)
+            for puesto, total, promedio, maximo, minimo in conexion.execute(
+                "SELECT puesto, COUNT(*), AVG(puntuacion), MAX(puntuacion), MIN(puntuacion)"
+                " FROM puntuaciones GROUP BY puesto"
+            )
+        }
+        puestos = sorted(agregados, key=orden_puesto)
+        ancho = 100 / INTERVALOS_HISTOGRAMA
+        resumen, histogramas, top = {}, {}, {}
+        for puesto in puestos:
+            total, promedio, maximo, minimo = agregados[puesto]
+            resumen[puesto] = {
+                "promedio": promedio,
+                "maximo": maximo,
+                "minimo": minimo,
+                **{f"p{p}": self._percentil(conexion, puesto, total, p) for p in PERCENTILES}
+            }
+            conteos = [0] * INTERVALOS_HISTOGRAMA
+            for intervalo, cantidad in conexion.execute(
+                "SELECT MIN(MAX(CAST(puntuacion / ? AS INTEGER), 0), ?), COUNT(*)"
+                " FROM puntuaciones WHERE puesto = ? GROUP BY 1",
+                (ancho, INTERVALOS_HISTOGRAMA - 1, puesto)
+            ):
+                conteos[intervalo] = cantidad
+            histogramas[puesto] = {
+                "bordes": [i * ancho for i in range(INTERVALOS_HISTOGRAMA + 1)],
+                "conteos": conteos
+            }
+            top[puesto] = conexion.execute(
+                "SELECT fila, puntuacion FROM puntuaciones WHERE puesto = ?"
+                " ORDER BY puntuacion DESC, fila LIMIT ?",
+                (puesto, NUM_TOP)
+            ).fetchall()
+
+        resultado = {"total": self.contar(), "resumen": resumen, "histogramas": histogramas, "top": top}
+        with self._candado:
+            self._estadisticas = (revision, resultado)
+        return resultado
+
+def importar_archivo(ruta_origen, almacen, tam_lote=10000, reemplazar=True):
+    """Importa una base JSON/JSONL (opcionalmente .gz/.xz) al almacén en streaming
+
+    Cada lote pasa por reevaluar_cambios antes de insertarse, así que las
+    puntuaciones quedan al día con el modelo y los PUESTOS actuales.
+    """
+    metadatos, candidatos = leer_base_datos(ruta_origen)
+    if reemplazar:
+        almacen.vaciar()
+    importados = 0
+    lote = []
+
+    def volcar():
+        nonlocal importados
+        base_lote = {"candidatos": lote, "puestos_definicion": metadatos.get("puestos_definicion")}
+        reevaluar_cambios(base_lote)
+        almacen.agregar_lote(lote)
+        importados += len(lote)
+        print(f"   Importados {importados} candidatos...")
+        return base_lote
+
+    base_lote = {}
+    for candidato in candidatos:
+        lote.append(candidato)
+        if len(lote) >= tam_lote:
+            base_lote = volcar()
+            lote = []
+    if lote:
+        base_lote = volcar()
+
+    metadatos = {clave: valor for clave, valor in metadatos.items()
+                 if clave not in ("formato", "version_formato")}
+    for clave in ("puestos_definicion", "puestos_disponibles", "version_modelo"):
+        if clave in base_lote:
+            metadatos[clave] = base_lote[clave]
+    metadatos["total_candidatos"] = almacen.contar()
+    almacen.guardar_metadatos(metadatos)
+    obtener_cache_puntuaciones().guardar()
+    return importados
+
+def main():
+    """Importa una base de datos de candidatos a SQLite"""
+    parser = argparse.ArgumentParser(description="Importa candidatos JSON/JSONL a un almacén SQLite")
+    parser.add_argument("archivo", help="Base de datos de candidatos (.json o .jsonl, opcionalmente .gz/.xz)")
+    parser.add_argument("--db", default=RUTA_SQLITE or "base_datos_candidatos.sqlite",
+                        help="Archivo SQLite de destino (por defecto $LINKENCHAMBA_SQLITE)")
+    parser.add_argument("--agregar", action="store_true", help="Agrega a los candidatos existentes en lugar de reemplazarlos")
+    parser.add_argument("--tam-lote", type=int, default=10000)
+    args = parser.parse_args()
+
+    inicio = time.time()
+    almacen = AlmacenSQLite(args.db)
+    importados = importar_archivo(args.archivo, almacen, tam_lote=args.tam_lote, reemplazar=not args.agregar)
+    print(f"\n[OK] {importados} candidatos importados en {args.db} ({time.time() - inicio:.1f} s)")
+    print(f"   Total en el almacén: {almacen.contar()}")
+
+if __name__ == "__main__":
+    main()
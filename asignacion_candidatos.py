@@ -0,0 +1,124 @@
+"""
+Asignación global de candidatos a vacantes de varios puestos
+Cada candidato ocupa como mucho una vacante y se maximiza la suma de puntuaciones.
+Se resuelve como problema de transporte (un puesto con capacidad = sus vacantes)
+con la programación lineal de SciPy (HiGHS) sobre los mejores candidatos de cada puesto
+"""
+import argparse
+import time
+import numpy as np
+from scipy import sparse
+from scipy.optimize import linprog
+
+def candidatos_necesarios(vacantes):
+    """Cuántos mejores candidatos de cada puesto bastan para una asignación óptima
+
+    Basta con el total de vacantes H: si la solución pone en un puesto a alguien
+    fuera de sus H mejores, alguno de esos H queda libre (las otras vacantes son
+    H - 1) y cambiarlo no empeora el total.
+    """
+    return sum(vacantes.values())
+
+def asignar_vacantes(mejores, vacantes):
+    """Asignación óptima de filas a vacantes; devuelve [(puesto, fila, puntuación), ...]
+
+    `mejores` es {puesto: (filas, puntuaciones)} con los candidatos elegibles
+    de cada puesto (normalmente sus candidatos_necesarios mejores) y `vacantes`
+    es {puesto: número de vacantes}. Cada candidato ocupa como mucho una
+    vacante; si faltan candidatos elegibles quedan vacantes sin cubrir. El
+    resultado va ordenado por puesto (en el orden de `vacantes`) y puntuación.
+    """
+    puestos = [puesto for puesto, cantidad in vacantes.items() if cantidad > 0 and len(mejores.get(puesto, ((),))[0])]
+    if not puestos:
+        return []
+    filas = [np.asarray(mejores[p][0], dtype=np.int64) for p in puestos]
+    puntuaciones = np.concatenate([np.asarray(mejores[p][1], dtype=np.float64) for p in puestos])
+    filas_unicas, renglon = np.unique(np.concatenate(filas), return_inverse=True)
+    puesto_de = np.repeat(np.arange(len(puestos)), [len(f) for f in filas])
+
+    # Una variable por pareja (candidato, puesto): cada candidato suma <= 1 y cada puesto <= sus vacantes.
+    # La matriz es totalmente unimodular, así que el vértice que da el símplex es entero.
+    variables = np.arange(len(puntuaciones))
+    restricciones = sparse.vstack([
+        sparse.csr_matrix((np.ones(len(variables)), (renglon, variables)), shape=(len(filas_unicas), len(variables))),
+        sparse.csr_matrix((np.ones(len(variables)), (puesto_de, variables)), shape=(len(puestos), len(variables))),
+    ]).tocsr()
+    limites = np.concatenate([np.ones(len(filas_unicas)), [vacantes[p] for p in puestos]])
+    resultado = linprog(-puntuaciones, A_ub=restricciones, b_ub=limites, bounds=(0, 1), method="highs-ds")
+    if resultado.status != 0:
+        raise RuntimeError(f"No se pudo resolver la asignación: {resultado.message}")
+
+    elegidas = np.flatnonzero(resultado.x > 0.5)
+    orden = np.lexsort((filas_unicas[renglon[elegidas]], -puntuaciones[elegidas], puesto_de[elegidas]))
+    elegidas = elegidas[orden]
+    return [
+        (puestos[j], fila, puntuacion)
+        for j, fila, puntuacion in zip(puesto_de[elegidas].tolist(), filas_unicas[renglon[elegidas]].tolist(),
+                                       puntuaciones[elegidas].tolist())
+    ]
+
+def resumen_asignacion(asignaciones, vacantes):
+    """Total de puntuación, vacantes cubiertas y vacantes sin cubrir por puesto"""
+    cubiertas = {puesto: 0 for puesto in vacantes}
+    for puesto, _, _ in asignaciones:
+        cubiertas[puesto] += 1
+    return {
+        "total": sum(puntuacion for _, _, puntuacion in asignaciones),
+        "cubiertas": len(asignaciones),
+        "sin_cubrir": {puesto: cantidad - cubiertas[puesto] for puesto, cantidad in vacantes.items()
+                       if cantidad > cubiertas[puesto]},
+    }
+
+def asignacion_por_puesto(mejores, vacantes):
+    """Lo que se obtiene ordenando cada puesto por separado: [(puesto, fila, puntuación), ...] con repetidos"""
+    return [
+        (puesto, fila, puntuacion)
+        for puesto, cantidad in vacantes.items() if puesto in mejores
+        for fila, puntuacion in list(zip(*(np.asarray(a).tolist() for a in mejores[puesto])))[:cantidad]
+    ]
+
+def main():
+    """Mide la asignación sobre un archivo de candidatos y la compara con el ranking por puesto"""
+    from tabla_candidatos import TablaCandidatos
+    from busqueda_candidatos import IndicePuntuaciones
+    from formato_candidatos import leer_base_datos
+
+    parser = argparse.ArgumentParser(description="Asignación global de candidatos a vacantes")
+    parser.add_argument("archivo", help="Base de candidatos (JSON o JSONL)")
+    parser.add_argument("--vacantes", nargs="+", required=True, metavar="PUESTO=N")
+    parser.add_argument("--minimo", type=float, default=0, help="Puntuación mínima para ocupar una vacante")
+    args = parser.parse_args()
+
+    vacantes = {}
+    for texto in args.vacantes:
+        puesto, _, cantidad = texto.rpartition("=")
+        vacantes[puesto.strip()] = int(cantidad)
+
+    _, candidatos = leer_base_datos(args.archivo)
+    tabla = TablaCandidatos(candidatos)
+    valores = tabla.valores_puntuaciones()
+    indice = IndicePuntuaciones(puestos=tabla.puestos, valores=valores)
+    for puesto in vacantes:
+        if puesto not in indice.puestos:
+            raise SystemExit(f"Puesto desconocido: {puesto}. Puestos: {', '.join(indice.puestos)}")
+
+    t = time.perf_counter()
+    necesarios = candidatos_necesarios(vacantes)
+    mejores = {puesto: indice.buscar(puesto, args.minimo, necesarios) for puesto in vacantes}
+    asignaciones = asignar_vacantes(mejores, vacantes)
+    duracion = time.perf_counter() - t
+    resumen = resumen_asignacion(asignaciones, vacantes)
+
+    por_puesto = asignacion_por_puesto(mejores, vacantes)
+    repetidos = len(por_puesto) - len({fila for _, fila, _ in por_puesto})
+    print(f"{len(tabla)} candidatos, {necesarios} vacantes en {len(vacantes)} puestos")
+    print(f"   Asignación global: {duracion * 1000:.1f} ms, puntuación total {resumen['total']:.2f}, "
+          f"{resumen['cubiertas']} vacantes cubiertas")
+    print(f"   Ranking por puesto: {repetidos} candidatos encabezan más de una lista")
+    for puesto, cantidad in resumen["sin_cubrir"].items():
+        print(f"   {puesto}: {cantidad} vacantes sin cubrir")
+    for puesto, fila, puntuacion in asignaciones[:20]:
+        print(f"   {puesto}: {tabla.candidato(fila).get('nombre')} ({puntuacion:.2f})")
+
+if __name__ == "__main__":
+    main()
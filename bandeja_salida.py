@@ -0,0 +1,325 @@
+"""
+Bandeja de salida persistente de correos (SQLite) con envío en segundo plano
+Encolar un correo es una inserción local; un hilo trabajador los envía respetando un
+límite de envíos por minuto, reintenta con espera exponencial y aparta los que fallan
+"""
+import argparse
+import os
+import smtplib
+import sqlite3
+import threading
+import time
+import uuid
+from correo import obtener_transporte
+
+RUTA_BANDEJA = os.environ.get("LINKENCHAMBA_BANDEJA", "bandeja_salida.sqlite")
+
+# Límite de envíos por minuto del trabajador (por proceso)
+CORREOS_POR_MINUTO = int(os.environ.get("LINKENCHAMBA_CORREOS_POR_MINUTO", "60"))
+
+# Reintentos: espera_base * 2^(intento - 1) segundos, hasta ESPERA_MAXIMA; tras
+# MAX_INTENTOS fallos el correo queda como "fallido" (no se vuelve a intentar)
+MAX_INTENTOS = 6
+ESPERA_BASE = 30
+ESPERA_MAXIMA = 3600
+
+# Un correo "enviando" más tiempo que esto se considera abandonado (el proceso cayó)
+ARRENDAMIENTO = 600
+
+# Sin credenciales SMTP los correos se quedan en cola y se vuelve a mirar cada tanto
+ESPERA_SIN_CONFIGURACION = 60
+
+ESTADOS = ("pendiente", "enviando", "enviado", "fallido")
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS correos (
+    id TEXT PRIMARY KEY,
+    destinatario TEXT NOT NULL,
+    asunto TEXT NOT NULL,
+    cuerpo TEXT NOT NULL,
+    es_html INTEGER NOT NULL DEFAULT 0,
+    estado TEXT NOT NULL DEFAULT 'pendiente',
+    intentos INTEGER NOT NULL DEFAULT 0,
+    proximo_intento REAL NOT NULL,
+    ultimo_error TEXT,
+    creado REAL NOT NULL,
+    actualizado REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_correos_cola ON correos (estado, proximo_intento);
+"""
+
+def error_permanente(error):
+    """El servidor rechazó el correo de forma definitiva (código 5xx): reintentar no sirve"""
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return all(codigo >= 500 for codigo, _ in error.recipients.values())
+    if isinstance(error, smtplib.SMTPAuthenticationError):
+        # Credenciales mal configuradas: se reintenta hasta que se corrijan
+        return False
+    if isinstance(error, smtplib.SMTPResponseException):
+        return 500 <= error.smtp_code < 600
+    return False
+
+def texto_error(error):
+    """Descripción legible de un error de envío (código y mensaje del servidor si los hay)"""
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return "; ".join(f"{codigo} {mensaje.decode('utf-8', 'replace') if isinstance(mensaje, bytes) else mensaje}"
+                         for codigo, mensaje in error.recipients.values())
+    if isinstance(error, smtplib.SMTPResponseException):
+        mensaje = error.smtp_error
+        return f"{error.smtp_code} {mensaje.decode('utf-8', 'replace') if isinstance(mensaje, bytes) else mensaje}"
+    return str(error) or type(error).__name__
+
+def espera_reintento(intentos, espera_base=ESPERA_BASE):
+    """Segundos hasta el siguiente intento tras `intentos` fallos"""
+    return min(espera_base * 2 ** (intentos - 1), ESPERA_MAXIMA)
+
+class BandejaSalida:
+    """Cola de correos en SQLite compartida por sesiones y procesos
+
+    encolar() solo inserta el correo y despierta al trabajador, así que tarda
+    lo mismo sea cual sea la velocidad del servidor SMTP. El trabajador
+    (iniciar) reclama los correos de uno en uno con un UPDATE condicionado, por lo
+    que varios procesos pueden drenar la misma bandeja sin enviar dos veces.
+    """
+    def __init__(self, ruta=RUTA_BANDEJA, transporte=None, por_minuto=CORREOS_POR_MINUTO,
+                 max_intentos=MAX_INTENTOS, espera_base=ESPERA_BASE):
+        self.ruta = ruta
+        self.transporte = transporte
+        self.intervalo = 60 / por_minuto if por_minuto else 0
+        self.max_intentos = max_intentos
+        self.espera_base = espera_base
+        self._local = threading.local()
+        self._despertar = threading.Event()
+        self._detener = threading.Event()
+        self._hilo = None
+        self._siguiente_envio = 0.0
+        with self._conexion() as conexion:
+            conexion.executescript(ESQUEMA)
+
+    def _conexion(self):
+        """Conexión del hilo actual (se abre la primera vez)"""
+        conexion = getattr(self._local, "conexion", None)
+        if conexion is None:
+            conexion = sqlite3.connect(self.ruta, timeout=30)
+            conexion.execute("PRAGMA journal_mode=WAL")
+            # Un correo encolado debe sobrevivir a una caída del sistema
+            conexion.execute("PRAGMA synchronous=FULL")
+            self._local.conexion = conexion
+        return conexion
+
+    # --- Cola ---
+
+    def encolar_lote(self, correos):
+        """Encola [(destinatario, asunto, cuerpo)] o con es_html al final; devuelve sus ids"""
+        ahora = time.time()
+        filas = []
+        for correo in correos:
+            destinatario, asunto, cuerpo, *resto = correo
+            filas.append((uuid.uuid4().hex, destinatario, asunto, cuerpo, int(bool(resto and resto[0])), ahora, ahora, ahora))
+        conexion = self._conexion()
+        with conexion:
+            conexion.executemany(
+                "INSERT INTO correos (id, destinatario, asunto, cuerpo, es_html, proximo_intento, creado, actualizado)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?)", filas
+            )
+        self._despertar.set()
+        return [fila[0] for fila in filas]
+
+    def encolar(self, destinatario, asunto, cuerpo, es_html=False):
+        """Encola un correo; devuelve su id"""
+        return self.encolar_lote([(destinatario, asunto, cuerpo, es_html)])[0]
+
+    def estados(self, ids):
+        """{id: {destinatario, estado, intentos, ultimo_error, proximo_intento, actualizado}}"""
+        ids = list(ids)
+        if not ids:
+            return {}
+        marcadores = ", ".join("?" * len(ids))
+        return {
+            id_correo: {"destinatario": destinatario, "estado": estado, "intentos": intentos,
+                        "ultimo_error": ultimo_error, "proximo_intento": proximo_intento, "actualizado": actualizado}
+            for id_correo, destinatario, estado, intentos, ultimo_error, proximo_intento, actualizado
+            in self._conexion().execute(
+                f"SELECT id, destinatario, estado, intentos, ultimo_error, proximo_intento, actualizado"
+                f" FROM correos WHERE id IN ({marcadores})", ids
+            )
+        }
+
+    def resumen(self):
+        """Número de correos por estado"""
+        conteos = dict(self._conexion().execute("SELECT estado, COUNT(*) FROM correos GROUP BY estado"))
+        return {estado: conteos.get(estado, 0) for estado in ESTADOS}
+
+    def fallidos(self, limite=20):
+        """Últimos correos apartados: [(id, destinatario, intentos, ultimo_error)]"""
+        return self._conexion().execute(
+            "SELECT id, destinatario, intentos, ultimo_error FROM correos WHERE estado = 'fallido'"
+            " ORDER BY actualizado DESC LIMIT ?", (limite,)
+        ).fetchall()
+
+    def reintentar_fallidos(self, ids=None):
+        """Devuelve a la cola los correos fallidos (todos o los indicados); devuelve cuántos"""
+        ahora = time.time()
+        consulta = ("UPDATE correos SET estado = 'pendiente', intentos = 0, proximo_intento = ?, actualizado = ?"
+                    " WHERE estado = 'fallido'")
+        parametros = [ahora, ahora]
+        if ids is not None:
+            ids = list(ids)
+            consulta += f" AND id IN ({', '.join('?' * len(ids))})"
+            parametros += ids
+        conexion = self._conexion()
+        with conexion:
+            cambiados = conexion.execute(consulta, parametros).rowcount
+        self._despertar.set()
+        return cambiados
+
+    # --- Envío ---
+
+    def _reclamar(self):
+        """Marca como "enviando" el siguiente correo vencido y lo devuelve (o None)
+
+        SELECT y después un UPDATE condicionado a que siga pendiente con los
+        mismos intentos: si otro proceso lo reclamó entre medias no cambia
+        ninguna fila y se prueba con el siguiente. Funciona con cualquier
+        versión de SQLite (UPDATE ... RETURNING requiere la 3.35).
+        """
+        conexion = self._conexion()
+        while True:
+            ahora = time.time()
+            correo = conexion.execute(
+                "SELECT id, destinatario, asunto, cuerpo, es_html, intentos FROM correos"
+                " WHERE estado = 'pendiente' AND proximo_intento <= ? ORDER BY proximo_intento, creado LIMIT 1",
+                (ahora,)
+            ).fetchone()
+            if correo is None:
+                return None
+            with conexion:
+                reclamado = conexion.execute(
+                    "UPDATE correos SET estado = 'enviando', actualizado = ?"
+                    " WHERE id = ? AND estado = 'pendiente' AND intentos = ?",
+                    (ahora, correo[0], correo[5])
+                ).rowcount
+            if reclamado:
+                return correo
+
+    def _registrar_resultado(self, id_correo, intentos, error):
+        """Guarda el resultado de un intento: enviado, reintento programado o fallido"""
+        ahora = time.time()
+        if error is None:
+            estado, proximo, texto = "enviado", ahora, None
+        else:
+            intentos += 1
+            texto = texto_error(error)
+            if error_permanente(error) or intentos >= self.max_intentos:
+                estado, proximo = "fallido", ahora
+            else:
+                estado, proximo = "pendiente", ahora + espera_reintento(intentos, self.espera_base)
+        conexion = self._conexion()
+        with conexion:
+            conexion.execute(
+                "UPDATE correos SET estado = ?, intentos = ?, proximo_intento = ?, ultimo_error = ?, actualizado = ?"
+                " WHERE id = ?", (estado, intentos, proximo, texto, ahora, id_correo)
+            )
+
+    def _recuperar_abandonados(self):
+        """Devuelve a la cola los correos que quedaron "enviando" tras una caída"""
+        conexion = self._conexion()
+        with conexion:
+            conexion.execute(
+                "UPDATE correos SET estado = 'pendiente' WHERE estado = 'enviando' AND actualizado < ?",
+                (time.time() - ARRENDAMIENTO,)
+            )
+
+    def procesar_pendientes(self, limite=None):
+        """Envía los correos vencidos respetando el límite por minuto; devuelve cuántos se intentaron"""
+        transporte = self.transporte or obtener_transporte()
+        if not transporte.configuracion.completa():
+            return 0
+        self._recuperar_abandonados()
+        procesados = 0
+        while limite is None or procesados < limite:
+            espera = self._siguiente_envio - time.monotonic()
+            if espera > 0 and self._detener.wait(espera):
+                break
+            correo = self._reclamar()
+            if correo is None:
+                break
+            id_correo, destinatario, asunto, cuerpo, es_html, intentos = correo
+            self._siguiente_envio = time.monotonic() + self.intervalo
+            try:
+                transporte.enviar(destinatario, asunto, cuerpo, bool(es_html))
+                error = None
+            except Exception as e:
+                error = e
+            self._registrar_resultado(id_correo, intentos, error)
+            procesados += 1
+        return procesados
+
+    def _espera_siguiente(self):
+        """Segundos hasta que venza el próximo reintento programado"""
+        fila = self._conexion().execute(
+            "SELECT MIN(proximo_intento) FROM correos WHERE estado = 'pendiente'"
+        ).fetchone()
+        if fila[0] is None:
+            return ARRENDAMIENTO
+        return min(max(fila[0] - time.time(), 0.05), ARRENDAMIENTO)
+
+    def _trabajar(self):
+        while not self._detener.is_set():
+            self._despertar.clear()
+            try:
+                procesados = self.procesar_pendientes()
+                transporte = self.transporte or obtener_transporte()
+                espera = (self._espera_siguiente() if transporte.configuracion.completa()
+                          else ESPERA_SIN_CONFIGURACION)
+            except sqlite3.Error:
+                procesados, espera = 0, 1.0
+            if not procesados:
+                self._despertar.wait(espera)
+
+    def iniciar(self):
+        """Arranca el hilo trabajador (una vez); devuelve la bandeja"""
+        if self._hilo is None or not self._hilo.is_alive():
+            self._detener.clear()
+            self._hilo = threading.Thread(target=self._trabajar, name="bandeja-salida", daemon=True)
+            self._hilo.start()
+        return self
+
+    def detener(self, esperar=True):
+        """Detiene el trabajador al terminar el envío en curso"""
+        self._detener.set()
+        self._despertar.set()
+        if esperar and self._hilo is not None:
+            self._hilo.join()
+
+    def esperar_vacia(self, tiempo_maximo=60):
+        """Espera a que no queden correos pendientes ni enviando; devuelve si se vació"""
+        limite = time.time() + tiempo_maximo
+        while time.time() < limite:
+            resumen = self.resumen()
+            if not resumen["pendiente"] and not resumen["enviando"]:
+                return True
+            time.sleep(0.05)
+        return False
+
+def main():
+    """Estado y mantenimiento de la bandeja de salida de correos"""
+    parser = argparse.ArgumentParser(description="Bandeja de salida de correos de LinkenChamba")
+    parser.add_argument("accion", choices=["estado", "procesar", "reintentar"],
+                        help="procesar: envía la cola en primer plano; reintentar: devuelve los fallidos a la cola")
+    parser.add_argument("--bandeja", default=RUTA_BANDEJA, help="Archivo de la bandeja (por defecto $LINKENCHAMBA_BANDEJA)")
+    args = parser.parse_args()
+
+    bandeja = BandejaSalida(args.bandeja)
+    if args.accion == "reintentar":
+        print(f"[OK] {bandeja.reintentar_fallidos()} correos fallidos devueltos a la cola")
+    elif args.accion == "procesar":
+        inicio = time.time()
+        procesados = bandeja.procesar_pendientes()
+        print(f"[OK] {procesados} correos procesados en {time.time() - inicio:.1f} s")
+    print(", ".join(f"{estado}: {n}" for estado, n in bandeja.resumen().items()))
+    for id_correo, destinatario, intentos, error in bandeja.fallidos():
+        print(f"   [fallido] {id_correo} {destinatario} ({intentos} intentos): {error}")
+
+if __name__ == "__main__":
+    main()
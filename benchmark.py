@@ -0,0 +1,353 @@
+"""
+Benchmarks de las rutas críticas de puntuación y búsqueda de LinkenChamba
+Cada caso se ejecuta en un proceso aparte para medir su pico de memoria (RSS);
+los resultados se guardan en JSON para comparar ejecuciones a lo largo del tiempo
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+from datetime import datetime
+import numpy as np
+try:
+    import resource
+except ImportError:
+    # Windows: el pico de memoria se lee con GetProcessMemoryInfo
+    resource = None
+    import ctypes
+
+CASOS = [
+    "extraer_caracteristicas",
+    "forward",
+    "calcular_puntuaciones",
+    "generar_candidato",
+    "cargar_json",
+    "importar_subida",
+    "buscar_candidatos",
+    "buscar_indice",
+    "filtrar_respuestas",
+    "similares",
+    "asignacion",
+    "tabla_compacta",
+    "memoria_sesion",
+]
+TAMANOS = [1000, 10000, 100000, 1000000]
+TAM_LOTE_FORWARD = 1024
+CONSULTAS_BUSQUEDA = 20
+REPETICIONES_CARGA = 3
+SESIONES_MEMORIA = 3
+DIRECTORIO_RESULTADOS = "benchmarks"
+
+def ruta_datos(directorio, tamano):
+    """Archivo de candidatos de prueba para un tamaño dado"""
+    return os.path.join(directorio, "datos", f"candidatos_{tamano}.json")
+
+def preparar_datos(directorio, tamano, workers):
+    """Genera (una sola vez) la base de datos sintética de un tamaño con semilla fija"""
+    from formato_candidatos import escribir_base_datos
+    from generar_base_datos import generar_en_paralelo
+
+    ruta = ruta_datos(directorio, tamano)
+    if os.path.exists(ruta):
+        return ruta
+    os.makedirs(os.path.dirname(ruta), exist_ok=True)
+    print(f"   Preparando {tamano} candidatos de prueba en {ruta}...")
+    candidatos = (c for fragmento in generar_en_paralelo(tamano, workers=workers, semilla=0) for c in fragmento)
+    escribir_base_datos(ruta, {"total_candidatos": tamano}, candidatos)
+    return ruta
+
+def pico_working_set_windows():
+    """Pico del conjunto de trabajo del proceso actual en bytes (PROCESS_MEMORY_COUNTERS de psapi)"""
+    class Contadores(ctypes.Structure):
+        _fields_ = [("cb", ctypes.c_ulong), ("PageFaultCount", ctypes.c_ulong)] + [
+            (campo, ctypes.c_size_t) for campo in (
+                "PeakWorkingSetSize", "WorkingSetSize", "QuotaPeakPagedPoolUsage", "QuotaPagedPoolUsage",
+                "QuotaPeakNonPagedPoolUsage", "QuotaNonPagedPoolUsage", "PagefileUsage", "PeakPagefileUsage")]
+
+    contadores = Contadores(cb=ctypes.sizeof(Contadores))
+    proceso = ctypes.windll.kernel32.GetCurrentProcess
+    proceso.restype = ctypes.c_void_p
+    obtener = ctypes.windll.psapi.GetProcessMemoryInfo
+    obtener.argtypes = [ctypes.c_void_p, ctypes.POINTER(Contadores), ctypes.c_ulong]
+    if not obtener(proceso(), ctypes.byref(contadores), contadores.cb):
+        raise ctypes.WinError()
+    return contadores.PeakWorkingSetSize
+
+def pico_rss_mb():
+    """Pico de memoria residente del proceso actual en MB (ru_maxrss está en KB en Linux)"""
+    if resource is None:
+        return pico_working_set_windows() / (1024 * 1024)
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == "darwin":
+        pico /= 1024
+    return pico / 1024
+
+def medir(funcion, argumentos):
+    """Ejecuta funcion(arg) para cada argumento y devuelve las latencias en segundos"""
+    latencias = np.empty(len(argumentos))
+    reloj = time.perf_counter
+    for i, argumento in enumerate(argumentos):
+        inicio = reloj()
+        funcion(argumento)
+        latencias[i] = reloj() - inicio
+    return latencias
+
+def memoria_sesiones(ruta, sesiones):
+    """Ejecuta la aplicación en varias sesiones simuladas sobre la base `ruta`
+
+    Devuelve las latencias de la primera ejecución de cada sesión y el tamaño
+    de su estado de sesión, que no debe crecer con el número de candidatos.
+    """
+    import tempfile
+    from streamlit.testing.v1 import AppTest
+    from almacen_candidatos import tamano_profundo
+
+    aplicacion = os.path.join(os.path.dirname(os.path.abspath(__file__)), "linkenchamba.py")
+    directorio = tempfile.mkdtemp(prefix="linkenchamba_memoria_")
+    os.symlink(os.path.abspath(ruta), os.path.join(directorio, "base_datos_candidatos.json"))
+    os.chdir(directorio)
+    os.environ.pop("LINKENCHAMBA_SQLITE", None)
+
+    def sesion(_):
+        prueba = AppTest.from_file(aplicacion, default_timeout=3600)
+        prueba.run()
+        tamanos.append(tamano_profundo(dict(prueba.session_state.items())))
+
+    tamanos = []
+    latencias = medir(sesion, range(sesiones))
+    return latencias, tamanos
+
+def ejecutar_caso(caso, tamano, ruta):
+    """Ejecuta un caso y devuelve (unidad, elementos procesados, latencias por operación[, extras])"""
+    import red_neuronal_puntuacion as rn
+
+    if caso == "memoria_sesion":
+        latencias, tamanos = memoria_sesiones(ruta, SESIONES_MEMORIA)
+        return "sesion", SESIONES_MEMORIA, latencias, {"sesion_kb": round(max(tamanos) / 1024, 1)}
+
+    if caso == "generar_candidato":
+        # No necesita datos: genera `tamano` candidatos uno por uno
+        from generar_base_datos import fake, generar_candidato
+        random.seed(0)
+        fake.seed_instance(0)
+        return "candidato", tamano, medir(lambda _: generar_candidato(), range(tamano))
+
+    if caso == "cargar_json":
+        def cargar(_):
+            with open(ruta, "r", encoding="utf-8") as f:
+                json.load(f)
+        return "archivo", tamano * REPETICIONES_CARGA, medir(cargar, range(REPETICIONES_CARGA))
+
+    if caso == "importar_subida":
+        # Como la subida de la aplicación: bytes en memoria leídos por bloques, validados,
+        # puntuados y guardados en la tabla compacta del almacén
+        import io
+        from almacen_candidatos import AlmacenCandidatos
+        from formato_candidatos import leer_flujo
+        from reevaluar_puntuaciones import reevaluar_flujo
+        with open(ruta, "rb") as f:
+            datos = f.read()
+
+        def importar(_):
+            metadatos, candidatos = leer_flujo(io.BytesIO(datos), ruta)
+            AlmacenCandidatos({"candidatos": reevaluar_flujo(metadatos, candidatos)})
+        return "archivo", tamano * REPETICIONES_CARGA, medir(importar, range(REPETICIONES_CARGA))
+
+    from formato_candidatos import cargar_base_datos
+    candidatos = cargar_base_datos(ruta)["candidatos"]
+    lista_respuestas = [c["respuestas_cuestionario"] for c in candidatos]
+    red_neuronal = rn.obtener_red_neuronal()
+
+    if caso == "extraer_caracteristicas":
+        return "candidato", tamano, medir(red_neuronal.extraer_caracteristicas, lista_respuestas)
+
+    if caso == "forward":
+        X = rn.extraer_caracteristicas_lote(lista_respuestas)
+        lotes = [X[i:i + TAM_LOTE_FORWARD] for i in range(0, len(X), TAM_LOTE_FORWARD)]
+        return f"lote_{TAM_LOTE_FORWARD}", tamano, medir(red_neuronal.forward, lotes)
+
+    if caso == "calcular_puntuaciones":
+        return "candidato", tamano, medir(rn.calcular_puntuaciones, lista_respuestas)
+
+    if caso == "buscar_candidatos":
+        from busqueda_candidatos import filtrar_candidatos
+        puestos = list(rn.PUESTOS.keys())
+        rng = random.Random(0)
+        consultas = [(rng.choice(puestos), rng.randrange(0, 100, 5)) for _ in range(CONSULTAS_BUSQUEDA)]
+        latencias = medir(lambda consulta: filtrar_candidatos(candidatos, *consulta)[:10], consultas)
+        return "consulta", tamano * CONSULTAS_BUSQUEDA, latencias
+
+    if caso == "buscar_indice":
+        from busqueda_candidatos import IndicePuntuaciones
+        indice = IndicePuntuaciones(candidatos)
+        puestos = list(rn.PUESTOS.keys())
+        rng = random.Random(0)
+        consultas = [(rng.choice(puestos), rng.randrange(0, 100, 5)) for _ in range(CONSULTAS_BUSQUEDA)]
+        latencias = medir(lambda consulta: indice.buscar(*consulta, limite=10), consultas)
+        return "consulta", tamano * CONSULTAS_BUSQUEDA, latencias
+
+    if caso == "filtrar_respuestas":
+        # Filtro Y/O/NO aleatorio sobre el índice de bits, combinado con el umbral y el top 10
+        from busqueda_candidatos import IndicePuntuaciones
+        from indice_respuestas import NOMBRES_CARACTERISTICAS, FiltroRespuestas, IndiceRespuestas
+        from tabla_candidatos import TablaCandidatos
+        tabla = TablaCandidatos(candidatos)
+        respuestas = IndiceRespuestas.desde_tabla(tabla)
+        indice = IndicePuntuaciones(puestos=tabla.puestos, valores=tabla.valores_puntuaciones())
+        puestos = list(rn.PUESTOS.keys())
+        rng = random.Random(0)
+        consultas = [
+            (rng.choice(puestos), rng.randrange(0, 100, 5), FiltroRespuestas(
+                rng.sample(NOMBRES_CARACTERISTICAS, 2), rng.sample(NOMBRES_CARACTERISTICAS, 3),
+                rng.sample(NOMBRES_CARACTERISTICAS, 1), {rng.choice(rn.TEMAS_NIVELES): rng.randint(1, 3)}
+            ))
+            for _ in range(CONSULTAS_BUSQUEDA)
+        ]
+
+        def filtrar(consulta):
+            puesto, minimo, filtro = consulta
+            seleccion = respuestas.seleccionar(filtro)
+            indice.contar(puesto, minimo, seleccion)
+            return indice.buscar(puesto, minimo, 10, seleccion)
+        return "consulta", tamano * CONSULTAS_BUSQUEDA, medir(filtrar, consultas)
+
+    if caso == "similares":
+        # k-NN exacto (k=6) sobre el índice de bits de respuestas para candidatos al azar
+        from indice_respuestas import IndiceRespuestas
+        from tabla_candidatos import TablaCandidatos
+        respuestas = IndiceRespuestas.desde_tabla(TablaCandidatos(candidatos))
+        rng = random.Random(0)
+        consultas = [rng.choice(lista_respuestas) for _ in range(CONSULTAS_BUSQUEDA)]
+        return "consulta", tamano * CONSULTAS_BUSQUEDA, medir(lambda r: respuestas.vecinos(r, 6), consultas)
+
+    if caso == "asignacion":
+        # Asignación global con vacantes al azar (hasta 100 por puesto) sobre los mejores de cada puesto
+        from asignacion_candidatos import asignar_vacantes, candidatos_necesarios
+        from busqueda_candidatos import IndicePuntuaciones
+        from tabla_candidatos import TablaCandidatos
+        tabla = TablaCandidatos(candidatos)
+        indice = IndicePuntuaciones(puestos=tabla.puestos, valores=tabla.valores_puntuaciones())
+        rng = random.Random(0)
+        consultas = [
+            ({puesto: rng.randint(0, 100) for puesto in rn.PUESTOS}, rng.randrange(0, 80, 5))
+            for _ in range(CONSULTAS_BUSQUEDA)
+        ]
+
+        def asignar(consulta):
+            vacantes, minimo = consulta
+            necesarios = candidatos_necesarios(vacantes)
+            return asignar_vacantes({p: indice.buscar(p, minimo, necesarios) for p in vacantes}, vacantes)
+        latencias = medir(asignar, consultas)
+        return "consulta", CONSULTAS_BUSQUEDA, latencias, {
+            "vacantes_promedio": round(sum(sum(v.values()) for v, _ in consultas) / len(consultas)),
+        }
+
+    if caso == "tabla_compacta":
+        # Decodificar una página de resultados (10 filas al azar) desde la tabla compacta
+        from almacen_candidatos import tamano_profundo
+        from tabla_candidatos import TablaCandidatos
+        tabla = TablaCandidatos(candidatos)
+        tabla.recortar()
+        rng = np.random.default_rng(0)
+        paginas = [rng.integers(0, len(tabla), 10) for _ in range(CONSULTAS_BUSQUEDA)]
+        latencias = medir(tabla.obtener, paginas)
+        return "pagina", 10 * CONSULTAS_BUSQUEDA, latencias, {
+            "lista_bytes_por_candidato": round(tamano_profundo(candidatos) / tamano),
+            "tabla_bytes_por_candidato": round(tamano_profundo(tabla) / tamano),
+        }
+
+    raise ValueError(f"Caso desconocido: {caso}")
+
+def resultado_caso(caso, tamano, ruta):
+    """Mide un caso en el proceso actual y resume sus métricas"""
+    unidad, elementos, latencias, *extras = ejecutar_caso(caso, tamano, ruta)
+    segundos = float(latencias.sum())
+    resultado = {
+        "caso": caso,
+        "tamano": tamano,
+        "unidad": unidad,
+        "operaciones": int(len(latencias)),
+        "segundos": round(segundos, 6),
+        "elementos_por_segundo": round(elementos / segundos, 1) if segundos else None,
+        "p50_ms": round(float(np.percentile(latencias, 50)) * 1000, 6),
+        "p99_ms": round(float(np.percentile(latencias, 99)) * 1000, 6),
+        "rss_pico_mb": round(pico_rss_mb(), 1),
+    }
+    for extra in extras:
+        resultado.update(extra)
+    return resultado
+
+def ejecutar_en_subproceso(caso, tamano, ruta):
+    """Lanza un caso en un proceso nuevo para que el pico de RSS sea solo suyo"""
+    salida = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--interno", caso, str(tamano), ruta],
+        check=True, capture_output=True, text=True,
+        cwd=os.path.dirname(os.path.abspath(__file__))
+    )
+    return json.loads(salida.stdout.strip().splitlines()[-1])
+
+def comparar(resultados, ruta_anterior):
+    """Imprime la variación de rendimiento frente a una ejecución anterior"""
+    with open(ruta_anterior, "r", encoding="utf-8") as f:
+        anteriores = {(r["caso"], r["tamano"]): r for r in json.load(f)["resultados"]}
+    print(f"\nComparación con {ruta_anterior}:")
+    for r in resultados:
+        anterior = anteriores.get((r["caso"], r["tamano"]))
+        if anterior and anterior["elementos_por_segundo"] and r["elementos_por_segundo"]:
+            factor = r["elementos_por_segundo"] / anterior["elementos_por_segundo"]
+            print(f"   {r['caso']} @ {r['tamano']}: x{factor:.2f} rendimiento, "
+                  f"p99 {anterior['p99_ms']:.3f} -> {r['p99_ms']:.3f} ms")
+
+def main():
+    """Ejecuta los benchmarks seleccionados y guarda los resultados"""
+    parser = argparse.ArgumentParser(description="Benchmarks de puntuación y búsqueda")
+    parser.add_argument("--casos", nargs="+", choices=CASOS, default=CASOS)
+    parser.add_argument("--tamanos", nargs="+", type=int, default=TAMANOS)
+    parser.add_argument("--directorio", default=DIRECTORIO_RESULTADOS,
+                        help="Directorio de resultados y datos de prueba")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="Procesos para preparar los datos de prueba")
+    parser.add_argument("--comparar", metavar="RESULTADOS_JSON", help="Resultados anteriores con los que comparar")
+    parser.add_argument("--interno", nargs=3, metavar=("CASO", "TAMANO", "DATOS"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.interno:
+        caso, tamano, ruta = args.interno
+        print(json.dumps(resultado_caso(caso, int(tamano), ruta)))
+        return
+
+    directorio = os.path.abspath(args.directorio)
+    resultados = []
+    for tamano in args.tamanos:
+        ruta = preparar_datos(directorio, tamano, args.workers)
+        for caso in args.casos:
+            resultado = ejecutar_en_subproceso(caso, tamano, ruta)
+            resultados.append(resultado)
+            print(f"   {caso} @ {tamano}: {resultado['elementos_por_segundo']} candidatos/s, "
+                  f"p50 {resultado['p50_ms']:.3f} ms y p99 {resultado['p99_ms']:.3f} ms por {resultado['unidad']}, "
+                  f"RSS {resultado['rss_pico_mb']} MB"
+                  + (f", estado de sesión {resultado['sesion_kb']} KB" if "sesion_kb" in resultado else ""))
+
+    informe = {
+        "fecha": datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "plataforma": platform.platform(),
+        "procesadores": os.cpu_count(),
+        "resultados": resultados,
+    }
+    os.makedirs(directorio, exist_ok=True)
+    ruta_resultados = os.path.join(directorio, f"resultados_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    with open(ruta_resultados, "w", encoding="utf-8") as f:
+        json.dump(informe, f, ensure_ascii=False, indent=2)
+    print(f"\n[OK] Resultados guardados en {ruta_resultados}")
+
+    if args.comparar:
+        comparar(resultados, args.comparar)
+
+if __name__ == "__main__":
+    main()
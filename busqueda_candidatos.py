@@ -0,0 +1,123 @@
+"""
+Lógica de búsqueda de candidatos de la pestaña "Buscar candidatos"
+Separada de la aplicación Streamlit para poder reutilizarla y medirla
+"""
+import numpy as np
+from red_neuronal_puntuacion import PUESTOS
+
+def filtrar_candidatos(candidatos, puesto, puntuacion_minima):
+    """Candidatos con puntuación >= mínima para el puesto, de mayor a menor puntuación
+
+    Devuelve una lista de {"candidato": ..., "puntuacion": ...}.
+    """
+    candidatos_filtrados = []
+    for cand in candidatos:
+        puntuacion = cand.get("puntuaciones", {}).get(puesto, 0)
+        if puntuacion >= puntuacion_minima:
+            candidatos_filtrados.append({
+                "candidato": cand,
+                "puntuacion": puntuacion
+            })
+    
+    # Ordenar por puntuación descendente
+    candidatos_filtrados.sort(key=lambda x: x["puntuacion"], reverse=True)
+    return candidatos_filtrados
+
+class IndicePuntuaciones:
+    """Índice por puesto con las puntuaciones ordenadas y la fila de cada candidato
+
+    Para cada puesto guarda un arreglo NumPy de puntuaciones en orden ascendente
+    (a igual puntuación, fila descendente) y el arreglo paralelo de filas. Así
+    el umbral es una búsqueda binaria y el top-k es un corte del final, con el
+    mismo orden que filtrar_candidatos. En lugar de candidatos se puede dar
+    `valores`, la matriz filas x puestos de puntuaciones (p. ej. la de una
+    TablaCandidatos).
+    """
+    def __init__(self, candidatos=(), puestos=None, valores=None):
+        self.puestos = list(PUESTOS.keys()) if puestos is None else list(puestos)
+        self.num_filas = 0
+        self._puntuaciones = {puesto: np.empty(0, dtype=np.float64) for puesto in self.puestos}
+        self._filas = {puesto: np.empty(0, dtype=np.int64) for puesto in self.puestos}
+        if valores is None:
+            self.construir(candidatos)
+        else:
+            self.construir_valores(valores)
+
+    def __len__(self):
+        return self.num_filas
+
+    def construir(self, candidatos):
+        """Reconstruye el índice completo a partir de una lista de candidatos"""
+        candidatos = list(candidatos)
+        valores = np.empty((len(candidatos), len(self.puestos)), dtype=np.float64)
+        for j, puesto in enumerate(self.puestos):
+            valores[:, j] = np.fromiter(
+                (c.get("puntuaciones", {}).get(puesto, 0) for c in candidatos),
+                dtype=np.float64, count=len(candidatos)
+            )
+        self.construir_valores(valores)
+
+    def construir_valores(self, valores):
+        """Reconstruye el índice completo a partir de la matriz filas x puestos de puntuaciones"""
+        self.num_filas = len(valores)
+        filas = np.arange(self.num_filas, dtype=np.int64)
+        for j, puesto in enumerate(self.puestos):
+            puntuaciones = np.ascontiguousarray(valores[:, j], dtype=np.float64)
+            orden = np.lexsort((-filas, puntuaciones))
+            self._puntuaciones[puesto] = puntuaciones[orden]
+            self._filas[puesto] = filas[orden]
+
+    def agregar(self, candidato):
+        """Inserta un candidato nuevo (la fila siguiente) manteniendo el orden; devuelve su fila"""
+        fila = self.num_filas
+        self.extender([candidato])
+        return fila
+
+    def extender(self, candidatos):
+        """Inserta un bloque de candidatos nuevos (las filas siguientes) con una sola fusión por puesto
+
+        El bloque se ordena una vez y se intercala con un searchsorted y un
+        np.insert por puesto: O(N + m log m) en lugar de O(N) por candidato.
+        """
+        candidatos = list(candidatos)
+        if not candidatos:
+            return
+        filas = np.arange(self.num_filas, self.num_filas + len(candidatos), dtype=np.int64)
+        for puesto in self.puestos:
+            puntuaciones = np.fromiter((c.get("puntuaciones", {}).get(puesto, 0) for c in candidatos),
+                                       dtype=np.float64, count=len(candidatos))
+            orden = np.lexsort((-filas, puntuaciones))
+            puntuaciones = puntuaciones[orden]
+            # side="left": entre puntuaciones iguales las filas nuevas van antes (salen después);
+            # np.insert conserva el orden del bloque en las posiciones repetidas
+            posiciones = np.searchsorted(self._puntuaciones[puesto], puntuaciones, side="left")
+            self._puntuaciones[puesto] = np.insert(self._puntuaciones[puesto], posiciones, puntuaciones)
+            self._filas[puesto] = np.insert(self._filas[puesto], posiciones, filas[orden])
+        self.num_filas += len(candidatos)
+
+    def _sobre_umbral(self, puesto, puntuacion_minima, seleccion):
+        """Filas y puntuaciones (ascendentes) >= mínima, solo las marcadas en `seleccion` si se da"""
+        puntuaciones = self._puntuaciones[puesto]
+        inicio = int(np.searchsorted(puntuaciones, puntuacion_minima, side="left"))
+        filas, puntuaciones = self._filas[puesto][inicio:], puntuaciones[inicio:]
+        if seleccion is not None:
+            marcadas = seleccion[filas]
+            filas, puntuaciones = filas[marcadas], puntuaciones[marcadas]
+        return filas, puntuaciones
+
+    def contar(self, puesto, puntuacion_minima, seleccion=None):
+        """Número de candidatos con puntuación >= mínima (búsqueda binaria)
+
+        `seleccion` es un arreglo booleano por fila (p. ej. de IndiceRespuestas)
+        que restringe la cuenta a los candidatos marcados.
+        """
+        if seleccion is None:
+            puntuaciones = self._puntuaciones[puesto]
+            return len(puntuaciones) - int(np.searchsorted(puntuaciones, puntuacion_minima, side="left"))
+        return len(self._sobre_umbral(puesto, puntuacion_minima, seleccion)[0])
+
+    def buscar(self, puesto, puntuacion_minima, limite=None, seleccion=None):
+        """Filas y puntuaciones (de mayor a menor) con puntuación >= mínima, hasta `limite`"""
+        filas, puntuaciones = self._sobre_umbral(puesto, puntuacion_minima, seleccion)
+        inicio = 0 if limite is None else max(0, len(puntuaciones) - limite)
+        return filas[inicio:][::-1], puntuaciones[inicio:][::-1]
@@ -0,0 +1,335 @@
+"""
+Cifrado de los datos sensibles de los candidatos
+Cifrado de sobre: los datos van con AES-GCM y la clave de datos se envuelve con RSA-OAEP.
+Almacén de claves persistente (archivo local o secreto en variable de entorno) cargado una
+vez por proceso, con identificador de clave (kid) para poder rotarlas
+"""
+import argparse
+import base64
+import hashlib
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from functools import lru_cache
+from cryptography.hazmat.primitives.asymmetric import rsa, padding
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from cryptography.hazmat.primitives import serialization, hashes
+from cryptography.hazmat.backends import default_backend
+
+# Secreto con el almacén de claves en JSON (tiene prioridad sobre el archivo)
+VARIABLE_CLAVES = "LINKENCHAMBA_CLAVES"
+RUTA_CLAVES = os.environ.get("LINKENCHAMBA_ARCHIVO_CLAVES", "claves_linkenchamba.json")
+
+RELLENO_OAEP = padding.OAEP(
+    mgf=padding.MGF1(algorithm=hashes.SHA256()),
+    algorithm=hashes.SHA256(),
+    label=None
+)
+
+# Sobre: {"formato", "clave" (clave AES envuelta con RSA), "nonce", "datos"} en base64.
+# Los registros antiguos son una cadena base64 cifrada directamente con RSA (máx. ~190 bytes)
+FORMATO_SOBRE = "sobre-aes-gcm"
+# Registros que comparten una misma clave de datos en cifrar_lote (cada uno con su nonce)
+REGISTROS_POR_CLAVE = 10000
+# Por debajo de este tamaño de lote no compensa repartir el trabajo en hilos
+MINIMO_LOTE_HILOS = 256
+
+def a_base64(datos):
+    return base64.b64encode(datos).decode('ascii')
+
+def mapear(funcion, elementos, hilos=None):
+    """map() en orden, opcionalmente con un pool de hilos (cryptography libera el GIL)"""
+    if not hilos or hilos <= 1 or len(elementos) < MINIMO_LOTE_HILOS:
+        return [funcion(elemento) for elemento in elementos]
+    with ThreadPoolExecutor(max_workers=hilos) as pool:
+        return list(pool.map(funcion, elementos, chunksize=max(1, len(elementos) // (hilos * 4))))
+
+def generar_par_claves_rsa():
+    """Genera un par de claves RSA"""
+    private_key = rsa.generate_private_key(
+        public_exponent=65537,
+        key_size=2048,
+        backend=default_backend()
+    )
+    public_key = private_key.public_key()
+    return private_key, public_key
+
+def serializar_clave_publica(public_key):
+    """Serializa la clave pública a formato PEM"""
+    pem = public_key.public_bytes(
+        encoding=serialization.Encoding.PEM,
+        format=serialization.PublicFormat.SubjectPublicKeyInfo
+    )
+    return pem.decode('utf-8')
+
+def serializar_clave_privada(private_key):
+    """Serializa la clave privada a formato PEM"""
+    pem = private_key.private_bytes(
+        encoding=serialization.Encoding.PEM,
+        format=serialization.PrivateFormat.PKCS8,
+        encryption_algorithm=serialization.NoEncryption()
+    )
+    return pem.decode('utf-8')
+
+@lru_cache(maxsize=32)
+def cargar_clave_publica(public_key_pem):
+    """Objeto de clave pública de un PEM (deserializado una sola vez)"""
+    return serialization.load_pem_public_key(public_key_pem.encode('utf-8'), backend=default_backend())
+
+@lru_cache(maxsize=32)
+def cargar_clave_privada(private_key_pem):
+    """Objeto de clave privada de un PEM (deserializado una sola vez)"""
+    return serialization.load_pem_private_key(
+        private_key_pem.encode('utf-8'),
+        password=None,
+        backend=default_backend()
+    )
+
+def id_clave(public_key):
+    """Identificador corto y estable de una clave: huella SHA-256 de su forma DER"""
+    der = public_key.public_bytes(
+        encoding=serialization.Encoding.DER,
+        format=serialization.PublicFormat.SubjectPublicKeyInfo
+    )
+    return hashlib.sha256(der).hexdigest()[:16]
+
+def cifrar_datos(datos, public_key_pem):
+    """Cifra datos usando una clave pública RSA"""
+    datos_bytes = json.dumps(datos).encode('utf-8')
+    encrypted = cargar_clave_publica(public_key_pem).encrypt(datos_bytes, RELLENO_OAEP)
+    return base64.b64encode(encrypted).decode('utf-8')
+
+def descifrar_datos(datos_cifrados, private_key_pem):
+    """Descifra datos usando una clave privada RSA"""
+    encrypted_bytes = base64.b64decode(datos_cifrados)
+    decrypted = cargar_clave_privada(private_key_pem).decrypt(encrypted_bytes, RELLENO_OAEP)
+    return json.loads(decrypted.decode('utf-8'))
+
+def firma_archivo(ruta):
+    """(mtime, tamaño, inodo) de un archivo, o None si no existe"""
+    try:
+        estado = os.stat(ruta)
+    except FileNotFoundError:
+        return None
+    return (estado.st_mtime_ns, estado.st_size, estado.st_ino)
+
+class AlmacenClaves:
+    """Claves RSA de la aplicación: una activa para cifrar y las anteriores para descifrar
+
+    Formato (archivo o variable de entorno):
+    {"activa": kid, "claves": {kid: {"privada": PEM, "creada": ISO}}}
+    Cada candidato guarda el kid junto a "datos_cifrados" ("clave_id"), así que
+    rotar la clave no impide descifrar lo ya cifrado. Antes de elegir la clave
+    activa se comprueba si el archivo cambió (rotación en otro proceso).
+    """
+    def __init__(self, contenido, ruta=None, firma=None):
+        self.ruta = ruta
+        self.activa = contenido["activa"]
+        self.claves = contenido["claves"]
+        self._firma = firma
+        self._candado = threading.Lock()
+
+    @classmethod
+    def cargar(cls, ruta=RUTA_CLAVES):
+        """Carga desde $LINKENCHAMBA_CLAVES o desde el archivo; si no hay ninguno crea el archivo"""
+        secreto = os.environ.get(VARIABLE_CLAVES)
+        if secreto:
+            return cls(json.loads(secreto))
+        if not os.path.exists(ruta):
+            almacen = cls({"activa": None, "claves": {}}, ruta)
+            almacen._agregar_clave()
+            # Si otro proceso lo creó a la vez, gana el primero y se usa su clave
+            temporal = almacen._escribir_temporal()
+            try:
+                os.link(temporal, ruta)
+            except FileExistsError:
+                pass
+            finally:
+                os.remove(temporal)
+        firma = firma_archivo(ruta)
+        with open(ruta, "r", encoding="utf-8") as f:
+            return cls(json.load(f), ruta, firma)
+
+    def _agregar_clave(self):
+        """Genera una clave nueva y la deja activa; devuelve su kid"""
+        private_key, public_key = generar_par_claves_rsa()
+        kid = id_clave(public_key)
+        self.claves[kid] = {
+            "privada": serializar_clave_privada(private_key),
+            "creada": datetime.now().isoformat()
+        }
+        self.activa = kid
+        return kid
+
+    def _escribir_temporal(self):
+        """Escribe el almacén en un temporal legible solo por el usuario (0600); devuelve su ruta"""
+        temporal = f"{self.ruta}.{os.getpid()}.tmp"
+        descriptor = os.open(temporal, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(descriptor, "w", encoding="utf-8") as f:
+            json.dump({"activa": self.activa, "claves": self.claves}, f, indent=2)
+        return temporal
+
+    def recargar(self):
+        """Relee el archivo (p. ej. tras una rotación hecha por otro proceso)"""
+        if self.ruta is not None and os.path.exists(self.ruta):
+            # La firma se toma antes de leer: un cambio posterior se detecta en la siguiente comprobación
+            firma = firma_archivo(self.ruta)
+            with open(self.ruta, "r", encoding="utf-8") as f:
+                contenido = json.load(f)
+            with self._candado:
+                self.activa = contenido["activa"]
+                self.claves = contenido["claves"]
+                self._firma = firma
+
+    def _al_dia(self):
+        """Relee el archivo si cambió desde la última lectura (un os.stat por llamada)"""
+        if self.ruta is not None and firma_archivo(self.ruta) != self._firma:
+            self.recargar()
+
+    def rotar(self):
+        """Genera una clave nueva, la deja activa y conserva las anteriores; devuelve su kid"""
+        if self.ruta is None:
+            raise ValueError(f"Las claves vienen de ${VARIABLE_CLAVES}: rota el secreto en lugar del archivo")
+        # Se parte del archivo actual para no perder claves agregadas por otro proceso
+        self._al_dia()
+        with self._candado:
+            kid = self._agregar_clave()
+            os.replace(self._escribir_temporal(), self.ruta)
+            self._firma = firma_archivo(self.ruta)
+        return kid
+
+    def clave_privada(self, kid=None):
+        """Objeto de clave privada (cacheado) de un kid, por defecto el activo"""
+        if kid is None:
+            self._al_dia()
+        kid = kid or self.activa
+        if kid not in self.claves:
+            self.recargar()
+        if kid not in self.claves:
+            raise KeyError(f"Clave desconocida: {kid}")
+        return cargar_clave_privada(self.claves[kid]["privada"])
+
+    def clave_publica_pem(self, kid=None):
+        """PEM de la clave pública de un kid, por defecto el activo"""
+        return serializar_clave_publica(self.clave_privada(kid).public_key())
+
+    def cifrar(self, datos):
+        """Cifra con la clave activa; devuelve (kid, sobre)"""
+        return self.cifrar_lote([datos])[0]
+
+    def descifrar(self, datos_cifrados, kid=None):
+        """Descifra un sobre (o un registro antiguo solo RSA) con la clave indicada (sin kid: la activa)"""
+        return self.descifrar_lote([(datos_cifrados, kid)])[0]
+
+    def cifrar_lote(self, lista_datos, hilos=None):
+        """Cifra varios registros con la clave activa; devuelve [(kid, sobre)] en el mismo orden
+
+        Cada REGISTROS_POR_CLAVE registros comparten una clave de datos AES-256,
+        así que el lote cuesta una operación RSA por clave y no por registro. El
+        kid va como dato asociado de AES-GCM: un sobre no se descifra con otra clave.
+        """
+        self._al_dia()
+        kid = self.activa
+        clave_publica = self.clave_privada(kid).public_key()
+        asociado = kid.encode('ascii')
+        lista_datos = list(lista_datos)
+        resultado = []
+        for desde in range(0, len(lista_datos), REGISTROS_POR_CLAVE):
+            clave_datos = AESGCM.generate_key(bit_length=256)
+            clave_envuelta = a_base64(clave_publica.encrypt(clave_datos, RELLENO_OAEP))
+            aes = AESGCM(clave_datos)
+
+            def cifrar_uno(datos):
+                nonce = os.urandom(12)
+                cifrado = aes.encrypt(nonce, json.dumps(datos).encode('utf-8'), asociado)
+                return kid, {
+                    "formato": FORMATO_SOBRE,
+                    "clave": clave_envuelta,
+                    "nonce": a_base64(nonce),
+                    "datos": a_base64(cifrado)
+                }
+
+            resultado.extend(mapear(cifrar_uno, lista_datos[desde:desde + REGISTROS_POR_CLAVE], hilos))
+        return resultado
+
+    def descifrar_lote(self, lista_cifrados, hilos=None):
+        """Descifra [(datos_cifrados, kid)]; devuelve los datos en el mismo orden
+
+        Cada clave de datos envuelta se desenvuelve con RSA una sola vez para
+        todo el lote. Admite sobres y registros antiguos cifrados solo con RSA.
+        """
+        lista_cifrados = list(lista_cifrados)
+        claves_datos = {}
+        for datos_cifrados, kid in lista_cifrados:
+            if isinstance(datos_cifrados, dict):
+                clave = (kid or self.activa, datos_cifrados["clave"])
+                if clave not in claves_datos:
+                    claves_datos[clave] = None
+        pendientes = list(claves_datos)
+        desenvueltas = mapear(
+            lambda clave: AESGCM(self.clave_privada(clave[0]).decrypt(base64.b64decode(clave[1]), RELLENO_OAEP)),
+            pendientes, hilos
+        )
+        claves_datos = dict(zip(pendientes, desenvueltas))
+
+        def descifrar_uno(elemento):
+            datos_cifrados, kid = elemento
+            kid = kid or self.activa
+            if not isinstance(datos_cifrados, dict):
+                decrypted = self.clave_privada(kid).decrypt(base64.b64decode(datos_cifrados), RELLENO_OAEP)
+                return json.loads(decrypted.decode('utf-8'))
+            if datos_cifrados.get("formato") != FORMATO_SOBRE:
+                raise ValueError(f"Formato de cifrado desconocido: {datos_cifrados.get('formato')}")
+            aes = claves_datos[(kid, datos_cifrados["clave"])]
+            plano = aes.decrypt(
+                base64.b64decode(datos_cifrados["nonce"]),
+                base64.b64decode(datos_cifrados["datos"]),
+                kid.encode('ascii')
+            )
+            return json.loads(plano.decode('utf-8'))
+
+        return mapear(descifrar_uno, lista_cifrados, hilos)
+
+    def cifrar_candidato(self, candidato, datos):
+        """Guarda `datos` cifrados en el candidato junto con el kid usado"""
+        candidato["clave_id"], candidato["datos_cifrados"] = self.cifrar(datos)
+        return candidato
+
+    def descifrar_candidato(self, candidato):
+        """Datos sensibles descifrados de un candidato"""
+        return self.descifrar(candidato["datos_cifrados"], candidato.get("clave_id"))
+
+_almacen_claves = None
+_candado_almacen = threading.Lock()
+
+def obtener_almacen_claves():
+    """Almacén de claves del proceso (se carga una sola vez)"""
+    global _almacen_claves
+    with _candado_almacen:
+        if _almacen_claves is None:
+            _almacen_claves = AlmacenClaves.cargar()
+        return _almacen_claves
+
+def main():
+    """Administración del almacén de claves"""
+    parser = argparse.ArgumentParser(description="Almacén de claves RSA de LinkenChamba")
+    parser.add_argument("accion", choices=["estado", "rotar", "exportar"],
+                        help="exportar imprime el JSON para usarlo como secreto en $" + VARIABLE_CLAVES)
+    args = parser.parse_args()
+
+    almacen = obtener_almacen_claves()
+    if args.accion == "rotar":
+        anterior = almacen.activa
+        print(f"[OK] Nueva clave activa {almacen.rotar()} (la anterior, {anterior}, se conserva para descifrar)")
+    elif args.accion == "exportar":
+        print(json.dumps({"activa": almacen.activa, "claves": almacen.claves}))
+    else:
+        origen = f"${VARIABLE_CLAVES}" if almacen.ruta is None else almacen.ruta
+        print(f"Claves en {origen}: {len(almacen.claves)}; activa {almacen.activa}")
+        for kid, clave in almacen.claves.items():
+            print(f"   {kid} creada {clave['creada']}")
+
+if __name__ == "__main__":
+    main()
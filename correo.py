@@ -0,0 +1,179 @@
+"""
+Envío de correos de LinkenChamba con una conexión SMTP reutilizable
+Mantiene una sesión autenticada abierta entre mensajes y reconecta si se cae
+"""
+import os
+import smtplib
+import threading
+import time
+from email.mime.text import MIMEText
+from email.mime.multipart import MIMEMultipart
+
+# Segundos sin uso tras los que se comprueba la conexión con NOOP antes de enviar
+INACTIVIDAD_NOOP = 30
+TIEMPO_ESPERA_SMTP = 30
+
+class ConfiguracionSMTP:
+    """Parámetros del servidor SMTP tomados de las variables de entorno
+
+    SMTP_STARTTLS=0 y SMTP_AUTENTICAR=0 permiten usar un servidor local de
+    prueba sin TLS ni credenciales.
+    """
+    def __init__(self, entorno=None):
+        entorno = os.environ if entorno is None else entorno
+        self.servidor = entorno.get("SMTP_SERVER", "smtp.gmail.com")
+        self.puerto = int(entorno.get("SMTP_PORT", "587"))
+        self.usuario = entorno.get("EMAIL_USUARIO", "")
+        self.password = entorno.get("EMAIL_PASSWORD", "")
+        self.starttls = entorno.get("SMTP_STARTTLS", "1") != "0"
+        self.autenticar = entorno.get("SMTP_AUTENTICAR", "1") != "0"
+        self.remitente = entorno.get("EMAIL_REMITENTE") or self.usuario or "linkenchamba@localhost"
+
+    def completa(self):
+        """Hay credenciales (o el servidor no las pide)"""
+        return not self.autenticar or bool(self.usuario and self.password)
+
+    def clave(self):
+        return (self.servidor, self.puerto, self.usuario, self.password, self.starttls, self.autenticar)
+
+def construir_mensaje(remitente, destinatario, asunto, cuerpo, es_html=False):
+    """Mensaje MIME listo para enviar"""
+    msg = MIMEMultipart('alternative')
+    msg['Subject'] = asunto
+    msg['From'] = remitente
+    msg['To'] = destinatario
+
+    if es_html:
+        msg.attach(MIMEText(cuerpo, 'html'))
+    else:
+        msg.attach(MIMEText(cuerpo, 'plain'))
+    return msg
+
+def mensaje_contacto(candidato, puesto, puntuacion):
+    """Asunto y cuerpo del correo de contacto a un candidato para un puesto"""
+    asunto = f"Oportunidad laboral - {puesto}"
+    cuerpo = f"""
+    Hola {candidato['nombre']},
+
+    Hemos revisado tu perfil y nos interesa contactarte para una oportunidad como {puesto}.
+
+    Tu puntuación para este puesto es: {puntuacion}%
+
+    Por favor, contáctanos para más información.
+
+    Saludos,
+    Equipo LinkenChamba
+    """
+    return asunto, cuerpo
+
+class TransporteCorreo:
+    """Conexión SMTP autenticada que se reutiliza entre mensajes (segura entre hilos)
+
+    La conexión se abre con el primer envío (STARTTLS y login una sola vez). Si
+    lleva un rato sin usarse se comprueba con NOOP; si el envío falla por la
+    conexión se reconecta y se reintenta una vez. Los rechazos del servidor a
+    un destinatario concreto no provocan reconexión.
+    """
+    def __init__(self, configuracion=None):
+        self.configuracion = configuracion or ConfiguracionSMTP()
+        self._smtp = None
+        self._ultimo_uso = 0.0
+        self._candado = threading.Lock()
+        self.conexiones_abiertas = 0
+        self.mensajes_enviados = 0
+
+    def _conectar(self):
+        config = self.configuracion
+        smtp = smtplib.SMTP(config.servidor, config.puerto, timeout=TIEMPO_ESPERA_SMTP)
+        try:
+            smtp.ehlo()
+            if config.starttls:
+                smtp.starttls()
+                smtp.ehlo()
+            if config.autenticar:
+                smtp.login(config.usuario, config.password)
+        except Exception:
+            smtp.close()
+            raise
+        self._smtp = smtp
+        self.conexiones_abiertas += 1
+
+    def _descartar(self):
+        if self._smtp is not None:
+            try:
+                self._smtp.close()
+            except Exception:
+                pass
+            self._smtp = None
+
+    def _conexion_viva(self):
+        if self._smtp is None:
+            return False
+        if time.monotonic() - self._ultimo_uso < INACTIVIDAD_NOOP:
+            return True
+        try:
+            return self._smtp.noop()[0] == 250
+        except (smtplib.SMTPException, OSError):
+            return False
+
+    def _enviar(self, mensaje):
+        """Envía con la conexión actual; reconecta y reintenta una vez si la conexión falló"""
+        for intento in range(2):
+            if not self._conexion_viva():
+                self._descartar()
+                self._conectar()
+            try:
+                self._smtp.send_message(mensaje)
+                self._ultimo_uso = time.monotonic()
+                self.mensajes_enviados += 1
+                return
+            except (smtplib.SMTPRecipientsRefused, smtplib.SMTPSenderRefused, smtplib.SMTPDataError):
+                self._ultimo_uso = time.monotonic()
+                raise
+            except (smtplib.SMTPException, OSError):
+                self._descartar()
+                if intento:
+                    raise
+
+    def enviar(self, destinatario, asunto, cuerpo, es_html=False):
+        """Envía un correo; lanza la excepción de SMTP si no se pudo"""
+        mensaje = construir_mensaje(self.configuracion.remitente, destinatario, asunto, cuerpo, es_html)
+        with self._candado:
+            self._enviar(mensaje)
+
+    def enviar_lote(self, correos):
+        """Envía [(destinatario, asunto, cuerpo)] por la misma conexión; devuelve [(destinatario, error o None)]"""
+        resultados = []
+        with self._candado:
+            for destinatario, asunto, cuerpo in correos:
+                mensaje = construir_mensaje(self.configuracion.remitente, destinatario, asunto, cuerpo)
+                try:
+                    self._enviar(mensaje)
+                    resultados.append((destinatario, None))
+                except Exception as e:
+                    resultados.append((destinatario, e))
+        return resultados
+
+    def cerrar(self):
+        """Cierra la sesión SMTP (QUIT)"""
+        with self._candado:
+            if self._smtp is not None:
+                try:
+                    self._smtp.quit()
+                except Exception:
+                    pass
+            self._descartar()
+
+_transporte = None
+_candado_transporte = threading.Lock()
+
+def obtener_transporte():
+    """Transporte del proceso; se crea de nuevo si cambia la configuración del entorno"""
+    global _transporte
+    configuracion = ConfiguracionSMTP()
+    with _candado_transporte:
+        if _transporte is None or _transporte.configuracion.clave() != configuracion.clave():
+            if _transporte is not None:
+                _transporte.cerrar()
+            _transporte = TransporteCorreo(configuracion)
+        return _transporte
@@ -0,0 +1,101 @@
+"""
+Opciones canónicas del cuestionario de LinkenChamba
+Usadas por el generador de base de datos y por el codificador de características
+"""
+
+# Opciones del cuestionario
+HABILIDADES_PRACTICAS = [
+    "Atender clientes en mostrador o por teléfono",
+    "Manejar caja registradora y dar cambio",
+    "Organizar archivos o productos en inventario",
+    "Usar computadora para escribir documentos básicos",
+    "Empacar productos y preparar pedidos",
+    "Limpiar y mantener áreas de trabajo ordenadas",
+    "Ayudar en preparación de productos o materiales",
+    "Tomar mensajes y recados con claridad",
+    "Resolver quejas simples de clientes",
+    "Ayudar a compañeros con sus tareas cuando es necesario"
+]
+
+HERRAMIENTAS = [
+    "Computadora (Windows, Internet, email)",
+    "Teléfono y sistemas de mensajería",
+    "Caja registradora o punto de venta",
+    "Herramientas básicas (martillo, destornillador, etc.)",
+    "Equipo de cocina o restaurante",
+    "Vehículo para entregas",
+    "Ninguno de los anteriores, pero aprendo rápido"
+]
+
+AMBIENTES = [
+    "Me gusta el movimiento y estar activo todo el día",
+    "Prefiero trabajo tranquilo y organizado",
+    "Disfruto interactuar con mucha gente",
+    "Trabajo mejor concentrado en una sola tarea",
+    "Me adapto fácilmente a cualquier ambiente"
+]
+
+ACTIVIDADES = [
+    "Ayudar directamente a clientes o personas",
+    "Crear o arreglar cosas con las manos",
+    "Organizar y poner todo en orden",
+    "Aprender cosas nuevas constantemente",
+    "Resolver problemas prácticos inmediatos"
+]
+
+CONOCIMIENTOS = [
+    "Matemáticas (hacer cuentas, medir, calcular precios)",
+    "Lectura rápida y comprensión de instrucciones",
+    "Escritura clara para llenar formatos o tomar notas",
+    "Conceptos básicos de ventas o servicio al cliente",
+    "Conocimiento de productos específicos (comida, ropa, materiales, etc.)",
+    "Ninguna en particular, pero aprendo viendo y practicando"
+]
+
+NIVELES = ["Nada", "Básico", "Intermedio", "Avanzado"]
+
+TIPOS_TRABAJO = [
+    "Trabajo de medio tiempo (4-6 horas diarias)",
+    "Trabajo de tiempo completo (8 horas)",
+    "Trabajo por proyectos o temporal",
+    "Aprendizaje o capacitación con salario básico",
+    "Cualquier opción mientras pueda aprender y crecer"
+]
+
+LOGROS = [
+    "Aprender un oficio o skill específico",
+    "Tener un ingreso estable para mis gastos",
+    "Ganar experiencia para mejor empleo después",
+    "Desarrollarme dentro de esta empresa",
+    "Descubrir en qué soy bueno profesionalmente"
+]
+
+REACCIONES = [
+    "Pregunto a alguien con más experiencia",
+    "Busco la solución yo mismo investigando",
+    "Organizo la información para entender mejor",
+    "Actúo inmediatamente con lo que sé",
+    "Mantengo la calma y evalúo opciones"
+]
+
+DESTACA = [
+    "Cuando hay que ayudar a otros a entenderse",
+    "Cuando hay que encontrar errores o detalles",
+    "Cuando hay que aprender algo nuevo rápido",
+    "Cuando hay que mantener el orden en el caos",
+    "Cuando hay que motivar al equipo",
+    "No estoy seguro, necesito oportunidad para descubrirlo"
+]
+
+MOTIVACIONES = [
+    "Necesidad económica inmediata",
+    "Aprender y desarrollar habilidades",
+    "Estabilidad y crecimiento a largo plazo",
+    "Ambiente de trabajo positivo",
+    "Todas las anteriores"
+]
+
+# Forma de cada respuesta: lista de textos (selección múltiple), texto (selección única
+# o libre) y "niveles", un objeto {tema: nivel}
+CAMPOS_MULTIPLES = ["habilidades_practicas", "herramientas", "actividades", "conocimientos", "logros", "destaca"]
+CAMPOS_TEXTO = ["ambiente", "tipo_trabajo", "reaccion", "motivacion", "unico"]
@@ -0,0 +1,228 @@
+"""
+Entrenamiento de la red neuronal de puntuación (55->30->15->5) con resultados reales de contratación
+Lee las matrices de características y objetivos desde disco por bloques y guarda el artefacto de pesos
+"""
+import argparse
+from datetime import datetime
+import numpy as np
+from formato_candidatos import cargar_base_datos
+from red_neuronal_puntuacion import (
+    CAPAS, NUM_CARACTERISTICAS, cargar_pesos, extraer_caracteristicas_lote,
+    guardar_pesos, pesos_iniciales
+)
+
+# Bytes aproximados por fila durante el entrenamiento: entrada, objetivos,
+# activaciones y gradientes de las tres capas en float64
+BYTES_POR_FILA = 8 * (NUM_CARACTERISTICAS + 5 + 2 * (30 + 15 + 5))
+
+def sigmoid(x):
+    """Función de activación sigmoide (misma que la red de puntuación)"""
+    return 1 / (1 + np.exp(-np.clip(x, -500, 500)))
+
+def exportar_caracteristicas(lista_respuestas, ruta, total, tam_bloque=50000):
+    """Escribe en un .npy la matriz N x 55 de características sin tenerla completa en memoria"""
+    X = np.lib.format.open_memmap(ruta, mode="w+", dtype=np.float64, shape=(total, NUM_CARACTERISTICAS))
+    bloque = []
+    inicio = 0
+    for respuestas in lista_respuestas:
+        bloque.append(respuestas)
+        if len(bloque) == tam_bloque:
+            X[inicio:inicio + len(bloque)] = extraer_caracteristicas_lote(bloque)
+            inicio += len(bloque)
+            bloque = []
+    if bloque:
+        X[inicio:inicio + len(bloque)] = extraer_caracteristicas_lote(bloque)
+        inicio += len(bloque)
+    X.flush()
+    if inicio != total:
+        raise ValueError(f"Se esperaban {total} candidatos y se recibieron {inicio}")
+
+def filas_por_bloque(memoria_mb, tam_lote):
+    """Número de filas que se leen de disco a la vez para respetar el presupuesto de memoria"""
+    filas = int(memoria_mb * 1024 * 1024 // BYTES_POR_FILA)
+    return max(tam_lote, filas - filas % tam_lote)
+
+def dividir_bloques(num_filas, filas_bloque, fraccion_validacion, rng):
+    """Reparte los bloques de filas entre entrenamiento y validación"""
+    inicios = np.arange(0, num_filas, filas_bloque)
+    rng.shuffle(inicios)
+    num_validacion = int(round(len(inicios) * fraccion_validacion))
+    if fraccion_validacion > 0 and len(inicios) > 1:
+        num_validacion = max(1, num_validacion)
+    num_validacion = min(num_validacion, len(inicios) - 1)
+    return inicios[num_validacion:], inicios[:num_validacion]
+
+def _dividir_filas(num_filas, fraccion_validacion, rng):
+    """División por filas cuando todo el conjunto cabe en un solo bloque"""
+    indices = rng.permutation(num_filas)
+    num_validacion = int(round(num_filas * fraccion_validacion))
+    return np.sort(indices[num_validacion:]), np.sort(indices[:num_validacion])
+
+def _propagar(pesos, X):
+    """Propagación hacia adelante guardando las activaciones de cada capa"""
+    A1 = sigmoid(X @ pesos["W1"] + pesos["b1"])
+    A2 = sigmoid(A1 @ pesos["W2"] + pesos["b2"])
+    A3 = sigmoid(A2 @ pesos["W3"] + pesos["b3"])
+    return A1, A2, A3
+
+def perdida_entropia_cruzada(A3, Y):
+    """Suma de la entropía cruzada binaria de las salidas sigmoide"""
+    A3 = np.clip(A3, 1e-12, 1 - 1e-12)
+    return float(-np.sum(Y * np.log(A3) + (1 - Y) * np.log(1 - A3)))
+
+def _gradientes(pesos, X, Y):
+    """Retropropagación vectorizada de un mini-lote; devuelve gradientes y pérdida"""
+    A1, A2, A3 = _propagar(pesos, X)
+    m = X.shape[0]
+
+    # Con sigmoide y entropía cruzada el error de salida es A3 - Y
+    dZ3 = (A3 - Y) / m
+    dZ2 = (dZ3 @ pesos["W3"].T) * A2 * (1 - A2)
+    dZ1 = (dZ2 @ pesos["W2"].T) * A1 * (1 - A1)
+
+    gradientes = {
+        "W3": A2.T @ dZ3, "b3": dZ3.sum(axis=0),
+        "W2": A1.T @ dZ2, "b2": dZ2.sum(axis=0),
+        "W1": X.T @ dZ1, "b1": dZ1.sum(axis=0),
+    }
+    return gradientes, perdida_entropia_cruzada(A3, Y)
+
+def _leer_filas(datos, inicio, filas_bloque, indices=None):
+    """Copia a memoria un bloque de filas (o un subconjunto de índices) del arreglo en disco"""
+    if indices is not None:
+        return np.asarray(datos[indices], dtype=np.float64)
+    return np.asarray(datos[inicio:inicio + filas_bloque], dtype=np.float64)
+
+def entrenar(X, Y, pesos=None, epocas=50, tam_lote=256, tasa=0.5, momento=0.9,
+             paciencia=5, fraccion_validacion=0.1, memoria_mb=256, semilla=0, informar=print):
+    """Entrena la red con descenso de gradiente por mini-lotes y parada temprana
+
+    X (N x 55) e Y (N x 5, resultados de contratación en [0, 1]) pueden ser
+    arreglos mapeados desde disco: se leen por bloques acotados por memoria_mb.
+    Devuelve los mejores pesos según la pérdida de validación y el historial.
+    """
+    if X.shape[0] != Y.shape[0]:
+        raise ValueError("X e Y deben tener el mismo número de filas")
+    rng = np.random.default_rng(semilla)
+    pesos = {capa: np.array(valor, dtype=np.float64) for capa, valor in (pesos or pesos_iniciales()).items()}
+    salidas = pesos["W3"].shape[1]
+    if X.shape[1] != NUM_CARACTERISTICAS or Y.shape[1] != salidas:
+        raise ValueError(f"Se esperaba X de {NUM_CARACTERISTICAS} columnas e Y de {salidas}")
+    velocidad = {capa: np.zeros_like(valor) for capa, valor in pesos.items()}
+
+    num_filas = X.shape[0]
+    filas_bloque = filas_por_bloque(memoria_mb, tam_lote)
+    if num_filas <= filas_bloque:
+        # Todo cabe en memoria: un único bloque dividido por filas
+        filas_entrenamiento, filas_validacion = _dividir_filas(num_filas, fraccion_validacion, rng)
+        bloques_entrenamiento = [(0, filas_entrenamiento)]
+        bloques_validacion = [(0, filas_validacion)] if len(filas_validacion) else []
+    else:
+        inicios_entrenamiento, inicios_validacion = dividir_bloques(num_filas, filas_bloque, fraccion_validacion, rng)
+        bloques_entrenamiento = [(inicio, None) for inicio in inicios_entrenamiento]
+        bloques_validacion = [(inicio, None) for inicio in inicios_validacion]
+
+    mejor_perdida = np.inf
+    mejores_pesos = {capa: valor.copy() for capa, valor in pesos.items()}
+    epocas_sin_mejora = 0
+    historial = []
+
+    for epoca in range(1, epocas + 1):
+        # Entrenamiento: bloques en orden aleatorio y mini-lotes barajados dentro de cada bloque
+        perdida_total, filas_vistas = 0.0, 0
+        for posicion in rng.permutation(len(bloques_entrenamiento)):
+            inicio, indices = bloques_entrenamiento[posicion]
+            Xb = _leer_filas(X, inicio, filas_bloque, indices)
+            Yb = _leer_filas(Y, inicio, filas_bloque, indices)
+            orden = rng.permutation(Xb.shape[0])
+            for desde in range(0, len(orden), tam_lote):
+                lote = orden[desde:desde + tam_lote]
+                gradientes, perdida = _gradientes(pesos, Xb[lote], Yb[lote])
+                for capa in CAPAS:
+                    velocidad[capa] = momento * velocidad[capa] - tasa * gradientes[capa]
+                    pesos[capa] += velocidad[capa]
+                perdida_total += perdida
+                filas_vistas += len(lote)
+        perdida_entrenamiento = perdida_total / max(1, filas_vistas)
+
+        # Validación: solo propagación hacia adelante
+        perdida_total, filas_vistas = 0.0, 0
+        for inicio, indices in bloques_validacion:
+            Xb = _leer_filas(X, inicio, filas_bloque, indices)
+            Yb = _leer_filas(Y, inicio, filas_bloque, indices)
+            perdida_total += perdida_entropia_cruzada(_propagar(pesos, Xb)[2], Yb)
+            filas_vistas += Xb.shape[0]
+        perdida_validacion = perdida_total / filas_vistas if filas_vistas else perdida_entrenamiento
+
+        historial.append({
+            "epoca": epoca,
+            "perdida_entrenamiento": perdida_entrenamiento,
+            "perdida_validacion": perdida_validacion,
+        })
+        informar(f"   Época {epoca}: pérdida entrenamiento {perdida_entrenamiento:.5f}, "
+                 f"validación {perdida_validacion:.5f}")
+
+        # Parada temprana
+        if perdida_validacion < mejor_perdida:
+            mejor_perdida = perdida_validacion
+            mejores_pesos = {capa: valor.copy() for capa, valor in pesos.items()}
+            epocas_sin_mejora = 0
+        else:
+            epocas_sin_mejora += 1
+            if epocas_sin_mejora >= paciencia:
+                informar(f"   Parada temprana: {paciencia} épocas sin mejorar la validación")
+                break
+
+    return mejores_pesos, historial
+
+def main():
+    """Entrena la red a partir de matrices .npy y guarda el artefacto de pesos"""
+    parser = argparse.ArgumentParser(description="Entrenamiento de la red neuronal de puntuación")
+    parser.add_argument("--caracteristicas", required=True, help="Matriz N x 55 de características (.npy)")
+    parser.add_argument("--objetivos", help="Matriz N x 5 de resultados de contratación (.npy)")
+    parser.add_argument("--exportar-json", metavar="ARCHIVO",
+                        help="Solo escribe --caracteristicas a partir de una base de datos de candidatos")
+    parser.add_argument("--salida", default="modelo_puntuacion.npz", help="Artefacto de pesos a escribir")
+    parser.add_argument("--version", default=None, help="Versión del modelo (por defecto, fecha y hora)")
+    parser.add_argument("--inicial", default=None, help="Artefacto de pesos desde el que continuar")
+    parser.add_argument("--epocas", type=int, default=50)
+    parser.add_argument("--tam-lote", type=int, default=256)
+    parser.add_argument("--tasa", type=float, default=0.5)
+    parser.add_argument("--momento", type=float, default=0.9)
+    parser.add_argument("--paciencia", type=int, default=5)
+    parser.add_argument("--validacion", type=float, default=0.1, help="Fracción para validación")
+    parser.add_argument("--memoria-mb", type=float, default=256, help="Presupuesto de memoria por bloque")
+    parser.add_argument("--semilla", type=int, default=0)
+    args = parser.parse_args()
+
+    if args.exportar_json:
+        candidatos = cargar_base_datos(args.exportar_json)["candidatos"]
+        exportar_caracteristicas(
+            (c.get("respuestas_cuestionario", {}) for c in candidatos), args.caracteristicas, len(candidatos)
+        )
+        print(f"[OK] {len(candidatos)} filas de características escritas en {args.caracteristicas}")
+        return
+    if not args.objetivos:
+        parser.error("--objetivos es obligatorio para entrenar")
+
+    # Los arreglos se mapean desde disco; solo se leen bloques acotados
+    X = np.load(args.caracteristicas, mmap_mode="r")
+    Y = np.load(args.objetivos, mmap_mode="r")
+    pesos = cargar_pesos(args.inicial)[0] if args.inicial else None
+
+    print(f"Entrenando con {X.shape[0]} filas "
+          f"({filas_por_bloque(args.memoria_mb, args.tam_lote)} filas por bloque)...")
+    mejores_pesos, historial = entrenar(
+        X, Y, pesos=pesos, epocas=args.epocas, tam_lote=args.tam_lote, tasa=args.tasa,
+        momento=args.momento, paciencia=args.paciencia, fraccion_validacion=args.validacion,
+        memoria_mb=args.memoria_mb, semilla=args.semilla
+    )
+
+    version = args.version or f"entrenado-{datetime.now().strftime('%Y%m%d%H%M%S')}"
+    guardar_pesos(args.salida, mejores_pesos, version)
+    mejor = min(historial, key=lambda h: h["perdida_validacion"])
+    print(f"\n[OK] Modelo {version} guardado en {args.salida}")
+    print(f"   Mejor época: {mejor['epoca']} (validación {mejor['perdida_validacion']:.5f})")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Estadísticas de puntuaciones de la pestaña "Estadísticas generales"
+Matriz candidatos x puestos en NumPy con agregados vectorizados y cacheados
+"""
+import numpy as np
+from red_neuronal_puntuacion import PUESTOS
+
+PERCENTILES = (25, 50, 75, 90)
+NUM_TOP = 5
+INTERVALOS_HISTOGRAMA = 10
+
+class MatrizPuntuaciones:
+    """Puntuaciones de los candidatos en una matriz (filas = candidatos, columnas = puestos)
+
+    La matriz se construye una vez y crece al registrar candidatos, con
+    capacidad que se duplica para que insertar sea O(1) amortizado. Cada
+    inserción invalida los agregados cacheados. `valores` funciona como en
+    IndicePuntuaciones.
+    """
+    def __init__(self, candidatos=(), puestos=None, valores=None):
+        self.puestos = list(PUESTOS.keys()) if puestos is None else list(puestos)
+        self._estadisticas = None
+        if valores is not None:
+            self.num_filas = len(valores)
+            self._datos = np.zeros((max(self.num_filas, 16), len(self.puestos)), dtype=np.float64)
+            self._datos[:self.num_filas] = valores
+            return
+        candidatos = list(candidatos)
+        self.num_filas = len(candidatos)
+        self._datos = np.zeros((max(self.num_filas, 16), len(self.puestos)), dtype=np.float64)
+        for j, puesto in enumerate(self.puestos):
+            self._datos[:self.num_filas, j] = np.fromiter(
+                (c.get("puntuaciones", {}).get(puesto, 0) for c in candidatos),
+                dtype=np.float64, count=self.num_filas
+            )
+
+    def __len__(self):
+        return self.num_filas
+
+    @property
+    def valores(self):
+        """Vista de la matriz con solo las filas ocupadas"""
+        return self._datos[:self.num_filas]
+
+    def agregar(self, candidato):
+        """Agrega la fila de un candidato nuevo; devuelve su fila"""
+        if self.num_filas == len(self._datos):
+            datos = np.zeros((2 * len(self._datos), len(self.puestos)), dtype=np.float64)
+            datos[:self.num_filas] = self._datos[:self.num_filas]
+            self._datos = datos
+        puntuaciones = candidato.get("puntuaciones", {})
+        self._datos[self.num_filas] = [puntuaciones.get(puesto, 0) for puesto in self.puestos]
+        self.num_filas += 1
+        self._estadisticas = None
+        return self.num_filas - 1
+
+    def estadisticas(self):
+        """Agregados de esta matriz, calculados solo si cambió desde la última vez"""
+        if self._estadisticas is None:
+            filas = np.arange(self.num_filas, dtype=np.int64)
+            self._estadisticas = calcular_estadisticas(self.valores, filas, self.puestos)
+        return self._estadisticas
+
+def top_filas(columna, filas, k=NUM_TOP):
+    """Las k mejores (fila, puntuación), de mayor a menor y a igual puntuación por fila
+
+    argpartition encuentra el k-ésimo valor en O(n); solo se ordenan los que
+    lo igualan o superan, con el mismo desempate que sorted(..., reverse=True).
+    """
+    if len(columna) == 0:
+        return []
+    k = min(k, len(columna))
+    umbral = columna[np.argpartition(-columna, k - 1)[k - 1]]
+    seleccion = np.flatnonzero(columna >= umbral)
+    orden = np.lexsort((filas[seleccion], -columna[seleccion]))[:k]
+    elegidas = seleccion[orden]
+    return list(zip(filas[elegidas].tolist(), columna[elegidas].tolist()))
+
+def calcular_estadisticas(valores, filas, puestos):
+    """Resumen, percentiles, histograma y top por puesto de una matriz de puntuaciones"""
+    if len(valores) == 0:
+        return {"total": 0, "resumen": {}, "histogramas": {}, "top": {}}
+    promedios = valores.mean(axis=0)
+    maximos = valores.max(axis=0)
+    minimos = valores.min(axis=0)
+    percentiles = np.percentile(valores, PERCENTILES, axis=0)
+    bordes = np.linspace(0, 100, INTERVALOS_HISTOGRAMA + 1)
+
+    resumen, histogramas, top = {}, {}, {}
+    for j, puesto in enumerate(puestos):
+        resumen[puesto] = {
+            "promedio": float(promedios[j]),
+            "maximo": float(maximos[j]),
+            "minimo": float(minimos[j]),
+            **{f"p{p}": float(percentiles[i, j]) for i, p in enumerate(PERCENTILES)}
+        }
+        conteos, _ = np.histogram(valores[:, j], bins=bordes)
+        histogramas[puesto] = {"bordes": bordes.tolist(), "conteos": conteos.tolist()}
+        top[puesto] = top_filas(valores[:, j], filas)
+    return {"total": len(valores), "resumen": resumen, "histogramas": histogramas, "top": top}
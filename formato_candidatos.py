@@ -0,0 +1,347 @@
+"""
+Lectura y escritura en streaming de bases de datos de candidatos
+Soporta JSON (documento único) y JSON Lines (un candidato por línea), opcionalmente con gzip o lzma
+"""
+import gzip
+import io
+import itertools
+import json
+import lzma
+import os
+from cuestionario import CAMPOS_MULTIPLES, CAMPOS_TEXTO
+
+# Primera línea de un archivo JSONL: registro de metadatos identificado por esta clave
+FORMATO_JSONL = "linkenchamba-jsonl"
+VERSION_FORMATO = "1.0"
+
+# Lectura incremental de documentos JSON: caracteres leídos por bloque y tamaño
+# máximo de un valor (un candidato o un metadato) antes de darlo por inválido
+TAM_BLOQUE = 1 << 20
+MAX_TAM_VALOR = 64 << 20
+
+# Rutas por defecto de la base de datos local, en orden de preferencia
+RUTAS_BASE_DATOS = [
+    "base_datos_candidatos.json",
+    "base_datos_candidatos.jsonl",
+    "base_datos_candidatos.jsonl.gz",
+    "base_datos_candidatos.jsonl.xz",
+]
+
+def abrir_archivo(ruta, modo="r"):
+    """Abre un archivo de texto UTF-8, comprimido según su extensión (.gz, .xz, .lzma)"""
+    modo_texto = modo if "t" in modo else modo + "t"
+    if ruta.endswith(".gz"):
+        return gzip.open(ruta, modo_texto, encoding="utf-8")
+    if ruta.endswith(".xz") or ruta.endswith(".lzma"):
+        return lzma.open(ruta, modo_texto, encoding="utf-8")
+    return open(ruta, modo, encoding="utf-8")
+
+def es_jsonl(ruta):
+    """Indica si la ruta corresponde a JSON Lines (con o sin compresión)"""
+    for extension in (".gz", ".xz", ".lzma"):
+        if ruta.endswith(extension):
+            ruta = ruta[:-len(extension)]
+    return ruta.endswith(".jsonl")
+
+def escribir_jsonl(f, metadatos, candidatos):
+    """Escribe el registro de metadatos y un candidato por línea; devuelve cuántos escribió"""
+    cabecera = {"formato": FORMATO_JSONL, "version_formato": VERSION_FORMATO, **metadatos}
+    f.write(json.dumps(cabecera, ensure_ascii=False) + "\n")
+    total = 0
+    for candidato in candidatos:
+        f.write(json.dumps(candidato, ensure_ascii=False) + "\n")
+        total += 1
+    return total
+
+def escribir_json(f, metadatos, candidatos):
+    """Escribe un documento JSON {metadatos..., "candidatos": [...]} sin armarlo en memoria"""
+    f.write("{\n")
+    for clave, valor in metadatos.items():
+        f.write(f"  {json.dumps(clave)}: {json.dumps(valor, ensure_ascii=False)},\n")
+    f.write('  "candidatos": [')
+    total = 0
+    for candidato in candidatos:
+        f.write(",\n    " if total else "\n    ")
+        f.write(json.dumps(candidato, ensure_ascii=False))
+        total += 1
+    f.write("\n  ]\n}\n" if total else "]\n}\n")
+    return total
+
+def escribir_base_datos(ruta, metadatos, candidatos, sincronizar=False):
+    """Escribe la base de datos en streaming; el formato se elige por la extensión
+
+    `candidatos` puede ser cualquier iterable (por ejemplo un generador), de
+    modo que la memoria no depende del número de candidatos. Se escribe en un
+    archivo temporal que reemplaza al destino solo si todo salió bien; con
+    `sincronizar` el temporal se lleva a disco (fsync) antes del reemplazo.
+    """
+    # El temporal conserva la extensión para usar la misma compresión
+    directorio, nombre = os.path.split(ruta)
+    ruta_temporal = os.path.join(directorio, ".tmp-" + nombre)
+    with abrir_archivo(ruta_temporal, "w") as f:
+        if es_jsonl(ruta):
+            total = escribir_jsonl(f, metadatos, candidatos)
+        else:
+            total = escribir_json(f, metadatos, candidatos)
+    if sincronizar:
+        with open(ruta_temporal, "rb") as f:
+            os.fsync(f.fileno())
+    os.replace(ruta_temporal, ruta)
+    return total
+
+def leer_jsonl(f):
+    """Lee un archivo JSONL abierto; devuelve (metadatos, iterador de candidatos)"""
+    primera = f.readline()
+    metadatos = {}
+    pendiente = None
+    if primera.strip():
+        registro = json.loads(primera)
+        if registro.get("formato") == FORMATO_JSONL:
+            metadatos = registro
+        else:
+            # Archivo sin cabecera: la primera línea ya es un candidato
+            pendiente = registro
+
+    def candidatos():
+        if pendiente is not None:
+            yield pendiente
+        for linea in f:
+            if linea.strip():
+                yield json.loads(linea)
+
+    return metadatos, candidatos()
+
+def compartir_claves(valor, memo):
+    """Reemplaza las claves de los diccionarios anidados por una única copia de cada texto
+
+    json.load comparte las claves repetidas en todo el documento; raw_decode
+    solo dentro de cada llamada, así que al decodificar candidato por candidato
+    cada uno tendría su propia copia de "nombre", "email", etc.
+    """
+    if type(valor) is dict:
+        return {memo.setdefault(clave, clave): v if type(v) not in (dict, list) else compartir_claves(v, memo)
+                for clave, v in valor.items()}
+    return [v if type(v) not in (dict, list) else compartir_claves(v, memo) for v in valor]
+
+def iterar_json(f, metadatos, tam_bloque=TAM_BLOQUE):
+    """Itera los candidatos de un documento JSON {..., "candidatos": [...]} leyéndolo por bloques
+
+    Solo se mantiene en memoria el bloque actual y el candidato que se está
+    decodificando (json.JSONDecoder.raw_decode sobre el búfer). Las demás
+    claves del documento se guardan en `metadatos` a medida que aparecen; las
+    que estén después de "candidatos" solo se conocen al agotar el iterador.
+    Lanza ValueError si el documento está mal formado o no tiene "candidatos".
+    """
+    decodificador = json.JSONDecoder()
+    bufer, posicion, fin_archivo = "", 0, False
+    memo = {}
+
+    def leer_mas():
+        nonlocal bufer, posicion, fin_archivo
+        if fin_archivo:
+            return False
+        bloque = f.read(tam_bloque)
+        fin_archivo = not bloque
+        # Lo ya consumido se descarta: el búfer no pasa de un valor más un bloque
+        bufer, posicion = bufer[posicion:] + bloque, 0
+        return not fin_archivo
+
+    def siguiente_caracter():
+        """Primer carácter no blanco (sin consumirlo), o "" al final del archivo"""
+        nonlocal posicion
+        while True:
+            while posicion < len(bufer) and bufer[posicion] in " \t\r\n":
+                posicion += 1
+            if posicion < len(bufer):
+                return bufer[posicion]
+            if not leer_mas():
+                return ""
+
+    def esperar(caracteres):
+        nonlocal posicion
+        caracter = siguiente_caracter()
+        if not caracter or caracter not in caracteres:
+            raise ValueError(f"JSON inválido: se esperaba {' o '.join(caracteres)} y se encontró {caracter!r}")
+        posicion += 1
+        return caracter
+
+    def decodificar():
+        nonlocal posicion
+        siguiente_caracter()
+        while True:
+            try:
+                valor, fin = decodificador.raw_decode(bufer, posicion)
+                # Un número al final del búfer puede estar cortado: se lee más antes de aceptarlo
+                if fin < len(bufer) or fin_archivo:
+                    posicion = fin
+                    return valor
+            except json.JSONDecodeError as e:
+                if fin_archivo or len(bufer) - posicion > MAX_TAM_VALOR:
+                    raise ValueError(f"JSON inválido: {e.msg}") from None
+            leer_mas()
+
+    esperar("{")
+    tiene_candidatos = False
+    if siguiente_caracter() == "}":
+        posicion += 1
+    else:
+        while True:
+            if siguiente_caracter() != '"':
+                raise ValueError("JSON inválido: se esperaba una clave")
+            clave = decodificar()
+            esperar(":")
+            if clave == "candidatos":
+                tiene_candidatos = True
+                esperar("[")
+                if siguiente_caracter() == "]":
+                    posicion += 1
+                else:
+                    while True:
+                        candidato = decodificar()
+                        yield compartir_claves(candidato, memo) if type(candidato) in (dict, list) else candidato
+                        if esperar(",]") == "]":
+                            break
+            else:
+                metadatos[clave] = decodificar()
+            if esperar(",}") == "}":
+                break
+    if not tiene_candidatos:
+        raise ValueError("El JSON debe contener una clave 'candidatos'.")
+
+def leer_flujo(archivo, nombre, tam_bloque=TAM_BLOQUE):
+    """Lee en streaming un archivo binario abierto (por ejemplo una subida): JSON o JSONL, con o sin gzip
+
+    La compresión gzip se detecta por su firma. JSON Lines se reconoce por la
+    extensión .jsonl o, si la extensión no lo dice (p. ej. "datos.gz"), porque
+    la primera línea ya es un objeto completo sin clave "candidatos".
+    Devuelve (metadatos, iterador de candidatos) como leer_base_datos.
+    """
+    if archivo.read(2) == b"\x1f\x8b":
+        archivo.seek(0)
+        archivo = gzip.GzipFile(fileobj=archivo, mode="rb")
+        if nombre.endswith(".gz"):
+            nombre = nombre[:-3]
+    else:
+        archivo.seek(0)
+    texto = io.TextIOWrapper(archivo, encoding="utf-8-sig")
+
+    if nombre.endswith(".jsonl"):
+        jsonl = True
+    elif nombre.endswith(".json"):
+        jsonl = False
+    else:
+        # Sin extensión reconocible: se mira la primera línea y se vuelve a empezar
+        primera = texto.readline()
+        try:
+            registro = json.loads(primera)
+            jsonl = isinstance(registro, dict) and "candidatos" not in registro
+        except ValueError:
+            jsonl = False
+        archivo = texto.detach()
+        archivo.seek(0)
+        texto = io.TextIOWrapper(archivo, encoding="utf-8-sig")
+
+    if jsonl:
+        metadatos, candidatos = leer_jsonl(texto)
+        memo = {}
+        candidatos = (compartir_claves(c, memo) if type(c) in (dict, list) else c for c in candidatos)
+    else:
+        metadatos = {}
+        candidatos = iterar_json(texto, metadatos, tam_bloque)
+
+    def iterar_y_soltar():
+        # Al liberarse, el TextIOWrapper cerraría el archivo del llamador (que aún consulta tell())
+        try:
+            yield from candidatos
+        finally:
+            texto.detach()
+
+    return metadatos, iterar_y_soltar()
+
+def validar_respuestas(respuestas):
+    """Comprueba el tipo de cada campo presente del cuestionario; devuelve el error o None"""
+    for campo in CAMPOS_MULTIPLES:
+        if campo in respuestas and (not isinstance(respuestas[campo], list)
+                                    or not all(isinstance(opcion, str) for opcion in respuestas[campo])):
+            return f"la respuesta {campo} no es una lista de textos"
+    for campo in CAMPOS_TEXTO:
+        if campo in respuestas and not isinstance(respuestas[campo], str):
+            return f"la respuesta {campo} no es texto"
+    niveles = respuestas.get("niveles", {})
+    if not isinstance(niveles, dict) or not all(isinstance(nivel, str) for nivel in niveles.values()):
+        return "los niveles no son un objeto {tema: nivel}"
+    return None
+
+def validar_candidato(candidato):
+    """Comprueba el esquema mínimo de un candidato; devuelve el error o None si es válido
+
+    Sin puntuaciones (o con puntuaciones de otro modelo) el candidato es
+    válido: se puntúa al importarlo a partir de sus respuestas.
+    """
+    if not isinstance(candidato, dict):
+        return "el registro no es un objeto"
+    if not isinstance(candidato.get("nombre"), str) or not candidato["nombre"].strip():
+        return "falta el nombre"
+    if not isinstance(candidato.get("respuestas_cuestionario"), dict):
+        return "faltan las respuestas del cuestionario"
+    error = validar_respuestas(candidato["respuestas_cuestionario"])
+    if error is not None:
+        return error
+    for campo in ("id", "email", "telefono", "direccion"):
+        if candidato.get(campo) is not None and not isinstance(candidato[campo], str):
+            return f"el campo {campo} no es texto"
+    puntuaciones = candidato.get("puntuaciones")
+    if puntuaciones is not None:
+        if not isinstance(puntuaciones, dict):
+            return "las puntuaciones no son un objeto"
+        for puesto, valor in puntuaciones.items():
+            if isinstance(valor, bool) or not isinstance(valor, (int, float)):
+                return f"la puntuación de {puesto} no es un número"
+    return None
+
+def leer_base_datos(ruta):
+    """Itera los candidatos de un archivo JSON o JSONL
+
+    Devuelve (metadatos, iterador). Ambos formatos se leen en streaming: JSONL
+    línea a línea y JSON por bloques con iterar_json, que se adelanta hasta el
+    primer candidato para tener ya los metadatos que lo preceden (los
+    posteriores se agregan al agotarse el iterador). El iterador cierra el
+    archivo al agotarse.
+    """
+    f = abrir_archivo(ruta)
+    try:
+        if es_jsonl(ruta):
+            metadatos, candidatos = leer_jsonl(f)
+        else:
+            metadatos = {}
+            candidatos = iterar_json(f, metadatos)
+            candidatos = itertools.chain(list(itertools.islice(candidatos, 1)), candidatos)
+    except BaseException:
+        f.close()
+        raise
+
+    def iterar_y_cerrar():
+        with f:
+            yield from candidatos
+
+    return metadatos, iterar_y_cerrar()
+
+def cargar_base_datos(ruta):
+    """Carga una base de datos completa como {metadatos..., "candidatos": [...]}"""
+    metadatos, candidatos = leer_base_datos(ruta)
+    base_datos = {clave: valor for clave, valor in metadatos.items()
+                  if clave not in ("formato", "version_formato")}
+    base_datos["candidatos"] = list(candidatos)
+    return base_datos
+
+def guardar_base_datos(ruta, base_datos):
+    """Guarda un diccionario {metadatos..., "candidatos": [...]} en el formato de la ruta"""
+    metadatos = {clave: valor for clave, valor in base_datos.items() if clave != "candidatos"}
+    return escribir_base_datos(ruta, metadatos, base_datos.get("candidatos", []))
+
+def buscar_base_datos_local():
+    """Primera ruta por defecto de base de datos que existe, o None"""
+    for ruta in RUTAS_BASE_DATOS:
+        if os.path.exists(ruta):
+            return ruta
+    return None
@@ -1,109 +1,28 @@
 """
-Generador de base de datos JSON con 500 candidatos para LinkenChamba
+Generador de base de datos JSON/JSONL de candidatos para LinkenChamba (500 por defecto)
 Incluye sistema de puntuación basado en red neuronal multicapa
 """
-import json
+import argparse
+import multiprocessing
 import random
 from faker import Faker
 import numpy as np
-from red_neuronal_puntuacion import calcular_puntuacion_puesto, PUESTOS
+from red_neuronal_puntuacion import (
+    calcular_puntuaciones_lote, obtener_cache_puntuaciones, version_modelo_actual, PRECISIONES, PUESTOS
+)
+from reevaluar_puntuaciones import definicion_puestos, reevaluar_archivo
+from formato_candidatos import escribir_base_datos
+from tabla_candidatos import TablaCandidatos
+# Opciones del cuestionario (definidas en cuestionario.py)
+from cuestionario import (
+    HABILIDADES_PRACTICAS, HERRAMIENTAS, AMBIENTES, ACTIVIDADES, CONOCIMIENTOS,
+    NIVELES, TIPOS_TRABAJO, LOGROS, REACCIONES, DESTACA, MOTIVACIONES
+)
 
 fake = Faker('es_MX')  # Generador de datos en español
 
-# Opciones del cuestionario
-HABILIDADES_PRACTICAS = [
-    "Atender clientes en mostrador o por teléfono",
-    "Manejar caja registradora y dar cambio",
-    "Organizar archivos o productos en inventario",
-    "Usar computadora para escribir documentos básicos",
-    "Empacar productos y preparar pedidos",
-    "Limpiar y mantener áreas de trabajo ordenadas",
-    "Ayudar en preparación de productos o materiales",
-    "Tomar mensajes y recados con claridad",
-    "Resolver quejas simples de clientes",
-    "Ayudar a compañeros con sus tareas cuando es necesario"
-]
-
-HERRAMIENTAS = [
-    "Computadora (Windows, Internet, email)",
-    "Teléfono y sistemas de mensajería",
-    "Caja registradora o punto de venta",
-    "Herramientas básicas (martillo, destornillador, etc.)",
-    "Equipo de cocina o restaurante",
-    "Vehículo para entregas",
-    "Ninguno de los anteriores, pero aprendo rápido"
-]
-
-AMBIENTES = [
-    "Me gusta el movimiento y estar activo todo el día",
-    "Prefiero trabajo tranquilo y organizado",
-    "Disfruto interactuar con mucha gente",
-    "Trabajo mejor concentrado en una sola tarea",
-    "Me adapto fácilmente a cualquier ambiente"
-]
-
-ACTIVIDADES = [
-    "Ayudar directamente a clientes o personas",
-    "Crear o arreglar cosas con las manos",
-    "Organizar y poner todo en orden",
-    "Aprender cosas nuevas constantemente",
-    "Resolver problemas prácticos inmediatos"
-]
-
-CONOCIMIENTOS = [
-    "Matemáticas (hacer cuentas, medir, calcular precios)",
-    "Lectura rápida y comprensión de instrucciones",
-    "Escritura clara para llenar formatos o tomar notas",
-    "Conceptos básicos de ventas o servicio al cliente",
-    "Conocimiento de productos específicos (comida, ropa, materiales, etc.)",
-    "Ninguna en particular, pero aprendo viendo y practicando"
-]
-
-NIVELES = ["Nada", "Básico", "Intermedio", "Avanzado"]
-
-TIPOS_TRABAJO = [
-    "Trabajo de medio tiempo (4-6 horas diarias)",
-    "Trabajo de tiempo completo (8 horas)",
-    "Trabajo por proyectos o temporal",
-    "Aprendizaje o capacitación con salario básico",
-    "Cualquier opción mientras pueda aprender y crecer"
-]
-
-LOGROS = [
-    "Aprender un oficio o skill específico",
-    "Tener un ingreso estable para mis gastos",
-    "Ganar experiencia para mejor empleo después",
-    "Desarrollarme dentro de esta empresa",
-    "Descubrir en qué soy bueno profesionalmente"
-]
-
-REACCIONES = [
-    "Pregunto a alguien con más experiencia",
-    "Busco la solución yo mismo investigando",
-    "Organizo la información para entender mejor",
-    "Actúo inmediatamente con lo que sé",
-    "Mantengo la calma y evalúo opciones"
-]
-
-DESTACA = [
-    "Cuando hay que ayudar a otros a entenderse",
-    "Cuando hay que encontrar errores o detalles",
-    "Cuando hay que aprender algo nuevo rápido",
-    "Cuando hay que mantener el orden en el caos",
-    "Cuando hay que motivar al equipo",
-    "No estoy seguro, necesito oportunidad para descubrirlo"
-]
-
-MOTIVACIONES = [
-    "Necesidad económica inmediata",
-    "Aprender y desarrollar habilidades",
-    "Estabilidad y crecimiento a largo plazo",
-    "Ambiente de trabajo positivo",
-    "Todas las anteriores"
-]
-
-# Las funciones calcular_puntuacion_puesto y obtener_red_neuronal 
-# ahora se importan desde red_neuronal_puntuacion.py
+# Las funciones de puntuación (calcular_puntuaciones_lote y obtener_red_neuronal)
+# se importan desde red_neuronal_puntuacion.py
 
 def generar_respuestas_aleatorias():
     """Genera respuestas aleatorias al cuestionario"""
@@ -129,66 +48,165 @@ def generar_respuestas_aleatorias():
 
 def generar_candidato():
     """Genera un candidato completo con datos y respuestas"""
-    respuestas = generar_respuestas_aleatorias()
+    return generar_candidatos(1)[0]
+
+def generar_candidatos(cantidad):
+    """Genera varios candidatos puntuando todo el lote con una sola pasada de la red"""
+    lista_respuestas = [generar_respuestas_aleatorias() for _ in range(cantidad)]
     
-    # Calcular puntuaciones para cada puesto
-    puntuaciones = {}
-    for puesto in PUESTOS.keys():
-        puntuaciones[puesto] = calcular_puntuacion_puesto(respuestas, puesto)
+    # Calcular puntuaciones para cada puesto de todos los candidatos a la vez
+    lista_puntuaciones = calcular_puntuaciones_lote(lista_respuestas)
+    version_modelo = version_modelo_actual()
     
-    candidato = {
-        "id": fake.uuid4(),
-        "nombre": fake.name(),
-        "email": fake.email(),
-        "telefono": fake.phone_number(),
-        "direccion": fake.address().replace('\n', ', '),
-        "respuestas_cuestionario": respuestas,
-        "puntuaciones": puntuaciones,
-        "fecha_registro": fake.date_between(start_date='-1y', end_date='today').isoformat()
-    }
+    candidatos = []
+    for respuestas, puntuaciones in zip(lista_respuestas, lista_puntuaciones):
+        candidatos.append({
+            "id": fake.uuid4(),
+            "nombre": fake.name(),
+            "email": fake.email(),
+            "telefono": fake.phone_number(),
+            "direccion": fake.address().replace('\n', ', '),
+            "respuestas_cuestionario": respuestas,
+            "puntuaciones": puntuaciones,
+            "version_modelo": version_modelo,
+            "fecha_registro": fake.date_between(start_date='-1y', end_date='today').isoformat()
+        })
+    
+    return candidatos
+
+# Tamaño fijo de cada fragmento: la semilla depende del índice del fragmento y
+# no del número de procesos, así que la salida es la misma con cualquier --workers
+TAM_FRAGMENTO = 10000
+TAM_LOTE_PUNTUACION = 1000
+
+def semilla_fragmento(semilla, indice):
+    """Semilla determinista e independiente para cada fragmento"""
+    return int(np.random.SeedSequence([semilla, indice]).generate_state(1)[0])
+
+def generar_fragmento(tarea):
+    """Genera un fragmento de candidatos con su propia semilla (se ejecuta en un proceso del pool)
+
+    Devuelve una TablaCandidatos: ocupa una fracción de la lista de
+    diccionarios, así que el fragmento viaja entre procesos mucho más rápido.
+    """
+    semilla, indice, cantidad = tarea
+    semilla_local = semilla_fragmento(semilla, indice)
+    random.seed(semilla_local)
+    fake.seed_instance(semilla_local)
+    
+    candidatos = TablaCandidatos()
+    for inicio in range(0, cantidad, TAM_LOTE_PUNTUACION):
+        candidatos.extender(generar_candidatos(min(TAM_LOTE_PUNTUACION, cantidad - inicio)))
+    candidatos.recortar()
+    return candidatos
+
+def generar_en_paralelo(total, workers=1, semilla=0):
+    """Genera `total` candidatos repartidos en fragmentos; devuelve un iterador en orden"""
+    tareas = [
+        (semilla, indice, min(TAM_FRAGMENTO, total - inicio))
+        for indice, inicio in enumerate(range(0, total, TAM_FRAGMENTO))
+    ]
+    if workers <= 1:
+        for tarea in tareas:
+            yield generar_fragmento(tarea)
+        return
+    
+    with multiprocessing.Pool(processes=workers) as pool:
+        # imap conserva el orden de los fragmentos al combinar los resultados
+        for candidatos in pool.imap(generar_fragmento, tareas):
+            yield candidatos
+
+class EstadisticasPuntuaciones:
+    """Promedio, máximo y mínimo por puesto acumulados sin guardar los candidatos"""
+    def __init__(self):
+        self.total = 0
+        self.suma = {}
+        self.maximo = {}
+        self.minimo = {}
+    
+    def agregar(self, puntuaciones):
+        """Acumula las puntuaciones de un candidato"""
+        self.total += 1
+        for puesto, valor in puntuaciones.items():
+            self.suma[puesto] = self.suma.get(puesto, 0.0) + valor
+            self.maximo[puesto] = max(self.maximo.get(puesto, valor), valor)
+            self.minimo[puesto] = min(self.minimo.get(puesto, valor), valor)
     
-    return candidato
+    def resumen(self):
+        """Estadísticas finales por puesto"""
+        return {
+            puesto: {
+                "promedio": self.suma[puesto] / self.total,
+                "maximo": self.maximo[puesto],
+                "minimo": self.minimo[puesto]
+            }
+            for puesto in self.suma
+        }
 
 def main():
-    """Genera la base de datos con 500 candidatos usando red neuronal"""
-    print("Inicializando red neuronal multicapa...")
-    print("Generando base de datos con 500 candidatos...")
-    candidatos = []
+    """Genera la base de datos de candidatos (500 por defecto) usando red neuronal"""
+    parser = argparse.ArgumentParser(description="Generador de base de datos de candidatos")
+    parser.add_argument("--candidatos", type=int, default=500, help="Número de candidatos a generar")
+    parser.add_argument("--workers", type=int, default=1, help="Procesos para generar y puntuar en paralelo")
+    parser.add_argument("--semilla", type=int, default=None,
+                        help="Semilla para una salida reproducible (independiente de --workers)")
+    parser.add_argument("--salida", default="base_datos_candidatos.json",
+                        help="Archivo de salida: .json o .jsonl (admite .jsonl.gz y .jsonl.xz)")
+    parser.add_argument("--reevaluar", metavar="ARCHIVO_JSON",
+                        help="Recalcula las puntuaciones obsoletas (modelo o PUESTOS) de una base de datos existente")
+    parser.add_argument("--precision", choices=PRECISIONES, default="float64",
+                        help="Precisión de la inferencia al recalcular (float32 es más rápida; int8 mide el error de cuantizar)")
+    args = parser.parse_args()
+    
+    if args.reevaluar:
+        informe = reevaluar_archivo(args.reevaluar, precision=args.precision)
+        print(f"[OK] {informe['candidatos_actualizados']} de {informe['candidatos']} candidatos recalculados "
+              f"con el modelo {version_modelo_actual()}")
+        return
     
-    for i in range(500):
-        candidato = generar_candidato()
-        candidatos.append(candidato)
-        if (i + 1) % 50 == 0:
-            print(f"   Generados {i + 1}/500 candidatos...")
+    total = args.candidatos
+    semilla = args.semilla if args.semilla is not None else random.SystemRandom().randrange(2 ** 32)
+    print("Inicializando red neuronal multicapa...")
+    print(f"Generando base de datos con {total} candidatos ({args.workers} procesos, semilla {semilla})...")
     
-    base_datos = {
+    metadatos = {
         "version": "1.0",
-        "total_candidatos": len(candidatos),
+        "total_candidatos": total,
         "puestos_disponibles": list(PUESTOS.keys()),
         "metodo_puntuacion": "Red neuronal multicapa (3 capas: 55->30->15->5) - Todas las preguntas del cuestionario",
-        "candidatos": candidatos
+        "version_modelo": version_modelo_actual(),
+        "puestos_definicion": definicion_puestos(),
+        "semilla": semilla
     }
+    estadisticas = EstadisticasPuntuaciones()
+    
+    def candidatos_generados():
+        # Se escriben a medida que llegan los fragmentos; la memoria no depende de N
+        generados = 0
+        for fragmento in generar_en_paralelo(total, workers=args.workers, semilla=semilla):
+            for candidato in fragmento:
+                estadisticas.agregar(candidato["puntuaciones"])
+                yield candidato
+            generados += len(fragmento)
+            print(f"   Generados {generados}/{total} candidatos...")
+    
+    # Guardar en JSON o JSONL (opcionalmente .gz/.xz) según la extensión de --salida
+    escritos = escribir_base_datos(args.salida, metadatos, candidatos_generados())
     
-    # Guardar en JSON
-    with open("base_datos_candidatos.json", "w", encoding="utf-8") as f:
-        json.dump(base_datos, f, ensure_ascii=False, indent=2)
+    obtener_cache_puntuaciones().guardar()
     
     print(f"\n[OK] Base de datos generada exitosamente!")
-    print(f"   Archivo: base_datos_candidatos.json")
-    print(f"   Total de candidatos: {len(candidatos)}")
+    print(f"   Archivo: {args.salida}")
+    print(f"   Total de candidatos: {escritos}")
     print(f"   Metodo: Red neuronal multicapa")
     
     # Mostrar estadísticas
     print("\nEstadisticas de puntuaciones promedio (calculadas con red neuronal):")
-    for puesto in PUESTOS.keys():
-        puntuaciones = [c["puntuaciones"][puesto] for c in candidatos]
-        promedio = np.mean(puntuaciones)
-        maximo = np.max(puntuaciones)
-        minimo = np.min(puntuaciones)
+    for puesto, resumen in estadisticas.resumen().items():
         print(f"   {puesto}:")
-        print(f"      Promedio: {promedio:.2f}%")
-        print(f"      Maximo: {maximo:.2f}%")
-        print(f"      Minimo: {minimo:.2f}%")
+        print(f"      Promedio: {resumen['promedio']:.2f}%")
+        print(f"      Maximo: {resumen['maximo']:.2f}%")
+        print(f"      Minimo: {resumen['minimo']:.2f}%")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,295 @@
+"""
+Índice de bits de las respuestas del cuestionario para filtrar candidatos y buscar similares
+Las 49 características binarias de extraer_caracteristicas se empaquetan en un uint64 por
+candidato y los 4 niveles y las 2 características graduadas en un uint16, así que un filtro
+Y/O/NO sobre toda la base son unas pocas operaciones de bits vectorizadas y la distancia
+euclídea entre vectores de características es XOR + conteo de bits + una consulta a una tabla
+"""
+import os
+import numpy as np
+import red_neuronal_puntuacion as rn
+from tabla_candidatos import CAMPOS_MULTIPLES, CAMPOS_UNICOS, ampliar
+
+ETIQUETAS_CAMPOS = {
+    "habilidades_practicas": "Habilidades",
+    "herramientas": "Herramientas",
+    "ambiente": "Ambiente",
+    "actividades": "Actividades",
+    "conocimientos": "Conocimientos",
+    "logros": "Logros",
+    "reaccion": "Reacción",
+    "destaca": "Destaca en",
+}
+
+# Columnas binarias del vector de características, en orden: el bit k es la k-ésima
+COLUMNAS_BINARIAS = [
+    inicio + k for _, claves, inicio, _ in rn.BLOQUES_BINARIOS for k in range(len(claves))
+]
+NOMBRES_CARACTERISTICAS = [
+    f"{ETIQUETAS_CAMPOS[campo]}: {clave}" for campo, claves, _, _ in rn.BLOQUES_BINARIOS for clave in claves
+]
+BIT_POR_NOMBRE = {nombre: 1 << k for k, nombre in enumerate(NOMBRES_CARACTERISTICAS)}
+BIT_POR_COLUMNA = {columna: 1 << k for k, columna in enumerate(COLUMNAS_BINARIAS)}
+PESOS_BITS = np.array([1 << k for k in range(len(COLUMNAS_BINARIAS))], dtype=np.uint64)
+COLUMNAS_NIVELES = slice(rn.COLUMNA_NIVELES, rn.COLUMNA_NIVELES + len(rn.TEMAS_NIVELES))
+
+# Características graduadas (tipo de trabajo y motivación), guardadas en décimas: sus valores
+# posibles (0.4, 0.5, 0.6, 0.8, 1) son exactos en décimas
+COLUMNAS_GRADUADAS = [rn.COLUMNA_TIPO_TRABAJO, rn.COLUMNA_MOTIVACION]
+CAMPOS_GRADUADOS = {"tipo_trabajo": rn.INDICE_TIPO_TRABAJO, "motivacion": rn.INDICE_MOTIVACION}
+
+# "Resto" de un candidato en un uint16: nivel k (0-3) en los bits 2k-2k+1 (como en
+# TablaCandidatos) y cada graduada (0-10 décimas) en 4 bits a partir del bit 8
+DESPLAZAMIENTOS_NIVELES = [2 * k for k in range(len(rn.TEMAS_NIVELES))]
+DESPLAZAMIENTOS_GRADUADAS = [8 + 4 * k for k in range(len(COLUMNAS_GRADUADAS))]
+# Valores de cada byte del resto: el bajo tiene los niveles y el alto las graduadas
+_BYTES = np.arange(256, dtype=np.int32)
+NIVELES_POR_BYTE = np.stack([_BYTES >> d & 3 for d in DESPLAZAMIENTOS_NIVELES], axis=1)
+GRADUADAS_POR_BYTE = np.stack([_BYTES >> (d - 8) & 15 for d in DESPLAZAMIENTOS_GRADUADAS], axis=1)
+
+# Distancia al cuadrado en unidades enteras: cada bit distinto vale 900, un nivel de
+# diferencia (1/3) vale 100 y una décima de diferencia graduada vale 9
+ESCALA_DISTANCIA = 900
+DISTANCIA_MAXIMA = rn.NUM_CARACTERISTICAS  # cada característica difiere como mucho en 1
+
+if hasattr(np, "bitwise_count"):
+    contar_bits = np.bitwise_count
+else:
+    # NumPy < 2.0: conteo de bits por bytes con una tabla
+    BITS_POR_BYTE = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+    def contar_bits(valores):
+        """Número de bits a 1 de cada uint64"""
+        valores = np.ascontiguousarray(valores, dtype=np.uint64)
+        return BITS_POR_BYTE[valores.view(np.uint8)].reshape(len(valores), 8).sum(axis=1, dtype=np.uint8)
+
+def _bits_de_opciones(campo, opciones):
+    """Bits de características que activa cada opción canónica de un campo"""
+    return [
+        sum(BIT_POR_COLUMNA[columna] for columna in rn.INDICE_OPCIONES[campo][opcion])
+        for opcion in opciones
+    ]
+
+def _bits_por_mascara(campo, opciones):
+    """Bits activados por cada máscara posible de opciones de un campo de selección múltiple"""
+    bits_opciones = _bits_de_opciones(campo, opciones)
+    tabla = np.zeros(1 << len(opciones), dtype=np.uint64)
+    for mascara in range(1, len(tabla)):
+        bits = 0
+        for k, bits_opcion in enumerate(bits_opciones):
+            if mascara >> k & 1:
+                bits |= bits_opcion
+        tabla[mascara] = bits
+    return tabla
+
+# Tablas de traducción desde las columnas de TablaCandidatos: opciones -> bits
+BITS_POR_MASCARA = {campo: _bits_por_mascara(campo, opciones) for campo, opciones in CAMPOS_MULTIPLES.items()}
+BITS_POR_CODIGO = {
+    campo: np.array(_bits_de_opciones(campo, opciones), dtype=np.uint64)
+    for campo, opciones in CAMPOS_UNICOS.items() if campo in rn.INDICE_OPCIONES
+}
+DECIMAS_POR_CODIGO = {
+    campo: np.array([round(indice[opcion] * 10) for opcion in CAMPOS_UNICOS[campo]], dtype=np.uint8)
+    for campo, indice in CAMPOS_GRADUADOS.items()
+}
+
+def empaquetar_resto(niveles, graduadas):
+    """uint16 por fila con los niveles (N x 4, 0-3) y las graduadas (N x 2, en décimas)"""
+    resto = np.zeros(len(niveles), dtype=np.uint16)
+    for k, desplazamiento in enumerate(DESPLAZAMIENTOS_NIVELES):
+        resto |= niveles[:, k].astype(np.uint16) << desplazamiento
+    for k, desplazamiento in enumerate(DESPLAZAMIENTOS_GRADUADAS):
+        resto |= graduadas[:, k].astype(np.uint16) << desplazamiento
+    return resto
+
+def codificar_caracteristicas(X):
+    """(bits uint64, resto uint16) de una matriz N x 55 de características"""
+    X = np.atleast_2d(X)
+    bits = (X[:, COLUMNAS_BINARIAS] > 0).astype(np.uint64) @ PESOS_BITS
+    niveles = np.rint(X[:, COLUMNAS_NIVELES] * 3).astype(np.uint16)
+    graduadas = np.rint(X[:, COLUMNAS_GRADUADAS] * 10).astype(np.uint16)
+    return bits, empaquetar_resto(niveles, graduadas)
+
+def similitud(distancia):
+    """Similitud en % a partir de la distancia euclídea (100 = mismas respuestas)"""
+    return 100 * (1 - distancia ** 2 / DISTANCIA_MAXIMA)
+
+class FiltroRespuestas:
+    """Filtro por respuestas: todas (Y), al menos una (O), ninguna (NO) y nivel mínimo por tema
+
+    Las características se nombran como en NOMBRES_CARACTERISTICAS y los
+    niveles van de 0 (Nada) a 3 (Avanzado). Las condiciones se combinan con Y.
+    """
+    def __init__(self, todas=(), alguna=(), ninguna=(), niveles_minimos=None):
+        for nombre in (*todas, *alguna, *ninguna):
+            if nombre not in BIT_POR_NOMBRE:
+                raise ValueError(f"Característica desconocida: {nombre}")
+        niveles_minimos = {tema: nivel for tema, nivel in (niveles_minimos or {}).items() if nivel > 0}
+        for tema in niveles_minimos:
+            if tema not in rn.TEMAS_NIVELES:
+                raise ValueError(f"Tema de nivel desconocido: {tema}")
+        self.todas = tuple(todas)
+        self.alguna = tuple(alguna)
+        self.ninguna = tuple(ninguna)
+        self.niveles_minimos = niveles_minimos
+        self._todas = np.uint64(sum(BIT_POR_NOMBRE[n] for n in set(self.todas)))
+        self._alguna = np.uint64(sum(BIT_POR_NOMBRE[n] for n in set(self.alguna)))
+        self._ninguna = np.uint64(sum(BIT_POR_NOMBRE[n] for n in set(self.ninguna)))
+
+    def vacio(self):
+        """True si el filtro no pone ninguna condición"""
+        return not (self.todas or self.alguna or self.ninguna or self.niveles_minimos)
+
+    def evaluar(self, bits, resto):
+        """Arreglo booleano con los candidatos que cumplen el filtro"""
+        seleccion = np.ones(len(bits), dtype=bool)
+        if self._todas:
+            seleccion &= (bits & self._todas) == self._todas
+        if self._alguna:
+            seleccion &= (bits & self._alguna) != 0
+        if self._ninguna:
+            seleccion &= (bits & self._ninguna) == 0
+        for tema, minimo in self.niveles_minimos.items():
+            desplazamiento = DESPLAZAMIENTOS_NIVELES[rn.TEMAS_NIVELES.index(tema)]
+            seleccion &= (resto >> desplazamiento & 3) >= minimo
+        return seleccion
+
+    def cumple(self, caracteristicas):
+        """Evalúa el filtro sobre el vector de 55 características de un candidato"""
+        return bool(self.evaluar(*codificar_caracteristicas(caracteristicas))[0])
+
+    def describir(self):
+        """Texto legible del filtro"""
+        partes = [" Y ".join(self.todas)] if self.todas else []
+        if self.alguna:
+            partes.append("(" + " O ".join(self.alguna) + ")")
+        partes.extend(f"NO {nombre}" for nombre in self.ninguna)
+        partes.extend(f"{tema} >= {rn.cuestionario.NIVELES[nivel]}" for tema, nivel in self.niveles_minimos.items())
+        return " Y ".join(partes) or "sin filtro"
+
+class IndiceRespuestas:
+    """Características binarias (uint64) y resto (niveles y graduadas, uint16) de cada candidato, por fila
+
+    Con ellas se reconstruye exactamente el vector de 55 características, así
+    que sirve tanto para filtrar como para buscar vecinos. Crece al registrar
+    candidatos con capacidad que se duplica, como MatrizPuntuaciones.
+    """
+    def __init__(self, candidatos=()):
+        self.num_filas = 0
+        self._bits = np.zeros(16, dtype=np.uint64)
+        self._resto = np.zeros(16, dtype=np.uint16)
+        self.extender(candidatos)
+
+    @classmethod
+    def desde_tabla(cls, tabla):
+        """Índice de una TablaCandidatos traduciendo sus máscaras de opciones (sin decodificar filas)"""
+        indice = cls()
+        mascaras, codigos, niveles, codificadas = tabla.respuestas_codificadas()
+        n = len(tabla)
+        bits = np.zeros(n, dtype=np.uint64)
+        for j, campo in enumerate(CAMPOS_MULTIPLES):
+            bits |= BITS_POR_MASCARA[campo][mascaras[:, j]]
+        for j, campo in enumerate(CAMPOS_UNICOS):
+            if campo in BITS_POR_CODIGO:
+                bits |= BITS_POR_CODIGO[campo][codigos[:, j]]
+        # Los niveles empaquetados de la tabla ya tienen la disposición del resto
+        resto = niveles.astype(np.uint16)
+        posiciones = list(CAMPOS_UNICOS)
+        for campo, desplazamiento in zip(CAMPOS_GRADUADOS, DESPLAZAMIENTOS_GRADUADAS):
+            resto |= DECIMAS_POR_CODIGO[campo][codigos[:, posiciones.index(campo)]].astype(np.uint16) << desplazamiento
+        # Las filas con respuestas fuera de columnas pasan por el codificador completo
+        excepcionales = np.flatnonzero(~codificadas)
+        if len(excepcionales):
+            respuestas = [tabla.respuestas(int(fila)) for fila in excepcionales]
+            bits[excepcionales], resto[excepcionales] = codificar_caracteristicas(
+                rn.extraer_caracteristicas_lote([r if isinstance(r, dict) else {} for r in respuestas])
+            )
+        indice._agregar_codificadas(bits, resto)
+        return indice
+
+    @classmethod
+    def cargar(cls, ruta):
+        """(índice, datos extra) de un .npz guardado con `guardar`"""
+        with np.load(ruta) as datos:
+            indice = cls()
+            indice._agregar_codificadas(datos["bits"], datos["resto"])
+            extras = {clave: datos[clave] for clave in datos.files if clave not in ("bits", "resto")}
+        return indice, extras
+
+    def guardar(self, ruta, **extras):
+        """Guarda el índice (y arreglos extra) en un .npz sin comprimir, reemplazándolo de forma atómica"""
+        ruta_temporal = ruta + ".tmp"
+        with open(ruta_temporal, "wb") as f:
+            np.savez(
+                f, bits=self._bits[:self.num_filas], resto=self._resto[:self.num_filas], **extras
+            )
+        os.replace(ruta_temporal, ruta)
+
+    def __len__(self):
+        return self.num_filas
+
+    def _agregar_codificadas(self, bits, resto):
+        hasta = self.num_filas + len(bits)
+        self._bits = ampliar(self._bits, hasta)
+        self._resto = ampliar(self._resto, hasta)
+        self._bits[self.num_filas:hasta] = bits
+        self._resto[self.num_filas:hasta] = resto
+        self.num_filas = hasta
+
+    def extender(self, candidatos, tam_lote=10000):
+        """Agrega candidatos por lotes con el codificador de características"""
+        lote = []
+        for candidato in candidatos:
+            respuestas = candidato.get("respuestas_cuestionario")
+            lote.append(respuestas if isinstance(respuestas, dict) else {})
+            if len(lote) >= tam_lote:
+                self._agregar_codificadas(*codificar_caracteristicas(rn.extraer_caracteristicas_lote(lote)))
+                lote = []
+        if lote:
+            self._agregar_codificadas(*codificar_caracteristicas(rn.extraer_caracteristicas_lote(lote)))
+
+    def agregar(self, candidato):
+        """Agrega un candidato nuevo (la fila siguiente); devuelve su fila"""
+        self.extender([candidato])
+        return self.num_filas - 1
+
+    def seleccionar(self, filtro):
+        """Arreglo booleano por fila con los candidatos que cumplen el filtro"""
+        return filtro.evaluar(self._bits[:self.num_filas], self._resto[:self.num_filas])
+
+    def distancias(self, respuestas):
+        """Distancia euclídea al cuadrado (en unidades de ESCALA_DISTANCIA, int32) de cada fila a unas respuestas
+
+        Es exacta: en las columnas binarias la diferencia al cuadrado es el
+        XOR, y la parte de niveles y graduadas sale de una tabla con los 65536
+        restos posibles calculada para la consulta (suma de una tabla por byte).
+        """
+        n = self.num_filas
+        bits, resto = codificar_caracteristicas(
+            rn.extraer_caracteristicas_lote([respuestas if isinstance(respuestas, dict) else {}])
+        )
+        bajo, alto = int(resto[0]) & 0xFF, int(resto[0]) >> 8
+        tabla_bajo = ((NIVELES_POR_BYTE - NIVELES_POR_BYTE[bajo]) ** 2).sum(axis=1, dtype=np.int32)
+        tabla_alto = ((GRADUADAS_POR_BYTE - GRADUADAS_POR_BYTE[alto]) ** 2).sum(axis=1, dtype=np.int32)
+        tabla = (tabla_alto[:, None] * np.int32(ESCALA_DISTANCIA // 100)
+                 + tabla_bajo[None, :] * np.int32(ESCALA_DISTANCIA // 9)).ravel()
+        # int32 en todo el recorrido: la memoria movida por fila es lo que marca el tiempo
+        resultado = np.take(tabla, self._resto[:n])
+        resultado += contar_bits(self._bits[:n] ^ bits[0]) * np.int32(ESCALA_DISTANCIA)
+        return resultado
+
+    def vecinos(self, respuestas, k=10):
+        """(filas, distancias euclídeas) de los k candidatos más parecidos, del más cercano al más lejano
+
+        Recorre todo el índice (10 bytes por candidato); a igual distancia
+        gana la fila menor, así que el resultado es determinista.
+        """
+        distancias = self.distancias(respuestas)
+        k = min(k, len(distancias))
+        if k <= 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+        umbral = np.partition(distancias, k - 1)[k - 1]
+        filas = np.flatnonzero(distancias < umbral)
+        filas = np.concatenate([filas, np.flatnonzero(distancias == umbral)[:k - len(filas)]])
+        filas = filas[np.lexsort((filas, distancias[filas]))]
+        return filas, np.sqrt(distancias[filas] / ESCALA_DISTANCIA)
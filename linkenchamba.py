@@ -3,18 +3,25 @@ LinkenChamba - Plataforma de conexión entre candidatos y microempresas
 Incluye cifrado RSA y sistema de correos electrónicos
 """
 import streamlit as st
-import json
 import pandas as pd
-from cryptography.hazmat.primitives.asymmetric import rsa, padding
-from cryptography.hazmat.primitives import serialization, hashes
-from cryptography.hazmat.backends import default_backend
-import base64
-import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
 import os
+import threading
+import time
+import uuid
 from datetime import datetime
-from red_neuronal_puntuacion import calcular_puntuaciones, PUESTOS
+from red_neuronal_puntuacion import (
+    calcular_puntuaciones_lote, obtener_cache_puntuaciones, version_modelo_actual, NIVEL_MAP, PUESTOS, TEMAS_NIVELES
+)
+from reevaluar_puntuaciones import definicion_puestos, reevaluar_flujo
+from formato_candidatos import buscar_base_datos_local, leer_base_datos, leer_flujo
+from almacen_candidatos import AlmacenCandidatos, informe_memoria
+from asignacion_candidatos import resumen_asignacion
+from indice_respuestas import NOMBRES_CARACTERISTICAS, FiltroRespuestas
+from cifrado import obtener_almacen_claves
+from almacen_sqlite import RUTA_SQLITE, AlmacenSQLite
+from registro_candidatos import RUTA_REGISTRO, UMBRAL_COMPACTACION, RegistroCandidatos, ruta_base_principal
+from correo import ConfiguracionSMTP, mensaje_contacto
+from bandeja_salida import RUTA_BANDEJA, BandejaSalida
 
 # ---------------------------
 # CONFIGURACIÓN GENERAL
@@ -103,104 +110,77 @@ st.markdown(
 # ---------------------------
 # FUNCIONES DE CIFRADO RSA
 # ---------------------------
-def generar_par_claves_rsa():
-    """Genera un par de claves RSA"""
-    private_key = rsa.generate_private_key(
-        public_exponent=65537,
-        key_size=2048,
-        backend=default_backend()
-    )
-    public_key = private_key.public_key()
-    return private_key, public_key
-
-def serializar_clave_publica(public_key):
-    """Serializa la clave pública a formato PEM"""
-    pem = public_key.public_bytes(
-        encoding=serialization.Encoding.PEM,
-        format=serialization.PublicFormat.SubjectPublicKeyInfo
-    )
-    return pem.decode('utf-8')
-
-def serializar_clave_privada(private_key):
-    """Serializa la clave privada a formato PEM"""
-    pem = private_key.private_bytes(
-        encoding=serialization.Encoding.PEM,
-        format=serialization.PrivateFormat.PKCS8,
-        encryption_algorithm=serialization.NoEncryption()
-    )
-    return pem.decode('utf-8')
-
-def cifrar_datos(datos, public_key_pem):
-    """Cifra datos usando una clave pública RSA"""
-    public_key = serialization.load_pem_public_key(
-        public_key_pem.encode('utf-8'),
-        backend=default_backend()
-    )
-    datos_bytes = json.dumps(datos).encode('utf-8')
-    encrypted = public_key.encrypt(
-        datos_bytes,
-        padding.OAEP(
-            mgf=padding.MGF1(algorithm=hashes.SHA256()),
-            algorithm=hashes.SHA256(),
-            label=None
-        )
-    )
-    return base64.b64encode(encrypted).decode('utf-8')
-
-def descifrar_datos(datos_cifrados, private_key_pem):
-    """Descifra datos usando una clave privada RSA"""
-    private_key = serialization.load_pem_private_key(
-        private_key_pem.encode('utf-8'),
-        password=None,
-        backend=default_backend()
-    )
-    encrypted_bytes = base64.b64decode(datos_cifrados)
-    decrypted = private_key.decrypt(
-        encrypted_bytes,
-        padding.OAEP(
-            mgf=padding.MGF1(algorithm=hashes.SHA256()),
-            algorithm=hashes.SHA256(),
-            label=None
-        )
-    )
-    return json.loads(decrypted.decode('utf-8'))
+# Las claves viven en un almacén persistente cargado una vez por proceso (ver cifrado.py):
+# lo cifrado en una sesión se puede descifrar en cualquier otra
 
 # ---------------------------
 # FUNCIONES DE CORREO
 # ---------------------------
-def enviar_correo(destinatario, asunto, cuerpo, es_html=False):
-    """Envía un correo electrónico"""
-    # Configuración del servidor SMTP (Gmail como ejemplo)
+# Los correos no se envían durante la ejecución del script: se ponen en una bandeja
+# de salida persistente que un hilo trabajador envía en segundo plano (ver bandeja_salida.py)
+ICONOS_ESTADO_CORREO = {"pendiente": "⏳", "enviando": "📤", "enviado": "✅", "fallido": "❌"}
+MAX_CORREOS_SESION = 50
+
+@st.cache_resource
+def obtener_bandeja_compartida(ruta):
+    """Bandeja de salida con su hilo trabajador, compartida por todas las sesiones del proceso"""
+    return BandejaSalida(ruta).iniciar()
+
+def credenciales_configuradas():
+    """Hay configuración SMTP para enviar; si no, muestra un aviso"""
     # NOTA: El usuario debe configurar sus credenciales en las variables de entorno
-    smtp_server = os.getenv("SMTP_SERVER", "smtp.gmail.com")
-    smtp_port = int(os.getenv("SMTP_PORT", "587"))
-    email_usuario = os.getenv("EMAIL_USUARIO", "")
-    email_password = os.getenv("EMAIL_PASSWORD", "")
-    
-    if not email_usuario or not email_password:
+    if not ConfiguracionSMTP().completa():
         st.warning("⚠️ Configura las variables de entorno EMAIL_USUARIO y EMAIL_PASSWORD para enviar correos.")
         return False
-    
+    return True
+
+def encolar_correos(correos):
+    """Pone [(destinatario, asunto, cuerpo[, es_html])] en la bandeja de salida; devuelve sus ids"""
+    if not correos or not credenciales_configuradas():
+        return []
     try:
-        msg = MIMEMultipart('alternative')
-        msg['Subject'] = asunto
-        msg['From'] = email_usuario
-        msg['To'] = destinatario
-        
-        if es_html:
-            msg.attach(MIMEText(cuerpo, 'html'))
-        else:
-            msg.attach(MIMEText(cuerpo, 'plain'))
-        
-        with smtplib.SMTP(smtp_server, smtp_port) as server:
-            server.starttls()
-            server.login(email_usuario, email_password)
-            server.send_message(msg)
-        
-        return True
+        ids = obtener_bandeja_compartida(RUTA_BANDEJA).encolar_lote(correos)
     except Exception as e:
-        st.error(f"Error al enviar correo: {str(e)}")
-        return False
+        st.error(f"Error al poner los correos en cola: {str(e)}")
+        return []
+    # La sesión solo recuerda los ids de sus últimos correos para mostrar su estado
+    st.session_state.correos_sesion = (st.session_state.correos_sesion + ids)[-MAX_CORREOS_SESION:]
+    return ids
+
+def enviar_correo(destinatario, asunto, cuerpo, es_html=False):
+    """Encola un correo electrónico; devuelve su id o None (el envío ocurre en segundo plano)"""
+    ids = encolar_correos([(destinatario, asunto, cuerpo, es_html)])
+    return ids[0] if ids else None
+
+def contactar_candidatos(candidatos, puesto):
+    """Encola el correo de contacto a [(candidato, puntuación)] con email; devuelve los ids"""
+    return encolar_correos([
+        (cand["email"], *mensaje_contacto(cand, puesto, punt))
+        for cand, punt in candidatos if cand.get("email")
+    ])
+
+def estados_correos_sesion():
+    """Estado de los correos de la sesión, del más reciente al más antiguo: [(id, estado)]"""
+    ids = st.session_state.correos_sesion
+    if not ids:
+        return []
+    estados = obtener_bandeja_compartida(RUTA_BANDEJA).estados(ids)
+    return [(id_correo, estados[id_correo]) for id_correo in reversed(ids) if id_correo in estados]
+
+def describir_estado_correo(estado):
+    """Texto corto del estado de un correo para la interfaz"""
+    texto = f"{ICONOS_ESTADO_CORREO.get(estado['estado'], '')} {estado['estado']}"
+    if estado["estado"] == "pendiente" and estado["intentos"]:
+        segundos = max(0, int(estado["proximo_intento"] - time.time()))
+        texto += f" (reintento {estado['intentos']} en {segundos} s)"
+    if estado["estado"] == "fallido" and estado["ultimo_error"]:
+        texto += f": {estado['ultimo_error']}"
+    return texto
+
+def panel_correos():
+    """Estado de entrega de los correos de la sesión"""
+    for _, estado in estados_correos_sesion()[:10]:
+        st.caption(f"{estado['destinatario']} — {describir_estado_correo(estado)}")
 
 # ---------------------------
 # FUNCIONES DE PUNTUACIÓN
@@ -211,57 +191,195 @@ def enviar_correo(destinatario, asunto, cuerpo, es_html=False):
 # ---------------------------
 # ESTADO INICIAL
 # ---------------------------
-if "base_datos" not in st.session_state:
-    st.session_state.base_datos = {"candidatos": []}
-    st.session_state.clave_publica = None
-    st.session_state.clave_privada = None
+# La sesión solo guarda su estado de vista; los candidatos viven en un almacén
+# compartido por todas las sesiones del proceso (ver almacen_en_uso)
+if "almacen_subido" not in st.session_state:
+    # Base de datos subida por el usuario (privada de la sesión)
+    st.session_state.almacen_subido = None
+    st.session_state.id_archivo_subido = None
+    st.session_state.informe_subida = None
 
 if "manual_bytes" not in st.session_state:
     st.session_state.manual_bytes = None
     st.session_state.manual_nombre = None
     st.session_state.manual_tipo = None
 
-# Inicializar claves RSA si no existen
-if st.session_state.clave_publica is None:
-    private_key, public_key = generar_par_claves_rsa()
-    st.session_state.clave_privada = serializar_clave_privada(private_key)
-    st.session_state.clave_publica = serializar_clave_publica(public_key)
+if "correos_sesion" not in st.session_state:
+    # Ids de los últimos correos encolados en la sesión (el contenido vive en la bandeja)
+    st.session_state.correos_sesion = []
+
+# ---------------------------
+# ALMACÉN DE CANDIDATOS COMPARTIDO
+# ---------------------------
+def metadatos_al_dia(metadatos):
+    """Metadatos leídos de un archivo con los puestos y el modelo con que se puntuó al cargarlo"""
+    metadatos = {clave: valor for clave, valor in metadatos.items() if clave not in ("formato", "version_formato")}
+    metadatos.update({
+        "puestos_definicion": definicion_puestos(),
+        "puestos_disponibles": list(PUESTOS),
+        "version_modelo": version_modelo_actual(),
+    })
+    return metadatos
+
+@st.cache_resource(show_spinner="Cargando base de datos de candidatos...", max_entries=1)
+def cargar_almacen_compartido(ruta, mtime, tamano):
+    """Lee la base de datos local una sola vez por proceso y la indexa, compartida por todas las sesiones
+
+    mtime y tamaño forman parte de la clave de la caché, así que el archivo solo
+    se vuelve a leer cuando cambia (por ejemplo tras compactar el registro).
+    Se lee en streaming y se puntúa por lotes, recalculando solo lo afectado
+    por cambios en PUESTOS o en el modelo. Devuelve (almacén, None), o
+    (None, error) si el archivo no se puede leer: el error también queda en la
+    caché, así que un archivo dañado no se vuelve a leer en cada interacción.
+    """
+    try:
+        metadatos, candidatos = leer_base_datos(ruta)
+        almacen = AlmacenCandidatos({"candidatos": reevaluar_flujo(metadatos, candidatos)})
+    except (OSError, ValueError, EOFError) as e:
+        # EOFError: archivo .gz/.xz truncado
+        return None, str(e) or type(e).__name__
+    obtener_cache_puntuaciones().guardar()
+    almacen.metadatos = metadatos_al_dia(metadatos)
+    return almacen, None
+
+@st.cache_resource
+def almacen_vacio():
+    """Almacén compartido cuando todavía no existe una base de datos local"""
+    return AlmacenCandidatos({"candidatos": []})
+
+@st.cache_resource
+def obtener_almacen_sqlite(ruta):
+    """Almacén SQLite compartido por todas las sesiones (una conexión por hilo)"""
+    return AlmacenSQLite(ruta)
+
+@st.cache_resource
+def obtener_registro_compartido(ruta):
+    """Registro duradero de candidatos nuevos, compartido por todas las sesiones del proceso"""
+    return RegistroCandidatos(ruta)
+
+def usa_sqlite():
+    """Con LINKENCHAMBA_SQLITE y sin base subida en la sesión se usa el almacén SQLite"""
+    return bool(RUTA_SQLITE) and st.session_state.almacen_subido is None
+
+def almacen_en_uso():
+    """Almacén de la sesión: la base subida, el SQLite o la base local compartida
+
+    Los tres ofrecen contar, buscar, estadisticas, obtener y agregar. La base
+    local compartida incorpora además los registros pendientes de compactar; la
+    base subida es privada de la sesión y no los recibe.
+    """
+    if st.session_state.almacen_subido is not None:
+        return st.session_state.almacen_subido
+    if usa_sqlite():
+        return obtener_almacen_sqlite(RUTA_SQLITE)
+    almacen = almacen_vacio()
+    ruta = buscar_base_datos_local()
+    if ruta is not None:
+        try:
+            estado = os.stat(ruta)
+            almacen_local, error = cargar_almacen_compartido(ruta, estado.st_mtime_ns, estado.st_size)
+        except OSError as e:
+            almacen_local, error = None, str(e)
+        if almacen_local is not None:
+            almacen = almacen_local
+        else:
+            st.sidebar.error(f"No se pudo cargar la base de datos local {ruta}: {error}")
+    almacen.sincronizar_registro(obtener_registro_compartido(RUTA_REGISTRO))
+    return almacen
+
+def compactar_en_segundo_plano(registro):
+    """Incorpora el registro a la base principal sin bloquear la sesión que registró"""
+    threading.Thread(
+        target=registro.compactar, args=(ruta_base_principal(),), kwargs={"esperar": False}, daemon=True
+    ).start()
+
+def importar_subida(archivo):
+    """Lee la subida por bloques, valida y puntúa por lotes; devuelve (almacén o None, informe)
+
+    El archivo nunca se decodifica entero: solo el bloque actual, el lote en
+    curso y la tabla compacta con los candidatos válidos ya procesados están
+    en memoria a la vez.
+    """
+    barra = st.sidebar.progress(0.0, text="Leyendo archivo...")
+    tamano = max(archivo.size, 1)
+
+    def progreso(validos):
+        # Posición en el archivo subido (comprimido si es .gz) sobre su tamaño
+        barra.progress(min(archivo.tell() / tamano, 1.0), text=f"{validos} candidatos importados...")
+
+    informe = {}
+    metadatos, candidatos = leer_flujo(archivo, archivo.name)
+    # La tabla compacta consume el flujo por lotes: la lista de diccionarios no llega a existir
+    almacen = AlmacenCandidatos({"candidatos": reevaluar_flujo(metadatos, candidatos, informe=informe, progreso=progreso)})
+    barra.empty()
+    obtener_cache_puntuaciones().guardar()
+    if not almacen.contar():
+        return None, informe
+    # Los metadatos posteriores a "candidatos" en el archivo solo se conocen al terminar de leerlo
+    almacen.metadatos = metadatos_al_dia(metadatos)
+    return almacen, informe
 
 # ---------------------------
 # SIDEBAR: CARGA DE BASE DE DATOS
 # ---------------------------
 st.sidebar.title(" Configuración")
 
-st.sidebar.markdown("**Cargar base de datos JSON**")
+st.sidebar.markdown("**Cargar base de datos de candidatos**")
 archivo_json = st.sidebar.file_uploader(
-    "Sube tu archivo JSON de candidatos",
-    type=["json"],
+    "Sube tu archivo de candidatos (JSON, JSONL o .gz)",
+    type=["json", "jsonl", "gz"],
     key="json_candidatos"
 )
 
-if archivo_json is not None:
-    try:
-        contenido = json.load(archivo_json)
-        if "candidatos" in contenido:
-            st.session_state.base_datos = contenido
-            st.sidebar.success(f"{len(contenido['candidatos'])} candidatos cargados.")
-        else:
-            st.sidebar.error("El JSON debe contener una clave 'candidatos'.")
-    except Exception as e:
-        st.sidebar.error(f"Error al leer el JSON: {e}")
+if archivo_json is None:
+    st.session_state.almacen_subido = None
+    st.session_state.id_archivo_subido = None
+    st.session_state.informe_subida = None
+else:
+    # Solo se parsea cuando cambia el archivo subido, no en cada interacción
+    id_archivo = getattr(archivo_json, "file_id", None) or (archivo_json.name, archivo_json.size)
+    if id_archivo != st.session_state.id_archivo_subido:
+        st.session_state.id_archivo_subido = id_archivo
+        st.session_state.almacen_subido = None
+        st.session_state.informe_subida = None
+        try:
+            almacen_subido, informe = importar_subida(archivo_json)
+            st.session_state.almacen_subido = almacen_subido
+            st.session_state.informe_subida = {
+                "invalidos": informe["invalidos"], "actualizados": informe["actualizados"],
+                "errores": informe["errores"][:5]
+            }
+            if almacen_subido is None:
+                st.sidebar.error("El archivo no contiene candidatos válidos.")
+        except Exception as e:
+            st.sidebar.error(f"Error al leer el archivo: {e}")
+    if st.session_state.almacen_subido is not None:
+        st.sidebar.success(f"{st.session_state.almacen_subido.contar()} candidatos cargados.")
+    informe = st.session_state.informe_subida
+    if informe and informe["actualizados"]:
+        st.sidebar.caption(f"{informe['actualizados']} candidatos puntuados al importar.")
+    if informe and informe["invalidos"]:
+        st.sidebar.warning(
+            f"⚠️ {informe['invalidos']} registros inválidos ignorados:\n"
+            + "\n".join(f"- Registro {numero}: {error}" for numero, error in informe["errores"])
+        )
 
-# Cargar desde archivo local si existe
-if os.path.exists("base_datos_candidatos.json"):
-    try:
-        with open("base_datos_candidatos.json", "r", encoding="utf-8") as f:
-            contenido = json.load(f)
-            if "candidatos" in contenido:
-                st.session_state.base_datos = contenido
-    except:
-        pass
+almacen = almacen_en_uso()
 
 st.sidebar.markdown("---")
-st.sidebar.markdown(f"**Total candidatos:** {len(st.session_state.base_datos.get('candidatos', []))}")
+st.sidebar.markdown(f"**Total candidatos:** {almacen.contar()}")
+
+with st.sidebar.expander("Uso de memoria"):
+    # La sesión no referencia el almacén compartido: su tamaño no depende del número de candidatos
+    memoria = informe_memoria(st.session_state)
+    st.markdown(f"**Esta sesión:** {memoria['sesion_bytes'] / 1024:.1f} KB")
+    if not usa_sqlite() and st.button("Medir almacén compartido"):
+        memoria = informe_memoria(st.session_state, almacen)
+        st.markdown(f"**Almacén compartido:** {memoria['almacen_bytes'] / 2**20:.1f} MB "
+                    f"({memoria['candidatos']} candidatos)")
+
+# Se llena al final del script para incluir los correos encolados en esta ejecución
+contenedor_correos = st.sidebar.container()
 
 # ---------------------------
 # SECCIÓN: SUBIR Y DESCARGAR MANUAL
@@ -512,17 +630,19 @@ with st.expander("Formulario de registro", expanded=True):
                 }
                 
                 # Calcular puntuaciones
-                puntuaciones = calcular_puntuaciones(respuestas)
+                puntuaciones = calcular_puntuaciones_lote([respuestas])[0]
+                obtener_cache_puntuaciones().guardar()
                 
                 # Crear candidato
                 nuevo_candidato = {
-                    "id": f"cand_{len(st.session_state.base_datos['candidatos']) + 1}",
+                    "id": f"cand_{uuid.uuid4().hex}",
                     "nombre": nombre,
                     "email": email,
                     "telefono": telefono,
                     "direccion": direccion,
                     "respuestas_cuestionario": respuestas,
                     "puntuaciones": puntuaciones,
+                    "version_modelo": version_modelo_actual(),
                     "fecha_registro": datetime.now().isoformat()
                 }
                 
@@ -532,15 +652,26 @@ with st.expander("Formulario de registro", expanded=True):
                     "telefono": telefono,
                     "direccion": direccion
                 }
-                nuevo_candidato["datos_cifrados"] = cifrar_datos(
-                    datos_sensibles,
-                    st.session_state.clave_publica
-                )
+                obtener_almacen_claves().cifrar_candidato(nuevo_candidato, datos_sensibles)
                 
-                # Agregar a la base de datos
-                st.session_state.base_datos["candidatos"].append(nuevo_candidato)
+                if st.session_state.almacen_subido is not None:
+                    # Con una base subida el registro queda solo en esa base, dentro de esta sesión
+                    almacen.agregar(nuevo_candidato)
+                elif usa_sqlite():
+                    # Con SQLite el registro es persistente y visible para todas las sesiones
+                    almacen.agregar(nuevo_candidato)
+                else:
+                    # Registro duradero (fsync) visible para todas las sesiones; se compacta
+                    # en la base principal cuando acumula suficientes registros
+                    registro = obtener_registro_compartido(RUTA_REGISTRO)
+                    registro.agregar(nuevo_candidato)
+                    almacen.sincronizar_registro(registro)
+                    if registro.pendientes_de_compactar() >= UMBRAL_COMPACTACION:
+                        compactar_en_segundo_plano(registro)
                 
                 st.success(f"Candidato '{nombre}' registrado exitosamente!")
+                if st.session_state.almacen_subido is not None:
+                    st.info("ℹ️ Se agregó a la base subida en esta sesión; no se guarda en la base compartida.")
                 st.balloons()
                 
                 # Mostrar puntuaciones
@@ -560,10 +691,12 @@ st.markdown("---")
 # ---------------------------
 st.markdown("### Buscar candidatos para contratar")
 
-if len(st.session_state.base_datos.get("candidatos", [])) == 0:
+if almacen.contar() == 0:
     st.info("Aún no hay candidatos en la base de datos. Registra candidatos usando el formulario superior.")
 else:
-    tab_buscar, tab_estadisticas = st.tabs(["🔍 Buscar candidatos", "📊 Estadísticas generales"])
+    tab_buscar, tab_asignar, tab_estadisticas = st.tabs(
+        ["🔍 Buscar candidatos", "🎯 Asignar vacantes", "📊 Estadísticas generales"]
+    )
     
     with tab_buscar:
         st.markdown("#### Selecciona el puesto que necesitas:")
@@ -582,29 +715,57 @@ else:
             step=5
         )
         
-        # Obtener candidatos con mejor puntuación para el puesto
-        candidatos_filtrados = []
-        for cand in st.session_state.base_datos["candidatos"]:
-            puntuacion = cand.get("puntuaciones", {}).get(puesto_seleccionado, 0)
-            if puntuacion >= puntuacion_minima:
-                candidatos_filtrados.append({
-                    "candidato": cand,
-                    "puntuacion": puntuacion
-                })
+        # Filtro por respuestas del cuestionario (Y / O / NO y niveles mínimos)
+        with st.expander("🧩 Filtrar por respuestas del cuestionario"):
+            filtro_todas = st.multiselect("Debe tener todas:", NOMBRES_CARACTERISTICAS, key="filtro_todas")
+            filtro_alguna = st.multiselect("Debe tener al menos una:", NOMBRES_CARACTERISTICAS, key="filtro_alguna")
+            filtro_ninguna = st.multiselect("No debe tener:", NOMBRES_CARACTERISTICAS, key="filtro_ninguna")
+            st.markdown("**Nivel mínimo:**")
+            niveles_minimos = {}
+            for columna, tema in zip(st.columns(len(TEMAS_NIVELES)), TEMAS_NIVELES):
+                with columna:
+                    nivel = st.selectbox(f"{tema}:", list(NIVEL_MAP), key=f"filtro_nivel_{tema}")
+                niveles_minimos[tema] = NIVEL_MAP[nivel]
+        filtro_respuestas = FiltroRespuestas(filtro_todas, filtro_alguna, filtro_ninguna, niveles_minimos)
         
-        # Ordenar por puntuación descendente
-        candidatos_filtrados.sort(key=lambda x: x["puntuacion"], reverse=True)
+        # Top 10: búsqueda binaria en el índice de puntuaciones (o ORDER BY ... LIMIT en SQLite),
+        # restringida a los candidatos que cumplen el filtro según el índice de bits de respuestas
+        total_filtrados, candidatos_top = almacen.buscar(puesto_seleccionado, puntuacion_minima, 10, filtro_respuestas)
         
-        if not candidatos_filtrados:
+        if total_filtrados == 0:
             st.warning(f"⚠️ No se encontraron candidatos con puntuación >= {puntuacion_minima}% para {puesto_seleccionado}.")
+            if not filtro_respuestas.vacio():
+                st.caption(f"Filtro: {filtro_respuestas.describir()}")
         else:
-            st.success(f"✅ Se encontraron {len(candidatos_filtrados)} candidatos.")
+            st.success(f"✅ Se encontraron {total_filtrados} candidatos.")
+            if not filtro_respuestas.vacio():
+                st.caption(f"Filtro: {filtro_respuestas.describir()}")
+            
+            # Contacto masivo: se encola en bloque; el trabajador lo envía por la conexión SMTP compartida
+            col_masivo1, col_masivo2 = st.columns([1, 2])
+            with col_masivo1:
+                num_contactar = st.number_input(
+                    "Candidatos a contactar:",
+                    min_value=1,
+                    max_value=min(total_filtrados, 500),
+                    value=min(total_filtrados, 10),
+                    key="num_contactar"
+                )
+            with col_masivo2:
+                st.write("")
+                if st.button(f"📧 Contactar a los {num_contactar} mejores", key="contactar_top"):
+                    _, mejores = almacen.buscar(puesto_seleccionado, puntuacion_minima, int(num_contactar), filtro_respuestas)
+                    ids = contactar_candidatos(mejores, puesto_seleccionado)
+                    if ids:
+                        st.success(f"📬 {len(ids)} correos en cola de envío. Sigue su estado en la barra lateral.")
+            
+            # Último correo de la sesión a cada destinatario
+            ultimo_correo = {}
+            for _, estado in estados_correos_sesion():
+                ultimo_correo.setdefault(estado["destinatario"], estado)
             
             # Mostrar lista de candidatos
-            for idx, item in enumerate(candidatos_filtrados[:10]):  # Mostrar top 10
-                cand = item["candidato"]
-                punt = item["puntuacion"]
-                
+            for idx, (cand, punt) in enumerate(candidatos_top):  # Mostrar top 10
                 with st.expander(f"👤 {cand['nombre']} - Puntuación: {punt}%", expanded=(idx == 0)):
                     col_info1, col_info2 = st.columns(2)
                     
@@ -628,62 +789,116 @@ else:
                     
                     with col_contact1:
                         if st.button(f"📧 Enviar correo a {cand['nombre']}", key=f"email_{cand['id']}"):
-                            asunto = f"Oportunidad laboral - {puesto_seleccionado}"
-                            cuerpo = f"""
-                            Hola {cand['nombre']},
-                            
-                            Hemos revisado tu perfil y nos interesa contactarte para una oportunidad como {puesto_seleccionado}.
-                            
-                            Tu puntuación para este puesto es: {punt}%
-                            
-                            Por favor, contáctanos para más información.
-                            
-                            Saludos,
-                            Equipo LinkenChamba
-                            """
+                            asunto, cuerpo = mensaje_contacto(cand, puesto_seleccionado, punt)
                             if enviar_correo(cand['email'], asunto, cuerpo):
-                                st.success("✅ Correo enviado exitosamente!")
+                                st.success("📬 Correo en cola de envío.")
+                                ultimo_correo.pop(cand['email'], None)
+                        if cand.get('email') in ultimo_correo:
+                            st.caption(f"Último correo: {describir_estado_correo(ultimo_correo[cand['email']])}")
                     
                     with col_contact2:
                         st.info(f"📱 Contacto directo: {cand.get('telefono', 'N/A')}")
+                        ver_similares = st.button("🔎 Similares", key=f"similares_{cand['id']}")
+                    
+                    # Vecinos más cercanos por respuestas del cuestionario (índice de bits de respuestas)
+                    if ver_similares:
+                        similares = almacen.similares(cand, 5)
+                        st.markdown("**Candidatos con respuestas parecidas:**")
+                        if not similares:
+                            st.write("No hay otros candidatos.")
+                        for similar, porcentaje in similares:
+                            punt_similar = similar.get("puntuaciones", {}).get(puesto_seleccionado, "N/A")
+                            st.write(f"- **{similar['nombre']}** ({porcentaje:.0f}% similar) - "
+                                     f"{puesto_seleccionado}: {punt_similar}% - 📧 {similar.get('email', 'N/A')}")
+    
+    with tab_asignar:
+        st.markdown("#### 🎯 Vacantes por puesto")
+        st.caption("Cada candidato ocupa como mucho una vacante; se maximiza la puntuación total de la asignación.")
+        vacantes = {}
+        for columna, puesto in zip(st.columns(len(PUESTOS)), PUESTOS):
+            with columna:
+                vacantes[puesto] = int(st.number_input(puesto, min_value=0, max_value=500, value=0,
+                                                       key=f"vacantes_{puesto}"))
+        minimo_asignacion = st.slider(
+            "Puntuación mínima para ocupar una vacante:",
+            min_value=0,
+            max_value=100,
+            value=50,
+            step=5,
+            key="minimo_asignacion"
+        )
+        
+        if sum(vacantes.values()) == 0:
+            st.info("Indica cuántas vacantes tiene cada puesto.")
+        else:
+            # Solo entran los mejores de cada puesto (tantos como vacantes en total); la poda no cambia el óptimo
+            inicio = time.perf_counter()
+            asignaciones = almacen.asignar(vacantes, minimo_asignacion)
+            duracion = time.perf_counter() - inicio
+            resumen = resumen_asignacion(asignaciones, vacantes)
+            st.success(
+                f"✅ {resumen['cubiertas']} de {sum(vacantes.values())} vacantes cubiertas - "
+                f"puntuación total {resumen['total']:.2f} ({duracion * 1000:.0f} ms)"
+            )
+            for puesto, cantidad in resumen["sin_cubrir"].items():
+                st.warning(f"⚠️ {puesto}: {cantidad} vacantes sin cubrir con puntuación >= {minimo_asignacion}%.")
+            
+            if asignaciones and st.button(f"📧 Contactar a los {len(asignaciones)} asignados", key="contactar_asignados"):
+                ids = []
+                for puesto in vacantes:
+                    ids += contactar_candidatos(
+                        [(cand, punt) for p, cand, punt in asignaciones if p == puesto], puesto
+                    )
+                if ids:
+                    st.success(f"📬 {len(ids)} correos en cola de envío. Sigue su estado en la barra lateral.")
+            
+            for puesto in vacantes:
+                asignados = [(cand, punt) for p, cand, punt in asignaciones if p == puesto]
+                if not asignados:
+                    continue
+                st.markdown(f"##### {puesto} ({len(asignados)}/{vacantes[puesto]})")
+                st.dataframe(pd.DataFrame(
+                    [
+                        {"Nombre": cand["nombre"], "Puntuación": punt, "Correo": cand.get("email", "N/A"),
+                         "Teléfono": cand.get("telefono", "N/A")}
+                        for cand, punt in asignados
+                    ]
+                ), use_container_width=True, hide_index=True)
     
     with tab_estadisticas:
         st.markdown("#### 📊 Estadísticas de la base de datos")
         
-        candidatos = st.session_state.base_datos.get("candidatos", [])
+        # Agregados cacheados en el almacén: solo se recalculan cuando cambian los datos
+        estadisticas = almacen.estadisticas()
         
-        if candidatos:
+        if estadisticas["total"]:
             # Estadísticas por puesto
             st.markdown("**Distribución de puntuaciones promedio por puesto:**")
-            stats_puestos = {}
-            for puesto in PUESTOS:
-                puntuaciones = [c.get("puntuaciones", {}).get(puesto, 0) for c in candidatos]
-                if puntuaciones:
-                    stats_puestos[puesto] = {
-                        "promedio": sum(puntuaciones) / len(puntuaciones),
-                        "maximo": max(puntuaciones),
-                        "minimo": min(puntuaciones)
-                    }
-            
-            df_stats = pd.DataFrame(stats_puestos).T
-            df_stats.columns = ["Promedio", "Máximo", "Mínimo"]
+            df_stats = pd.DataFrame(estadisticas["resumen"]).T
+            df_stats = df_stats[["promedio", "maximo", "minimo", "p25", "p50", "p75", "p90"]]
+            df_stats.columns = ["Promedio", "Máximo", "Mínimo", "P25", "Mediana", "P75", "P90"]
             st.dataframe(df_stats.round(2), use_container_width=True)
             
             # Gráfico de barras
             st.bar_chart(df_stats["Promedio"])
             
+            # Histograma de puntuaciones de un puesto
+            st.markdown("**Distribución de puntuaciones por puesto:**")
+            puesto_histograma = st.selectbox("Puesto", list(estadisticas["histogramas"].keys()), key="puesto_histograma")
+            histograma = estadisticas["histogramas"][puesto_histograma]
+            bordes = histograma["bordes"]
+            df_histograma = pd.DataFrame(
+                {"Candidatos": histograma["conteos"]},
+                index=[f"{bordes[i]:.0f}-{bordes[i + 1]:.0f}%" for i in range(len(bordes) - 1)]
+            )
+            st.bar_chart(df_histograma)
+            
             # Top candidatos por puesto
             st.markdown("**Top 5 candidatos por puesto:**")
-            for puesto in PUESTOS:
+            for puesto, top_candidatos in estadisticas["top"].items():
                 st.markdown(f"##### {puesto}")
-                top_candidatos = sorted(
-                    [(c, c.get("puntuaciones", {}).get(puesto, 0)) for c in candidatos],
-                    key=lambda x: x[1],
-                    reverse=True
-                )[:5]
-                
-                for cand, punt in top_candidatos:
-                    st.write(f"- **{cand['nombre']}**: {punt}%")
+                for fila, punt in top_candidatos:
+                    st.write(f"- **{almacen.obtener([fila])[0]['nombre']}**: {punt}%")
 
 # ---------------------------
 # FOOTER
@@ -696,3 +911,13 @@ st.markdown(
     '</div>',
     unsafe_allow_html=True
 )
+
+# ---------------------------
+# ESTADO DE LOS CORREOS
+# ---------------------------
+if st.session_state.correos_sesion:
+    with contenedor_correos:
+        with st.expander("📬 Correos enviados", expanded=True):
+            # Se refresca solo mientras quedan correos por entregar, sin volver a ejecutar toda la página
+            en_curso = any(estado["estado"] in ("pendiente", "enviando") for _, estado in estados_correos_sesion())
+            st.fragment(panel_correos, run_every=2 if en_curso else None)()
@@ -0,0 +1,86 @@
+"""
+Migración masiva de datos cifrados al cifrado de sobre (AES-GCM + RSA) con la clave activa
+Re-cifra los registros antiguos (solo RSA) y los de claves rotadas de una base JSON/JSONL
+"""
+import argparse
+import os
+import time
+from cryptography.exceptions import InvalidTag
+from formato_candidatos import escribir_base_datos, leer_base_datos
+from cifrado import FORMATO_SOBRE, obtener_almacen_claves
+
+def necesita_migracion(candidato, kid_activo):
+    """Tiene datos cifrados que no están en sobre o no usan la clave activa"""
+    datos_cifrados = candidato.get("datos_cifrados")
+    if datos_cifrados is None:
+        return False
+    return not (isinstance(datos_cifrados, dict) and datos_cifrados.get("formato") == FORMATO_SOBRE
+                and candidato.get("clave_id") == kid_activo)
+
+def migrar_lote(candidatos, almacen_claves, hilos, informe):
+    """Re-cifra en sitio los candidatos del lote que lo necesitan"""
+    pendientes = [c for c in candidatos if necesita_migracion(c, almacen_claves.activa)]
+    informe["sin_cambios"] += len(candidatos) - len(pendientes)
+    if not pendientes:
+        return
+    cifrados = [(c["datos_cifrados"], c.get("clave_id")) for c in pendientes]
+    try:
+        planos = almacen_claves.descifrar_lote(cifrados, hilos=hilos)
+    except (InvalidTag, KeyError, ValueError):
+        # Algún registro no se puede descifrar: se separan uno por uno
+        planos = []
+        for cifrado in cifrados:
+            try:
+                planos.append(almacen_claves.descifrar_lote([cifrado])[0])
+            except (InvalidTag, KeyError, ValueError):
+                planos.append(None)
+    descifrables = [(c, p) for c, p in zip(pendientes, planos) if p is not None]
+    informe["no_descifrables"] += len(pendientes) - len(descifrables)
+    nuevos = almacen_claves.cifrar_lote([p for _, p in descifrables], hilos=hilos)
+    for (candidato, _), (kid, sobre) in zip(descifrables, nuevos):
+        candidato["clave_id"] = kid
+        candidato["datos_cifrados"] = sobre
+    informe["migrados"] += len(descifrables)
+
+def migrar_archivo(ruta, salida=None, tam_lote=10000, hilos=None):
+    """Re-cifra una base de datos en streaming; por defecto la reescribe en su lugar"""
+    almacen_claves = obtener_almacen_claves()
+    metadatos, candidatos = leer_base_datos(ruta)
+    metadatos = {k: v for k, v in metadatos.items() if k not in ("formato", "version_formato")}
+    informe = {"migrados": 0, "sin_cambios": 0, "no_descifrables": 0}
+
+    def migrados():
+        lote = []
+        for candidato in candidatos:
+            lote.append(candidato)
+            if len(lote) >= tam_lote:
+                migrar_lote(lote, almacen_claves, hilos, informe)
+                yield from lote
+                lote = []
+                print(f"   {informe['migrados']} migrados, {informe['sin_cambios']} sin cambios...")
+        migrar_lote(lote, almacen_claves, hilos, informe)
+        yield from lote
+
+    escribir_base_datos(salida or ruta, metadatos, migrados(), sincronizar=True)
+    informe["clave_activa"] = almacen_claves.activa
+    return informe
+
+def main():
+    """Migra los datos cifrados de una base de candidatos a la clave activa"""
+    parser = argparse.ArgumentParser(description="Re-cifrado masivo de datos sensibles de candidatos")
+    parser.add_argument("archivo", help="Base de datos de candidatos (.json o .jsonl, opcionalmente .gz/.xz)")
+    parser.add_argument("--salida", help="Archivo de salida (por defecto se reescribe el de entrada)")
+    parser.add_argument("--tam-lote", type=int, default=10000)
+    parser.add_argument("--hilos", type=int, default=os.cpu_count() or 1, help="Hilos para cifrar y descifrar")
+    args = parser.parse_args()
+
+    inicio = time.time()
+    informe = migrar_archivo(args.archivo, args.salida, tam_lote=args.tam_lote, hilos=args.hilos)
+    print(f"\n[OK] {informe['migrados']} registros re-cifrados con la clave {informe['clave_activa']} "
+          f"en {time.time() - inicio:.1f} s")
+    print(f"   Sin cambios: {informe['sin_cambios']}")
+    if informe["no_descifrables"]:
+        print(f"   No descifrables (clave desconocida, se dejaron igual): {informe['no_descifrables']}")
+
+if __name__ == "__main__":
+    main()
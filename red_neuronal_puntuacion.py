@@ -2,34 +2,146 @@
 Módulo compartido con la red neuronal para calcular puntuaciones de candidatos
 Usado tanto en el generador de base de datos como en la aplicación Streamlit
 """
+import argparse
+import hashlib
+import json
+import os
+import struct
+import threading
+import zipfile
+from collections import OrderedDict
 import numpy as np
+import cuestionario
+from formato_candidatos import cargar_base_datos
+
+# Artefacto de pesos: se carga si existe; si no, se usan los pesos iniciales con semilla fija
+RUTA_MODELO = os.getenv(
+    "LINKENCHAMBA_MODELO",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "modelo_puntuacion.npz")
+)
+VERSION_MODELO_INICIAL = "1.0-semilla42"
+CAPAS = ("W1", "b1", "W2", "b2", "W3", "b3")
+
+def pesos_iniciales(semilla=42):
+    """Genera los pesos iniciales sin tocar el generador global de NumPy
+
+    Usa un RandomState propio con la misma semilla y el mismo orden de
+    muestreo que la versión original, por lo que los pesos son idénticos.
+    """
+    rng = np.random.RandomState(semilla)
+    # Capa de entrada: 55 características (todas las preguntas del cuestionario)
+    # Capa oculta 1: 30 neuronas
+    # Capa oculta 2: 15 neuronas
+    # Capa de salida: 5 puestos
+    return {
+        "W1": rng.randn(55, 30) * 0.1,
+        "b1": rng.randn(30) * 0.1,
+        "W2": rng.randn(30, 15) * 0.1,
+        "b2": rng.randn(15) * 0.1,
+        "W3": rng.randn(15, 5) * 0.1,
+        "b3": rng.randn(5) * 0.1,
+    }
+
+def _cargar_npz_mapeado(ruta):
+    """Abre cada arreglo de un .npz sin comprimir como memoria mapeada (solo lectura)
+
+    np.load ignora mmap_mode para archivos .npz, así que se localiza el
+    desplazamiento de cada miembro dentro del zip y se mapea directamente.
+    Devuelve None si algún miembro está comprimido.
+    """
+    arreglos = {}
+    with zipfile.ZipFile(ruta) as zf, open(ruta, "rb") as f:
+        for info in zf.infolist():
+            if info.compress_type != zipfile.ZIP_STORED:
+                return None
+            # Cabecera local del zip: 30 bytes fijos + nombre + campo extra
+            f.seek(info.header_offset)
+            cabecera = f.read(30)
+            largo_nombre, largo_extra = struct.unpack("<HH", cabecera[26:30])
+            f.seek(info.header_offset + 30 + largo_nombre + largo_extra)
+            version = np.lib.format.read_magic(f)
+            if version == (1, 0):
+                forma, orden_fortran, dtype = np.lib.format.read_array_header_1_0(f)
+            else:
+                forma, orden_fortran, dtype = np.lib.format.read_array_header_2_0(f)
+            nombre = info.filename[:-4] if info.filename.endswith(".npy") else info.filename
+            if dtype.hasobject or not forma:
+                # Escalares y cadenas (como la versión) se leen normalmente
+                arreglos[nombre] = None
+                continue
+            arreglos[nombre] = np.memmap(
+                ruta, dtype=dtype, mode="r", offset=f.tell(), shape=forma,
+                order="F" if orden_fortran else "C"
+            )
+    return arreglos
+
+def cargar_pesos(ruta):
+    """Carga pesos y versión desde un artefacto .npz versionado"""
+    mapeados = None
+    try:
+        mapeados = _cargar_npz_mapeado(ruta)
+    except (ValueError, OSError, zipfile.BadZipFile):
+        mapeados = None
+    with np.load(ruta, allow_pickle=False) as datos:
+        faltantes = [capa for capa in CAPAS if capa not in datos.files]
+        if faltantes or "version" not in datos.files:
+            raise ValueError(f"Artefacto de modelo incompleto en {ruta}: faltan {faltantes or ['version']}")
+        version = str(datos["version"])
+        pesos = {}
+        for capa in CAPAS:
+            if mapeados is not None and mapeados.get(capa) is not None:
+                pesos[capa] = mapeados[capa]
+            else:
+                pesos[capa] = np.array(datos[capa])
+    return pesos, version
+
+def guardar_pesos(ruta, pesos, version):
+    """Guarda pesos y versión en un .npz sin comprimir (permite cargarlo mapeado)"""
+    ruta_temporal = ruta + ".tmp"
+    with open(ruta_temporal, "wb") as f:
+        np.savez(f, version=np.array(version), **{capa: np.asarray(pesos[capa]) for capa in CAPAS})
+    os.replace(ruta_temporal, ruta)
 
 # Simulación de red neuronal multicapa para calcular puntuaciones
 class RedNeuronalPuntuacion:
     """Red neuronal multicapa simple para calcular puntuaciones de candidatos"""
-    def __init__(self):
-        # Pesos aleatorios inicializados (simulando una red entrenada)
-        np.random.seed(42)
-        # Capa de entrada: 55 características (todas las preguntas del cuestionario)
-        # Capa oculta 1: 30 neuronas
-        # Capa oculta 2: 15 neuronas
-        # Capa de salida: 5 puestos
-        self.W1 = np.random.randn(55, 30) * 0.1
-        self.b1 = np.random.randn(30) * 0.1
-        self.W2 = np.random.randn(30, 15) * 0.1
-        self.b2 = np.random.randn(15) * 0.1
-        self.W3 = np.random.randn(15, 5) * 0.1
-        self.b3 = np.random.randn(5) * 0.1
+    def __init__(self, pesos=None, version=None):
+        # Sin pesos explícitos se usan los iniciales (simulando una red entrenada)
+        if pesos is None:
+            pesos = pesos_iniciales()
+            version = version or VERSION_MODELO_INICIAL
+        self.version = version or "sin-version"
+        self.W1 = pesos["W1"]
+        self.b1 = pesos["b1"]
+        self.W2 = pesos["W2"]
+        self.b2 = pesos["b2"]
+        self.W3 = pesos["W3"]
+        self.b3 = pesos["b3"]
+    
+    @classmethod
+    def desde_archivo(cls, ruta):
+        """Crea la red a partir de un artefacto de pesos versionado"""
+        pesos, version = cargar_pesos(ruta)
+        return cls(pesos, version)
+    
+    def pesos(self):
+        """Devuelve los pesos de la red como diccionario"""
+        return {capa: getattr(self, capa) for capa in CAPAS}
+    
+    def guardar(self, ruta):
+        """Guarda los pesos y la versión de la red en un artefacto .npz"""
+        guardar_pesos(ruta, self.pesos(), self.version)
     
     def sigmoid(self, x):
         """Función de activación sigmoide"""
         return 1 / (1 + np.exp(-np.clip(x, -500, 500)))
     
     def forward(self, X):
-        """Propagación hacia adelante"""
+        """Propagación hacia adelante (un vector o una matriz N x 55)"""
         # Normalizar entrada
-        X = np.array(X)
-        if X.ndim == 1:
+        X = np.asarray(X, dtype=np.float64)
+        un_solo_candidato = X.ndim == 1
+        if un_solo_candidato:
             X = X.reshape(1, -1)
         
         # Capa oculta 1
@@ -44,121 +156,266 @@ class RedNeuronalPuntuacion:
         Z3 = np.dot(A2, self.W3) + self.b3
         A3 = self.sigmoid(Z3)
         
-        return A3[0] * 100  # Escalar a 0-100%
+        # Escalar a 0-100%
+        if un_solo_candidato:
+            return A3[0] * 100
+        return A3 * 100
     
     def extraer_caracteristicas(self, respuestas):
         """Extrae características numéricas de las respuestas"""
-        features = []
-        
-        # Habilidades prácticas (10 características binarias)
-        habilidades_opciones = [
-            "Atender clientes", "Manejar caja", "Organizar archivos",
-            "Usar computadora", "Empacar productos", "Limpiar y mantener",
-            "Ayudar en preparación", "Tomar mensajes", "Resolver quejas",
-            "Ayudar a compañeros"
-        ]
-        for hab in habilidades_opciones:
-            hab_seleccionadas = respuestas.get("habilidades_practicas", [])
-            features.append(1 if any(hab.lower() in h.lower() for h in hab_seleccionadas) else 0)
-        
-        # Herramientas (7 características binarias)
-        herramientas_opciones = [
-            "Computadora", "Teléfono", "Caja registradora",
-            "Herramientas básicas", "Equipo de cocina", "Vehículo",
-            "aprendo rápido"
-        ]
-        herramientas_seleccionadas = respuestas.get("herramientas", [])
-        for herr in herramientas_opciones:
-            features.append(1 if any(herr.lower() in h.lower() for h in herramientas_seleccionadas) else 0)
-        
-        # Ambiente (5 características one-hot)
-        ambiente = respuestas.get("ambiente", "")
-        ambientes_opciones = [
-            "movimiento", "tranquilo", "interactuar", "concentrado", "adapto"
-        ]
-        for amb in ambientes_opciones:
-            features.append(1 if amb.lower() in ambiente.lower() else 0)
-        
-        # Actividades (5 características binarias)
-        actividades_opciones = [
-            "Ayudar directamente", "Crear o arreglar", "Organizar",
-            "Aprender cosas nuevas", "Resolver problemas"
-        ]
-        actividades_seleccionadas = respuestas.get("actividades", [])
-        for act in actividades_opciones:
-            features.append(1 if any(act.lower() in a.lower() for a in actividades_seleccionadas) else 0)
-        
-        # Conocimientos (6 características binarias)
-        conocimientos_opciones = [
-            "Matemáticas", "Lectura rápida", "Escritura clara",
-            "Conceptos básicos de ventas", "Conocimiento de productos", "aprendo viendo"
-        ]
-        conocimientos_seleccionados = respuestas.get("conocimientos", [])
-        for con in conocimientos_opciones:
-            features.append(1 if any(con.lower() in c.lower() for c in conocimientos_seleccionados) else 0)
-        
-        # Niveles de conocimiento (4 características: 0=Nada, 1=Básico, 2=Intermedio, 3=Avanzado)
-        niveles = respuestas.get("niveles", {})
-        nivel_map = {"Nada": 0, "Básico": 1, "Intermedio": 2, "Avanzado": 3}
-        for tema in ["Productividad", "Organización", "Atención clientes", "Trabajo equipo"]:
-            nivel = niveles.get(tema, "Nada")
-            features.append(nivel_map.get(nivel, 0) / 3.0)  # Normalizar a 0-1
-        
-        # Tipo de trabajo (1 característica)
-        tipo_trabajo = respuestas.get("tipo_trabajo", "")
-        if tipo_trabajo:
-            features.append(1 if "tiempo completo" in tipo_trabajo.lower() else 0.5)
+        return extraer_caracteristicas_lote([respuestas])[0].tolist()
+    
+    def extraer_caracteristicas_lote(self, lista_respuestas):
+        """Extrae la matriz N x 55 de características de varios candidatos"""
+        return extraer_caracteristicas_lote(lista_respuestas)
+
+class RedPrecisionReducida:
+    """Inferencia opcional en float32 (W1 opcionalmente cuantizada a int8)
+
+    Con int8, W1 se guarda en int8 con una escala por columna que se aplica
+    después del producto. Ocupa la cuarta parte, pero la multiplicación sigue
+    siendo en float32 (NumPy no tiene producto entero acelerado), así que no es
+    más rápida que float32: sirve para medir el error de cuantizar la red.
+
+    Reutiliza búferes de activación entre lotes y aplica la sigmoide en
+    sitio, sin temporales por capa. La instancia se comparte entre sesiones,
+    así que cada hilo tiene sus propios búferes. Devuelve lo mismo que
+    RedNeuronalPuntuacion.forward (puntuaciones 0-100 en float64).
+    """
+    def __init__(self, red, cuantizar_w1=False, filas_bufer=65536):
+        self.version = red.version
+        self.precision = "int8" if cuantizar_w1 else "float32"
+        self.filas_bufer = filas_bufer
+        if cuantizar_w1:
+            # Cuantización simétrica por columna: W1 ~ W1 (int8) * escala_w1
+            W1 = np.asarray(red.W1, dtype=np.float64)
+            self.escala_w1 = (np.abs(W1).max(axis=0) / 127.0).astype(np.float32)
+            self.escala_w1[self.escala_w1 == 0] = 1.0
+            self.W1 = np.round(W1 / self.escala_w1).astype(np.int8)
         else:
-            features.append(0.5)  # Valor por defecto
-        
-        # Logros (5 características binarias)
-        logros_opciones = [
-            "Aprender un oficio", "Ingreso estable", "Ganar experiencia",
-            "Desarrollarme dentro", "Descubrir en qué soy bueno"
-        ]
-        logros_seleccionados = respuestas.get("logros", [])
-        for logro in logros_opciones:
-            features.append(1 if any(logro.lower() in l.lower() for l in logros_seleccionados) else 0)
-        
-        # Reacción (5 características one-hot)
-        reaccion = respuestas.get("reaccion", "")
-        reacciones_opciones = [
-            "pregunto", "busco", "organizo", "actúo", "mantengo"
-        ]
-        for reac in reacciones_opciones:
-            features.append(1 if reac.lower() in reaccion.lower() else 0)
-        
-        # Destaca (6 características binarias)
-        destaca_opciones = [
-            "ayudar a otros", "encontrar errores", "aprender algo nuevo",
-            "mantener el orden", "motivar al equipo", "necesito oportunidad"
-        ]
-        destaca_seleccionados = respuestas.get("destaca", [])
-        for dest in destaca_opciones:
-            features.append(1 if any(dest.lower() in d.lower() for d in destaca_seleccionados) else 0)
-        
-        # Motivación (1 característica)
-        motivacion = respuestas.get("motivacion", "")
-        if motivacion:
-            if "todas" in motivacion.lower():
-                features.append(1.0)
-            elif "aprender" in motivacion.lower():
-                features.append(0.8)
-            elif "estabilidad" in motivacion.lower():
-                features.append(0.6)
-            else:
-                features.append(0.4)
+            self.escala_w1 = None
+            self.W1 = np.asarray(red.W1, dtype=np.float32)
+        self.b1 = np.asarray(red.b1, dtype=np.float32)
+        self.W2 = np.asarray(red.W2, dtype=np.float32)
+        self.b2 = np.asarray(red.b2, dtype=np.float32)
+        self.W3 = np.asarray(red.W3, dtype=np.float32)
+        self.b3 = np.asarray(red.b3, dtype=np.float32)
+
+        # Búferes reutilizados en cada llamada, uno por hilo
+        self._locales = threading.local()
+
+    def _buferes(self, filas):
+        """Búferes (X, A1, A2, A3) del hilo actual con al menos `filas` filas"""
+        buferes = getattr(self._locales, "buferes", None)
+        if buferes is None or len(buferes[0]) < filas:
+            # Crecen hasta filas_bufer según el lote más grande visto en el hilo
+            filas = min(self.filas_bufer, max(filas, 1024))
+            buferes = tuple(
+                np.empty((filas, columnas), dtype=np.float32)
+                for columnas in (self.W1.shape[0], self.W1.shape[1], self.W2.shape[1], self.W3.shape[1])
+            )
+            self._locales.buferes = buferes
+        return buferes
+
+    @staticmethod
+    def _sigmoid_en_sitio(Z):
+        """Sigmoide en sitio; en float32 exp desborda a partir de ~88"""
+        np.clip(Z, -88, 88, out=Z)
+        np.negative(Z, out=Z)
+        np.exp(Z, out=Z)
+        Z += 1
+        np.reciprocal(Z, out=Z)
+
+    def forward(self, X):
+        """Propagación hacia adelante por bloques de filas_bufer filas"""
+        X = np.asarray(X)
+        un_solo_candidato = X.ndim == 1
+        if un_solo_candidato:
+            X = X.reshape(1, -1)
+
+        salida = np.empty((X.shape[0], self.W3.shape[1]), dtype=np.float64)
+        buferes = self._buferes(min(X.shape[0], self.filas_bufer))
+        for inicio in range(0, X.shape[0], self.filas_bufer):
+            fin = min(inicio + self.filas_bufer, X.shape[0])
+            n = fin - inicio
+            Xb, A1, A2, A3 = (bufer[:n] for bufer in buferes)
+            np.copyto(Xb, X[inicio:fin], casting="unsafe")
+
+            np.dot(Xb, self.W1, out=A1)
+            if self.escala_w1 is not None:
+                A1 *= self.escala_w1
+            A1 += self.b1
+            self._sigmoid_en_sitio(A1)
+
+            np.dot(A1, self.W2, out=A2)
+            A2 += self.b2
+            self._sigmoid_en_sitio(A2)
+
+            np.dot(A2, self.W3, out=A3)
+            A3 += self.b3
+            self._sigmoid_en_sitio(A3)
+
+            np.multiply(A3, 100, out=salida[inicio:fin])
+
+        if un_solo_candidato:
+            return salida[0]
+        return salida
+
+    def extraer_caracteristicas_lote(self, lista_respuestas):
+        """Extrae la matriz N x 55 de características de varios candidatos"""
+        return extraer_caracteristicas_lote(lista_respuestas)
+
+def comparar_precision(X, red=None):
+    """Desviación máxima (en puntos porcentuales) de cada modo reducido frente a float64"""
+    red = red or obtener_red_neuronal()
+    referencia = red.forward(X)
+    return {
+        "float32": float(np.max(np.abs(RedPrecisionReducida(red).forward(X) - referencia))),
+        "int8": float(np.max(np.abs(RedPrecisionReducida(red, cuantizar_w1=True).forward(X) - referencia))),
+    }
+
+# ---------------------------
+# CODIFICADOR DE CARACTERÍSTICAS
+# ---------------------------
+NUM_CARACTERISTICAS = 55
+
+# Palabras clave de cada pregunta; una característica por palabra clave.
+# Una respuesta activa la columna si contiene la palabra clave (sin distinguir mayúsculas).
+CLAVES_HABILIDADES = [
+    "Atender clientes", "Manejar caja", "Organizar archivos",
+    "Usar computadora", "Empacar productos", "Limpiar y mantener",
+    "Ayudar en preparación", "Tomar mensajes", "Resolver quejas",
+    "Ayudar a compañeros"
+]
+CLAVES_HERRAMIENTAS = [
+    "Computadora", "Teléfono", "Caja registradora",
+    "Herramientas básicas", "Equipo de cocina", "Vehículo",
+    "aprendo rápido"
+]
+CLAVES_AMBIENTE = ["movimiento", "tranquilo", "interactuar", "concentrado", "adapto"]
+CLAVES_ACTIVIDADES = [
+    "Ayudar directamente", "Crear o arreglar", "Organizar",
+    "Aprender cosas nuevas", "Resolver problemas"
+]
+CLAVES_CONOCIMIENTOS = [
+    "Matemáticas", "Lectura rápida", "Escritura clara",
+    "Conceptos básicos de ventas", "Conocimiento de productos", "aprendo viendo"
+]
+TEMAS_NIVELES = ["Productividad", "Organización", "Atención clientes", "Trabajo equipo"]
+NIVEL_MAP = {"Nada": 0, "Básico": 1, "Intermedio": 2, "Avanzado": 3}
+CLAVES_LOGROS = [
+    "Aprender un oficio", "Ingreso estable", "Ganar experiencia",
+    "Desarrollarme dentro", "Descubrir en qué soy bueno"
+]
+CLAVES_REACCION = ["pregunto", "busco", "organizo", "actúo", "mantengo"]
+CLAVES_DESTACA = [
+    "ayudar a otros", "encontrar errores", "aprender algo nuevo",
+    "mantener el orden", "motivar al equipo", "necesito oportunidad"
+]
+
+# Bloques de columnas: (campo, palabras clave, columna inicial, admite varias respuestas)
+BLOQUES_BINARIOS = [
+    ("habilidades_practicas", CLAVES_HABILIDADES, 0, True),
+    ("herramientas", CLAVES_HERRAMIENTAS, 10, True),
+    ("ambiente", CLAVES_AMBIENTE, 17, False),
+    ("actividades", CLAVES_ACTIVIDADES, 22, True),
+    ("conocimientos", CLAVES_CONOCIMIENTOS, 27, True),
+    ("logros", CLAVES_LOGROS, 38, True),
+    ("reaccion", CLAVES_REACCION, 43, False),
+    ("destaca", CLAVES_DESTACA, 48, True),
+]
+COLUMNA_NIVELES = 33
+COLUMNA_TIPO_TRABAJO = 37
+COLUMNA_MOTIVACION = 54
+
+def _columnas_difusas(texto, claves, inicio):
+    """Columnas que activa un texto según la búsqueda de subcadenas original"""
+    texto_min = texto.lower()
+    return tuple(inicio + k for k, clave in enumerate(claves) if clave.lower() in texto_min)
+
+def _valor_tipo_trabajo(tipo_trabajo):
+    """Característica de tipo de trabajo (igual que el codificador original)"""
+    if tipo_trabajo:
+        return 1 if "tiempo completo" in tipo_trabajo.lower() else 0.5
+    return 0.5
+
+def _valor_motivacion(motivacion):
+    """Característica de motivación (igual que el codificador original)"""
+    if motivacion:
+        if "todas" in motivacion.lower():
+            return 1.0
+        elif "aprender" in motivacion.lower():
+            return 0.8
+        elif "estabilidad" in motivacion.lower():
+            return 0.6
+        return 0.4
+    return 0.5
+
+def _compilar_indice_opciones():
+    """Precalcula, para cada opción canónica del cuestionario, las columnas que activa"""
+    opciones_por_campo = {
+        "habilidades_practicas": cuestionario.HABILIDADES_PRACTICAS,
+        "herramientas": cuestionario.HERRAMIENTAS,
+        "ambiente": cuestionario.AMBIENTES,
+        "actividades": cuestionario.ACTIVIDADES,
+        "conocimientos": cuestionario.CONOCIMIENTOS,
+        "logros": cuestionario.LOGROS,
+        "reaccion": cuestionario.REACCIONES,
+        "destaca": cuestionario.DESTACA,
+    }
+    indice = {}
+    for campo, claves, inicio, _ in BLOQUES_BINARIOS:
+        indice[campo] = {
+            opcion: _columnas_difusas(opcion, claves, inicio)
+            for opcion in opciones_por_campo[campo]
+        }
+    return indice
+
+# Índices compilados una sola vez al importar el módulo
+INDICE_OPCIONES = _compilar_indice_opciones()
+INDICE_TIPO_TRABAJO = {t: _valor_tipo_trabajo(t) for t in cuestionario.TIPOS_TRABAJO}
+INDICE_MOTIVACION = {m: _valor_motivacion(m) for m in cuestionario.MOTIVACIONES}
+NIVELES_NORMALIZADOS = {nivel: valor / 3.0 for nivel, valor in NIVEL_MAP.items()}
+
+def codificar_respuestas(respuestas, fila):
+    """Escribe en `fila` (vector de 55 ceros) las características de unas respuestas
+
+    Las opciones canónicas se resuelven con los índices precompilados; las
+    respuestas desconocidas o de texto libre usan la búsqueda de subcadenas.
+    """
+    for campo, claves, inicio, multiple in BLOQUES_BINARIOS:
+        indice = INDICE_OPCIONES[campo]
+        if multiple:
+            seleccion = respuestas.get(campo, [])
         else:
-            features.append(0.5)  # Valor por defecto
-        
-        # Asegurar que tenemos exactamente 55 características (ajustar si es necesario)
-        # Si tenemos más, tomar las primeras 55; si menos, rellenar con 0
-        if len(features) > 55:
-            features = features[:55]
-        elif len(features) < 55:
-            features.extend([0.0] * (55 - len(features)))
-        
-        return features
+            seleccion = (respuestas.get(campo, ""),)
+        for texto in seleccion:
+            columnas = indice.get(texto)
+            if columnas is None:
+                columnas = _columnas_difusas(texto, claves, inicio)
+            for columna in columnas:
+                fila[columna] = 1
+
+    niveles = respuestas.get("niveles", {})
+    for k, tema in enumerate(TEMAS_NIVELES):
+        nivel = niveles.get(tema, "Nada")
+        fila[COLUMNA_NIVELES + k] = NIVELES_NORMALIZADOS.get(nivel, 0.0)
+
+    tipo_trabajo = respuestas.get("tipo_trabajo", "")
+    valor = INDICE_TIPO_TRABAJO.get(tipo_trabajo)
+    fila[COLUMNA_TIPO_TRABAJO] = valor if valor is not None else _valor_tipo_trabajo(tipo_trabajo)
+
+    motivacion = respuestas.get("motivacion", "")
+    valor = INDICE_MOTIVACION.get(motivacion)
+    fila[COLUMNA_MOTIVACION] = valor if valor is not None else _valor_motivacion(motivacion)
+
+def extraer_caracteristicas_lote(lista_respuestas):
+    """Construye la matriz N x 55 de características con el codificador precompilado"""
+    lista_respuestas = list(lista_respuestas)
+    X = np.zeros((len(lista_respuestas), NUM_CARACTERISTICAS), dtype=np.float64)
+    for fila, respuestas in zip(X, lista_respuestas):
+        codificar_respuestas(respuestas, fila)
+    return X
 
 # Definición de puestos y sus criterios de puntuación
 PUESTOS = {
@@ -186,13 +443,178 @@ PUESTOS = {
 
 # Instancia global de la red neuronal
 _red_neuronal = None
+# Variantes de precisión reducida, creadas bajo demanda ("float32" o "int8")
+_redes_reducidas = {}
+PRECISIONES = ("float64", "float32", "int8")
 
-def obtener_red_neuronal():
-    """Obtiene o crea la instancia de la red neuronal"""
+def obtener_red_neuronal(precision="float64"):
+    """Obtiene o crea la instancia de la red neuronal (desde RUTA_MODELO si existe)"""
     global _red_neuronal
     if _red_neuronal is None:
-        _red_neuronal = RedNeuronalPuntuacion()
-    return _red_neuronal
+        if os.path.exists(RUTA_MODELO):
+            _red_neuronal = RedNeuronalPuntuacion.desde_archivo(RUTA_MODELO)
+        else:
+            _red_neuronal = RedNeuronalPuntuacion()
+    if precision == "float64":
+        return _red_neuronal
+    if precision not in PRECISIONES:
+        raise ValueError(f"Precisión no soportada: {precision} (opciones: {', '.join(PRECISIONES)})")
+    if precision not in _redes_reducidas:
+        _redes_reducidas[precision] = RedPrecisionReducida(_red_neuronal, cuantizar_w1=(precision == "int8"))
+    return _redes_reducidas[precision]
+
+def version_modelo_actual():
+    """Versión del modelo con el que se calculan las puntuaciones actuales"""
+    return obtener_red_neuronal().version
+
+# ---------------------------
+# CACHÉ DE SALIDAS DE LA RED
+# ---------------------------
+# Se guarda la salida de la red (antes del ajuste por puesto), así que los
+# cambios en PUESTOS no invalidan la caché; solo la versión del modelo lo hace.
+RUTA_CACHE_PUNTUACIONES = os.getenv("LINKENCHAMBA_CACHE_PUNTUACIONES")
+MAX_ENTRADAS_CACHE = int(os.getenv("LINKENCHAMBA_CACHE_MAX", "100000"))
+
+def clave_respuestas(respuestas, version, precision="float64"):
+    """Hash canónico de los campos puntuados (todo menos "unico") y la versión del modelo
+
+    Las listas se ordenan porque el orden de selección no cambia la puntuación.
+    """
+    campos = {
+        campo: sorted(valor, key=str) if isinstance(valor, list) else valor
+        for campo, valor in respuestas.items()
+        if campo != "unico"
+    }
+    contenido = json.dumps([version, precision, campos], sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.blake2b(contenido.encode("utf-8"), digest_size=16).hexdigest()
+
+class CachePuntuaciones:
+    """Caché LRU acotada de salidas de la red, con respaldo opcional en disco
+
+    La comparten todas las sesiones del proceso: cada cambio del OrderedDict
+    (incluido el move_to_end de una lectura) se hace con el candado tomado.
+    """
+    def __init__(self, max_entradas=MAX_ENTRADAS_CACHE, ruta=None):
+        self.max_entradas = max_entradas
+        self.ruta = ruta
+        self.aciertos = 0
+        self.fallos = 0
+        self._entradas = OrderedDict()
+        self._modificada = False
+        self._candado = threading.Lock()
+        self._candado_guardado = threading.Lock()
+        if ruta and os.path.exists(ruta):
+            self.cargar()
+
+    def __len__(self):
+        return len(self._entradas)
+
+    def obtener(self, clave):
+        """Devuelve la salida guardada (o None) y la marca como usada recientemente"""
+        with self._candado:
+            valor = self._entradas.get(clave)
+            if valor is None:
+                self.fallos += 1
+                return None
+            self._entradas.move_to_end(clave)
+            self.aciertos += 1
+            return valor
+
+    def agregar(self, clave, salida):
+        """Guarda una salida y expulsa la menos usada si se supera el límite"""
+        salida = np.array(salida, dtype=np.float64)
+        with self._candado:
+            self._entradas[clave] = salida
+            self._entradas.move_to_end(clave)
+            while len(self._entradas) > self.max_entradas:
+                self._entradas.popitem(last=False)
+            self._modificada = True
+
+    def estadisticas(self):
+        """Aciertos, fallos, tasa de aciertos y tamaño actual"""
+        with self._candado:
+            aciertos, fallos, entradas = self.aciertos, self.fallos, len(self._entradas)
+        consultas = aciertos + fallos
+        return {
+            "aciertos": aciertos,
+            "fallos": fallos,
+            "tasa_aciertos": aciertos / consultas if consultas else 0.0,
+            "entradas": entradas,
+            "max_entradas": self.max_entradas,
+        }
+
+    def cargar(self):
+        """Carga las entradas del archivo de respaldo (las más recientes al final)"""
+        with np.load(self.ruta, allow_pickle=False) as datos:
+            claves, salidas = datos["claves"], datos["salidas"]
+        with self._candado:
+            for clave, salida in zip(claves[-self.max_entradas:], salidas[-self.max_entradas:]):
+                self._entradas[str(clave)] = salida
+            self._modificada = False
+
+    def guardar(self):
+        """Escribe la caché en el archivo de respaldo si cambió desde la última vez"""
+        if not self.ruta:
+            return False
+        # Un guardado a la vez (comparten el .tmp); el contenido se copia con el
+        # candado de entradas tomado y se escribe sin él
+        with self._candado_guardado:
+            with self._candado:
+                if not self._modificada:
+                    return False
+                claves = np.array(list(self._entradas.keys()), dtype="U32")
+                salidas = list(self._entradas.values())
+                self._modificada = False
+            try:
+                salidas = np.stack(salidas) if salidas else np.empty((0, 0))
+                ruta_temporal = self.ruta + ".tmp"
+                with open(ruta_temporal, "wb") as f:
+                    np.savez(f, claves=claves, salidas=salidas)
+                os.replace(ruta_temporal, self.ruta)
+            except BaseException:
+                with self._candado:
+                    self._modificada = True
+                raise
+            return True
+
+# Caché global compartida por el generador y la aplicación
+_cache_puntuaciones = None
+
+def obtener_cache_puntuaciones():
+    """Obtiene o crea la caché global de salidas de la red"""
+    global _cache_puntuaciones
+    if _cache_puntuaciones is None:
+        _cache_puntuaciones = CachePuntuaciones(ruta=RUTA_CACHE_PUNTUACIONES)
+    return _cache_puntuaciones
+
+def salidas_red_lote(lista_respuestas, precision="float64", usar_cache=True):
+    """Salida N x 5 de la red para varios candidatos, reutilizando la caché
+
+    Solo se ejecuta la red para los conjuntos de respuestas que no están en
+    la caché, y una sola vez por conjunto aunque se repita en el lote.
+    """
+    lista_respuestas = list(lista_respuestas)
+    red_neuronal = obtener_red_neuronal(precision)
+    if not usar_cache:
+        return red_neuronal.forward(red_neuronal.extraer_caracteristicas_lote(lista_respuestas))
+
+    cache = obtener_cache_puntuaciones()
+    salida = np.empty((len(lista_respuestas), red_neuronal.W3.shape[1]), dtype=np.float64)
+    pendientes = OrderedDict()  # clave -> índices del lote con esas respuestas
+    for i, respuestas in enumerate(lista_respuestas):
+        clave = clave_respuestas(respuestas, red_neuronal.version, precision)
+        valor = cache.obtener(clave)
+        if valor is None:
+            pendientes.setdefault(clave, []).append(i)
+        else:
+            salida[i] = valor
+
+    if pendientes:
+        X = red_neuronal.extraer_caracteristicas_lote(lista_respuestas[indices[0]] for indices in pendientes.values())
+        for (clave, indices), fila in zip(pendientes.items(), red_neuronal.forward(X)):
+            salida[indices] = fila
+            cache.agregar(clave, fila)
+    return salida
 
 def calcular_puntuacion_puesto(respuestas, puesto):
     """Calcula la puntuación usando red neuronal multicapa"""
@@ -230,8 +652,106 @@ def calcular_puntuacion_puesto(respuestas, puesto):
 
 def calcular_puntuaciones(respuestas):
     """Calcula las puntuaciones para todos los puestos usando red neuronal"""
-    puntuaciones = {}
-    for puesto in PUESTOS.keys():
-        puntuaciones[puesto] = calcular_puntuacion_puesto(respuestas, puesto)
-    return puntuaciones
+    return calcular_puntuaciones_lote([respuestas])[0]
+
+def _matriz_ajustes(lista_respuestas, puestos_lista, puestos=None):
+    """Calcula la matriz N x puestos con el ajuste por criterios de cada puesto
+
+    Las respuestas se repiten mucho entre candidatos, así que cada texto
+    distinto se compara una sola vez con los criterios (matriz textos x
+    puestos); el ajuste del lote sale de indexar esa matriz con el texto de
+    cada selección y sumar por candidato con bincount, sin operaciones por fila.
+    """
+    puestos = PUESTOS if puestos is None else puestos
+    num_filas = len(lista_respuestas)
+
+    def coincidencias(campo, selecciones):
+        """N x puestos: cuántos textos seleccionados de cada candidato cumplen los criterios de `campo`"""
+        indices = {}
+        filas, textos = [], []
+        for fila, seleccion in enumerate(selecciones):
+            for texto in seleccion:
+                filas.append(fila)
+                textos.append(indices.setdefault(texto, len(indices)))
+        por_texto = np.array([
+            [any(crit.lower() in texto.lower() for crit in puestos[puesto][campo]) for puesto in puestos_lista]
+            for texto in indices
+        ], dtype=np.float64).reshape(len(indices), len(puestos_lista))
+        por_seleccion = por_texto[np.asarray(textos, dtype=np.int64)]
+        filas = np.asarray(filas, dtype=np.int64)
+        resultado = np.empty((num_filas, len(puestos_lista)))
+        for j in range(len(puestos_lista)):
+            resultado[:, j] = np.bincount(filas, weights=por_seleccion[:, j], minlength=num_filas)
+        return resultado
+
+    matches = coincidencias("habilidades_practicas", (r.get("habilidades_practicas", []) for r in lista_respuestas))
+    ambiente_ok = coincidencias("ambiente", ((r.get("ambiente", ""),) for r in lista_respuestas))
+
+    # Mismos pesos que calcular_puntuacion_puesto: 3 por habilidad, 5 por ambiente
+    return matches * 3 + ambiente_ok * 5
+
+def matriz_puntuaciones(salida, lista_respuestas, puestos_lista, puestos=None):
+    """Combina la salida N x 5 de la red con el ajuste de cada puesto de puestos_lista
+
+    La columna de la red de cada puesto es su posición en `puestos` (por
+    defecto PUESTOS). Devuelve la matriz N x len(puestos_lista) redondeada.
+    """
+    puestos = PUESTOS if puestos is None else puestos
+    posiciones = {puesto: i for i, puesto in enumerate(puestos)}
+    columnas = [posiciones[puesto] for puesto in puestos_lista]
+    if columnas and max(columnas) >= salida.shape[1]:
+        raise ValueError(
+            f"La red solo tiene {salida.shape[1]} salidas; no puede puntuar {len(puestos)} puestos"
+        )
+    puntuaciones = salida[:, columnas] + _matriz_ajustes(lista_respuestas, puestos_lista, puestos)
+    return np.round(np.clip(puntuaciones, 0, 100), 2)
+
+def calcular_puntuaciones_lote(lista_respuestas, precision="float64", usar_cache=True):
+    """Calcula las puntuaciones de muchos candidatos con una sola pasada de la red
+
+    Equivale a llamar calcular_puntuaciones para cada elemento, pero construye
+    una matriz N x 55 de características y ejecuta un único forward.
+    Con precision="float32" o "int8" se usa la inferencia de precisión reducida.
+    Las respuestas ya vistas (misma versión del modelo) salen de la caché.
+    """
+    lista_respuestas = list(lista_respuestas)
+    if not lista_respuestas:
+        return []
+
+    puestos_lista = list(PUESTOS.keys())
+
+    # Salida N x 5 de la red (una pasada sobre las respuestas no cacheadas)
+    salida = salidas_red_lote(lista_respuestas, precision, usar_cache)
+
+    # Columna de la red correspondiente a cada puesto más su ajuste
+    puntuaciones = matriz_puntuaciones(salida, lista_respuestas, puestos_lista)
+
+    return [
+        {puesto: float(valor) for puesto, valor in zip(puestos_lista, fila)}
+        for fila in puntuaciones
+    ]
+
+def main():
+    """Herramientas de línea de comandos del módulo de puntuación"""
+    parser = argparse.ArgumentParser(description="Utilidades de la red neuronal de puntuación")
+    parser.add_argument("--guardar-modelo", metavar="ARCHIVO_NPZ",
+                        help="Guarda los pesos actuales de la red en un artefacto versionado")
+    parser.add_argument("--comparar-precision", metavar="ARCHIVO",
+                        help="Informa la desviación máxima de float32/int8 frente a float64")
+    args = parser.parse_args()
+
+    if args.comparar_precision:
+        candidatos = cargar_base_datos(args.comparar_precision)["candidatos"]
+        X = extraer_caracteristicas_lote(c.get("respuestas_cuestionario", {}) for c in candidatos)
+        print(f"Desviación máxima frente a float64 en {len(candidatos)} candidatos (puntos porcentuales):")
+        for precision, desviacion in comparar_precision(X).items():
+            print(f"   {precision}: {desviacion:.6f}")
+    elif args.guardar_modelo:
+        red_neuronal = obtener_red_neuronal()
+        red_neuronal.guardar(args.guardar_modelo)
+        print(f"[OK] Modelo {red_neuronal.version} guardado en {args.guardar_modelo}")
+    else:
+        parser.print_help()
 
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+"""
+Motor de reevaluación incremental de puntuaciones
+Compara la definición de PUESTOS y la versión del modelo guardadas en la base de datos
+con las actuales y recalcula solo las columnas de puntuación afectadas
+"""
+import argparse
+import copy
+import time
+import uuid
+from formato_candidatos import cargar_base_datos, guardar_base_datos, validar_candidato
+from red_neuronal_puntuacion import (
+    PRECISIONES, PUESTOS, matriz_puntuaciones, obtener_cache_puntuaciones, salidas_red_lote,
+    version_modelo_actual
+)
+
+def definicion_puestos(puestos=None):
+    """Copia serializable de PUESTOS para guardar junto a la base de datos"""
+    return copy.deepcopy(PUESTOS if puestos is None else puestos)
+
+def diferencias_puestos(anteriores, nuevos):
+    """Compara dos definiciones de puestos
+
+    Un puesto se considera modificado si cambian sus criterios o su posición
+    (la posición decide qué salida de la red le corresponde). Sin definición
+    anterior (bases de datos antiguas) todos los puestos cuentan como nuevos.
+    """
+    anteriores = anteriores or {}
+    posiciones_anteriores = {puesto: i for i, puesto in enumerate(anteriores)}
+    posiciones_nuevas = {puesto: i for i, puesto in enumerate(nuevos)}
+    agregados = [p for p in nuevos if p not in anteriores]
+    eliminados = [p for p in anteriores if p not in nuevos]
+    modificados = [
+        p for p in nuevos
+        if p in anteriores and (
+            anteriores[p] != nuevos[p] or posiciones_anteriores[p] != posiciones_nuevas[p]
+        )
+    ]
+    return {"agregados": agregados, "modificados": modificados, "eliminados": eliminados}
+
+def reevaluar_cambios(base_datos, puestos=None, precision="float64", tam_lote=10000, progreso=None):
+    """Recalcula en sitio las puntuaciones afectadas por cambios en PUESTOS o en el modelo
+
+    - Los candidatos puntuados con otra versión del modelo se recalculan completos.
+    - Los demás solo recalculan los puestos agregados o modificados.
+    - Las puntuaciones de puestos eliminados se borran.
+    La salida de la red se toma de la caché cuando existe, así que en la mayoría
+    de los casos solo se recalcula el ajuste por criterios del puesto.
+    `progreso(procesados, total)` se llama tras cada lote. Devuelve un informe.
+    """
+    puestos = PUESTOS if puestos is None else puestos
+    candidatos = base_datos.get("candidatos", [])
+    cambios = diferencias_puestos(base_datos.get("puestos_definicion"), puestos)
+    afectados = cambios["agregados"] + cambios["modificados"]
+    version = version_modelo_actual()
+    todos = list(puestos.keys())
+
+    # Agrupar candidatos por conjunto de puestos a recalcular
+    trabajos = {tuple(todos): [], tuple(afectados): []}
+    for candidato in candidatos:
+        puntuaciones = candidato.get("puntuaciones")
+        if puntuaciones is None:
+            # Sin puntuaciones o con "puntuaciones": null
+            puntuaciones = candidato["puntuaciones"] = {}
+        for puesto in cambios["eliminados"]:
+            puntuaciones.pop(puesto, None)
+        if candidato.get("version_modelo") != version or not puntuaciones:
+            trabajos[tuple(todos)].append(candidato)
+        elif afectados:
+            trabajos[tuple(afectados)].append(candidato)
+
+    total = sum(len(lista) for lista in trabajos.values())
+    procesados = 0
+    puntuaciones_recalculadas = 0
+    inicio = time.time()
+    for puestos_lista, pendientes in trabajos.items():
+        if not puestos_lista:
+            continue
+        for desde in range(0, len(pendientes), tam_lote):
+            lote = pendientes[desde:desde + tam_lote]
+            lista_respuestas = [c.get("respuestas_cuestionario", {}) for c in lote]
+            salida = salidas_red_lote(lista_respuestas, precision)
+            matriz = matriz_puntuaciones(salida, lista_respuestas, list(puestos_lista), puestos)
+            for candidato, fila in zip(lote, matriz):
+                candidato["puntuaciones"].update(zip(puestos_lista, fila.tolist()))
+                candidato["version_modelo"] = version
+            procesados += len(lote)
+            puntuaciones_recalculadas += matriz.size
+            if progreso:
+                progreso(procesados, total)
+
+    base_datos["puestos_definicion"] = definicion_puestos(puestos)
+    base_datos["puestos_disponibles"] = todos
+    base_datos["version_modelo"] = version
+
+    return {
+        "candidatos": len(candidatos),
+        "candidatos_actualizados": procesados,
+        "puntuaciones_recalculadas": puntuaciones_recalculadas,
+        "puestos_agregados": cambios["agregados"],
+        "puestos_modificados": cambios["modificados"],
+        "puestos_eliminados": cambios["eliminados"],
+        "cache": obtener_cache_puntuaciones().estadisticas(),
+        "segundos": round(time.time() - inicio, 3),
+    }
+
+def reevaluar_flujo(metadatos, candidatos, tam_lote=10000, informe=None, progreso=None):
+    """Valida y puntúa por lotes un iterador de candidatos; genera los válidos ya al día
+
+    Cada lote pasa por reevaluar_cambios con la definición de puestos de
+    `metadatos`, así que solo se recalculan los candidatos sin puntuaciones o
+    con puntuaciones obsoletas. Los registros inválidos se saltan y se
+    cuentan en `informe` ("validos", "invalidos", "actualizados" y los
+    primeros "errores" como (número de registro, motivo)). A los válidos sin
+    id se les asigna uno. `progreso(validos)` se llama tras cada lote.
+    """
+    informe = {} if informe is None else informe
+    for clave in ("validos", "invalidos", "actualizados"):
+        informe.setdefault(clave, 0)
+    informe.setdefault("errores", [])
+    lote = []
+
+    def volcar():
+        resultado = reevaluar_cambios({"candidatos": lote, "puestos_definicion": metadatos.get("puestos_definicion")},
+                                      tam_lote=tam_lote)
+        informe["validos"] += len(lote)
+        informe["actualizados"] += resultado["candidatos_actualizados"]
+        if progreso:
+            progreso(informe["validos"])
+
+    for numero, candidato in enumerate(candidatos, 1):
+        error = validar_candidato(candidato)
+        if error is not None:
+            informe["invalidos"] += 1
+            if len(informe["errores"]) < 20:
+                informe["errores"].append((numero, error))
+            continue
+        if not candidato.get("id"):
+            candidato["id"] = f"cand_{uuid.uuid4().hex}"
+        lote.append(candidato)
+        if len(lote) >= tam_lote:
+            volcar()
+            yield from lote
+            lote = []
+    if lote:
+        volcar()
+        yield from lote
+
+def imprimir_progreso(procesados, total):
+    """Progreso en consola para la herramienta de línea de comandos"""
+    print(f"   Recalculados {procesados}/{total} candidatos...")
+
+def reevaluar_archivo(ruta, precision="float64", tam_lote=10000):
+    """Aplica reevaluar_cambios a un archivo JSON o JSONL y lo reescribe"""
+    base_datos = cargar_base_datos(ruta)
+
+    informe = reevaluar_cambios(base_datos, precision=precision, tam_lote=tam_lote, progreso=imprimir_progreso)
+
+    guardar_base_datos(ruta, base_datos)
+    obtener_cache_puntuaciones().guardar()
+    return informe
+
+def main():
+    """Reevalúa una base de datos tras cambiar PUESTOS o el modelo"""
+    parser = argparse.ArgumentParser(description="Reevaluación incremental de puntuaciones")
+    parser.add_argument("archivo", help="Base de datos de candidatos (.json o .jsonl, opcionalmente .gz/.xz)")
+    parser.add_argument("--precision", choices=PRECISIONES, default="float64")
+    parser.add_argument("--tam-lote", type=int, default=10000)
+    args = parser.parse_args()
+
+    print(f"Reevaluando {args.archivo} con el modelo {version_modelo_actual()}...")
+    informe = reevaluar_archivo(args.archivo, precision=args.precision, tam_lote=args.tam_lote)
+
+    print(f"\n[OK] {informe['candidatos_actualizados']} de {informe['candidatos']} candidatos actualizados "
+          f"({informe['puntuaciones_recalculadas']} puntuaciones) en {informe['segundos']} s")
+    print(f"   Puestos agregados: {', '.join(informe['puestos_agregados']) or 'ninguno'}")
+    print(f"   Puestos modificados: {', '.join(informe['puestos_modificados']) or 'ninguno'}")
+    print(f"   Puestos eliminados: {', '.join(informe['puestos_eliminados']) or 'ninguno'}")
+    print(f"   Caché de la red: {informe['cache']['aciertos']} aciertos, {informe['cache']['fallos']} fallos")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,347 @@
+"""
+Registro duradero de candidatos nuevos (write-ahead log en JSON Lines)
+Los registros se agregan a un archivo de solo anexado con fsync agrupado entre hilos y
+bloqueo entre procesos; la compactación periódica los incorpora a la base de datos principal
+"""
+import argparse
+import json
+import os
+import threading
+import time
+import uuid
+try:
+    import fcntl
+except ImportError:
+    # Windows: candados con msvcrt.locking
+    fcntl = None
+    import msvcrt
+from formato_candidatos import RUTAS_BASE_DATOS, buscar_base_datos_local, escribir_base_datos, leer_base_datos
+
+# Registro por defecto, junto a la base de datos local
+RUTA_REGISTRO = os.environ.get("LINKENCHAMBA_REGISTRO", "registro_candidatos.jsonl")
+FORMATO_REGISTRO = "linkenchamba-registro"
+
+# La compactación se dispara a partir de este número de registros pendientes
+UMBRAL_COMPACTACION = int(os.environ.get("LINKENCHAMBA_UMBRAL_COMPACTACION", "1000"))
+
+# Sin traducción de saltos de línea en Windows
+O_BINARIO = getattr(os, "O_BINARY", 0)
+
+def fsync_directorio(ruta):
+    """Hace duradero un rename o una creación de archivo en el directorio de `ruta`
+
+    En Windows no se puede abrir un directorio para fsync; el rename ya queda
+    registrado en el journal de NTFS.
+    """
+    if os.name == "nt":
+        return
+    descriptor = os.open(os.path.dirname(os.path.abspath(ruta)), os.O_RDONLY)
+    try:
+        os.fsync(descriptor)
+    finally:
+        os.close(descriptor)
+
+def bloquear_archivo(descriptor, exclusivo=True, esperar=True):
+    """Candado entre procesos sobre un archivo abierto; devuelve False si no se pudo sin esperar
+
+    Usa flock en POSIX. En Windows se bloquea el primer byte con msvcrt.locking,
+    que no tiene modo compartido: el candado es siempre exclusivo.
+    """
+    if fcntl is not None:
+        modo = fcntl.LOCK_EX if exclusivo else fcntl.LOCK_SH
+        try:
+            fcntl.flock(descriptor, modo if esperar else modo | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return False
+        return True
+    while True:
+        os.lseek(descriptor, 0, os.SEEK_SET)
+        try:
+            msvcrt.locking(descriptor, msvcrt.LK_NBLCK, 1)
+            return True
+        except OSError:
+            if not esperar:
+                return False
+            time.sleep(0.01)
+
+def desbloquear_archivo(descriptor):
+    """Libera el candado de bloquear_archivo"""
+    if fcntl is not None:
+        fcntl.flock(descriptor, fcntl.LOCK_UN)
+    else:
+        os.lseek(descriptor, 0, os.SEEK_SET)
+        msvcrt.locking(descriptor, msvcrt.LK_UNLCK, 1)
+
+def leer_lineas(f, posicion):
+    """Itera (posición, candidato) desde `posicion` de un segmento abierto en binario
+
+    Una última línea sin salto de línea es una escritura en curso o a medias:
+    se devuelve (su posición, None) y se deja de leer. Las líneas completas
+    ilegibles (restos de una caída) se saltan.
+    """
+    f.seek(posicion)
+    for linea in iter(f.readline, b""):
+        if not linea.endswith(b"\n"):
+            f.seek(posicion)
+            yield posicion, None
+            return
+        if linea.strip():
+            try:
+                yield posicion, json.loads(linea)
+            except ValueError:
+                pass
+        posicion += len(linea)
+
+class RegistroCandidatos:
+    """Archivo de registro de solo anexado compartido por sesiones y procesos
+
+    - agregar() vuelve cuando el candidato está en disco (fsync). Los hilos que
+      llegan mientras otro hace fsync se agrupan en la siguiente escritura
+      (group commit), así que N registros concurrentes cuestan ~2 fsync.
+    - Entre procesos, las escrituras y la compactación se serializan con
+      un candado (flock, o msvcrt en Windows) sobre `<ruta>.lock`, que nunca se rota.
+    - La compactación rota el registro a `<ruta>.compactando`, lo incorpora a la
+      base principal y lo borra; la base guarda el id y la posición del último
+      segmento aplicado para que repetirla tras una caída no duplique nada.
+    """
+    def __init__(self, ruta=RUTA_REGISTRO, espera_grupo=0.0):
+        self.ruta = ruta
+        self.ruta_compactando = ruta + ".compactando"
+        self.espera_grupo = espera_grupo
+        self._descriptor_candado = os.open(ruta + ".lock", os.O_RDWR | os.O_CREAT | O_BINARIO, 0o644)
+        self._descriptor = None
+        self._condicion = threading.Condition()
+        self._pendientes = []
+        self._siguiente = 1
+        self._duradero = 0
+        self._atendido = 0
+        self._escribiendo = False
+        self._errores = []
+        self._segmentos = {}
+        self._candado_lectura = threading.Lock()
+
+    # --- Escritura ---
+
+    def _bloquear(self, exclusivo=True, esperar=True):
+        """Candado entre procesos sobre el archivo .lock; devuelve False si no se pudo sin esperar"""
+        return bloquear_archivo(self._descriptor_candado, exclusivo, esperar)
+
+    def _desbloquear(self):
+        desbloquear_archivo(self._descriptor_candado)
+
+    def _crear_segmento(self, ruta):
+        """Crea un registro vacío con su cabecera (id único del segmento)"""
+        cabecera = {"formato": FORMATO_REGISTRO, "id": uuid.uuid4().hex}
+        temporal = ruta + ".tmp"
+        with open(temporal, "w", encoding="utf-8", newline="\n") as f:
+            f.write(json.dumps(cabecera) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporal, ruta)
+        fsync_directorio(ruta)
+
+    def _descriptor_actual(self):
+        """Descriptor del registro vigente; se reabre si otro proceso lo rotó (con el flock tomado)"""
+        if not os.path.exists(self.ruta):
+            self._crear_segmento(self.ruta)
+        estado = os.stat(self.ruta)
+        if self._descriptor is not None and os.fstat(self._descriptor).st_ino != estado.st_ino:
+            os.close(self._descriptor)
+            self._descriptor = None
+        if self._descriptor is None:
+            self._descriptor = os.open(self.ruta, os.O_RDWR | os.O_APPEND | O_BINARIO)
+        return self._descriptor
+
+    def _escribir_lote(self, lineas):
+        """Anexa un lote de líneas y hace un único fsync"""
+        self._bloquear()
+        try:
+            descriptor = self._descriptor_actual()
+            datos = "".join(lineas).encode("utf-8")
+            # Si una escritura anterior quedó a medias (caída), se cierra esa línea
+            tamano = os.fstat(descriptor).st_size
+            if tamano:
+                os.lseek(descriptor, tamano - 1, os.SEEK_SET)
+                if os.read(descriptor, 1) != b"\n":
+                    datos = b"\n" + datos
+            while datos:
+                datos = datos[os.write(descriptor, datos):]
+            os.fsync(descriptor)
+        finally:
+            if os.name == "nt" and self._descriptor is not None:
+                # Windows no deja renombrar un archivo abierto: se cierra para que otro proceso pueda rotarlo
+                os.close(self._descriptor)
+                self._descriptor = None
+            self._desbloquear()
+
+    def agregar(self, candidato):
+        """Agrega un candidato al registro; vuelve cuando está escrito y sincronizado en disco"""
+        linea = json.dumps(candidato, ensure_ascii=False) + "\n"
+        with self._condicion:
+            self._pendientes.append(linea)
+            secuencia = self._siguiente
+            self._siguiente += 1
+            # _atendido: hasta dónde se intentó escribir; _duradero: hasta dónde el fsync terminó bien
+            while self._atendido < secuencia:
+                if self._escribiendo:
+                    self._condicion.wait()
+                    continue
+                # Este hilo escribe el grupo: todo lo pendiente hasta ahora
+                self._escribiendo = True
+                if self.espera_grupo:
+                    self._condicion.wait(self.espera_grupo)
+                lote, self._pendientes = self._pendientes, []
+                hasta = self._siguiente - 1
+                self._condicion.release()
+                escrito, error = False, None
+                try:
+                    self._escribir_lote(lote)
+                    escrito = True
+                except Exception as e:
+                    error = e
+                finally:
+                    self._condicion.acquire()
+                    self._escribiendo = False
+                    if escrito:
+                        self._duradero = hasta
+                    else:
+                        # Todos los del grupo reciben el error; los últimos fallos se recuerdan
+                        error = error or RuntimeError("Escritura del registro interrumpida")
+                        self._errores = self._errores[-99:] + [(hasta - len(lote) + 1, hasta, error)]
+                    self._atendido = hasta
+                    self._condicion.notify_all()
+            for desde, hasta, error in self._errores:
+                if desde <= secuencia <= hasta:
+                    raise error
+
+    # --- Lectura ---
+
+    def _leer_segmento(self, ruta):
+        """Registros nuevos de un segmento desde la última lectura: (id, [(posición, candidato)])"""
+        try:
+            f = open(ruta, "rb")
+        except FileNotFoundError:
+            return None, []
+        with f:
+            primera = f.readline()
+            if not primera.endswith(b"\n"):
+                return None, []
+            id_segmento = json.loads(primera)["id"]
+            posicion, registros = self._segmentos.get(id_segmento, (f.tell(), []))
+            registros.extend((p, c) for p, c in leer_lineas(f, posicion) if c is not None)
+            self._segmentos[id_segmento] = (f.tell(), registros)
+            return id_segmento, registros
+
+    def registros(self):
+        """Todos los registros aún no compactados: [(id segmento, posición, candidato)], en orden"""
+        with self._candado_lectura:
+            vigentes = {}
+            resultado = []
+            for ruta in (self.ruta_compactando, self.ruta):
+                id_segmento, registros = self._leer_segmento(ruta)
+                if id_segmento is not None:
+                    vigentes[id_segmento] = self._segmentos[id_segmento]
+                    resultado.extend((id_segmento, posicion, c) for posicion, c in registros)
+            self._segmentos = vigentes
+            return resultado
+
+    def candidatos_pendientes(self, metadatos_base):
+        """Candidatos registrados que todavía no están en la base con esos metadatos"""
+        aplicado = metadatos_base.get("registro_aplicado") or {}
+        return [
+            candidato for id_segmento, posicion, candidato in self.registros()
+            if not (id_segmento == aplicado.get("id") and posicion < aplicado.get("posicion", 0))
+        ]
+
+    # --- Compactación ---
+
+    def compactar(self, ruta_base, esperar=True):
+        """Incorpora los registros a la base principal y vacía el registro
+
+        Solo se bloquea a los escritores mientras se rota el archivo; la
+        reescritura de la base ocurre fuera del flock de escritura. Devuelve
+        el número de candidatos incorporados, o None si otra compactación
+        estaba en curso y `esperar` es False.
+        """
+        if not self._bloquear(esperar=esperar):
+            return None
+        try:
+            # Una compactación previa interrumpida se termina primero
+            if not os.path.exists(self.ruta_compactando):
+                if not os.path.exists(self.ruta):
+                    return 0
+                os.replace(self.ruta, self.ruta_compactando)
+                self._crear_segmento(self.ruta)
+        finally:
+            self._desbloquear()
+
+        # Evita que dos procesos reescriban la base a la vez
+        descriptor = os.open(self.ruta_compactando + ".lock", os.O_RDWR | os.O_CREAT | O_BINARIO, 0o644)
+        try:
+            if not bloquear_archivo(descriptor, esperar=esperar):
+                return None
+            try:
+                if not os.path.exists(self.ruta_compactando):
+                    return 0
+                return self._incorporar(ruta_base)
+            finally:
+                desbloquear_archivo(descriptor)
+        finally:
+            os.close(descriptor)
+
+    def _incorporar(self, ruta_base):
+        """Reescribe la base con los registros de `<ruta>.compactando` y luego lo borra"""
+        with open(self.ruta_compactando, "rb") as f:
+            id_segmento = json.loads(f.readline())["id"]
+            registros = [(p, c) for p, c in leer_lineas(f, f.tell()) if c is not None]
+            posicion = f.tell()
+
+        if os.path.exists(ruta_base):
+            metadatos, candidatos = leer_base_datos(ruta_base)
+            metadatos = {k: v for k, v in metadatos.items() if k not in ("formato", "version_formato")}
+        else:
+            metadatos, candidatos = {}, iter([])
+        aplicado = metadatos.get("registro_aplicado") or {}
+        desde = aplicado.get("posicion", 0) if aplicado.get("id") == id_segmento else 0
+        nuevos = [c for p, c in registros if p >= desde]
+
+        def todos():
+            yield from candidatos
+            yield from nuevos
+
+        metadatos["registro_aplicado"] = {"id": id_segmento, "posicion": posicion}
+        if "total_candidatos" in metadatos:
+            metadatos["total_candidatos"] += len(nuevos)
+        escribir_base_datos(ruta_base, metadatos, todos(), sincronizar=True)
+        fsync_directorio(ruta_base)
+        os.remove(self.ruta_compactando)
+        return len(nuevos)
+
+    def pendientes_de_compactar(self):
+        """Número de registros en el registro vigente"""
+        return len(self.registros())
+
+def ruta_base_principal():
+    """Base de datos donde se compacta el registro: la local existente o la primera por defecto"""
+    return buscar_base_datos_local() or RUTAS_BASE_DATOS[0]
+
+def main():
+    """Compacta el registro de candidatos en la base de datos principal"""
+    parser = argparse.ArgumentParser(description="Registro duradero de candidatos")
+    parser.add_argument("accion", choices=["compactar", "estado"])
+    parser.add_argument("--registro", default=RUTA_REGISTRO, help="Archivo de registro (por defecto $LINKENCHAMBA_REGISTRO)")
+    parser.add_argument("--base", default=None, help="Base de datos principal (por defecto la local)")
+    args = parser.parse_args()
+
+    registro = RegistroCandidatos(args.registro)
+    ruta_base = args.base or ruta_base_principal()
+    if args.accion == "estado":
+        print(f"{registro.pendientes_de_compactar()} candidatos pendientes de compactar en {args.registro}")
+        return
+
+    inicio = time.time()
+    incorporados = registro.compactar(ruta_base)
+    print(f"[OK] {incorporados} candidatos incorporados a {ruta_base} ({time.time() - inicio:.1f} s)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,385 @@
+"""
+Representación compacta en columnas de los candidatos
+Las respuestas se guardan como códigos y máscaras de bits sobre las opciones de cuestionario.py,
+las puntuaciones en una matriz float32 y los textos en UTF-8 contiguo; los diccionarios solo
+se reconstruyen para las filas que se muestran
+"""
+import numpy as np
+import cuestionario
+from red_neuronal_puntuacion import PUESTOS, TEMAS_NIVELES
+
+# Selección múltiple: máscara de bits (bit k = opción k); selección única: índice de la opción
+CAMPOS_MULTIPLES = {
+    "habilidades_practicas": cuestionario.HABILIDADES_PRACTICAS,
+    "herramientas": cuestionario.HERRAMIENTAS,
+    "actividades": cuestionario.ACTIVIDADES,
+    "conocimientos": cuestionario.CONOCIMIENTOS,
+    "logros": cuestionario.LOGROS,
+    "destaca": cuestionario.DESTACA,
+}
+CAMPOS_UNICOS = {
+    "ambiente": cuestionario.AMBIENTES,
+    "tipo_trabajo": cuestionario.TIPOS_TRABAJO,
+    "reaccion": cuestionario.REACCIONES,
+    "motivacion": cuestionario.MOTIVACIONES,
+}
+# Orden de las claves de las respuestas (el del cuestionario y el generador)
+ORDEN_RESPUESTAS = (
+    "habilidades_practicas", "herramientas", "ambiente", "actividades", "conocimientos", "niveles",
+    "tipo_trabajo", "logros", "reaccion", "destaca", "motivacion", "unico"
+)
+CLAVES_RESPUESTAS = frozenset(ORDEN_RESPUESTAS)
+
+# Campos de texto del candidato con columna propia, y orden de las claves al decodificar
+CAMPOS_TEXTO = ("id", "nombre", "email", "telefono", "direccion", "fecha_registro")
+ORDEN_CAMPOS = (
+    "id", "nombre", "email", "telefono", "direccion", "respuestas_cuestionario", "puntuaciones",
+    "version_modelo", "fecha_registro"
+)
+
+INDICE_MULTIPLES = {campo: {opcion: 1 << k for k, opcion in enumerate(opciones)}
+                    for campo, opciones in CAMPOS_MULTIPLES.items()}
+INDICE_UNICOS = {campo: {opcion: k for k, opcion in enumerate(opciones)}
+                 for campo, opciones in CAMPOS_UNICOS.items()}
+INDICE_NIVELES = {nivel: k for k, nivel in enumerate(cuestionario.NIVELES)}
+
+# Tablas de decodificación: opciones de cada máscara posible y niveles de cada byte empaquetado
+OPCIONES_POR_MASCARA = {
+    campo: [tuple(opcion for k, opcion in enumerate(opciones) if mascara >> k & 1) for mascara in range(1 << len(opciones))]
+    for campo, opciones in CAMPOS_MULTIPLES.items()
+}
+NIVELES_POR_CODIGO = [
+    {tema: cuestionario.NIVELES[codigo >> (2 * k) & 3] for k, tema in enumerate(TEMAS_NIVELES)}
+    for codigo in range(256)
+]
+
+# Indicadores por fila de qué partes del candidato están en columnas
+CON_RESPUESTAS = 1
+CON_PUNTUACIONES = 2
+CON_VERSION = 4
+SIN_VERSION = 0xFFFF
+
+TAM_LOTE = 10000
+
+def ampliar(arreglo, filas):
+    """El mismo arreglo, o una copia con capacidad para `filas` filas (duplicando)"""
+    if filas <= len(arreglo):
+        return arreglo
+    nuevo = np.zeros((max(filas, 2 * len(arreglo), 16),) + arreglo.shape[1:], dtype=arreglo.dtype)
+    nuevo[:len(arreglo)] = arreglo
+    return nuevo
+
+def codificar_respuestas(respuestas):
+    """(máscaras, códigos, niveles) de unas respuestas, o None si no se pueden representar exactamente
+
+    Solo se codifican respuestas con exactamente las claves del cuestionario y
+    opciones canónicas sin repetir; el orden de las selecciones múltiples no
+    se conserva (se decodifican en el orden de las opciones).
+    """
+    if type(respuestas) is not dict or respuestas.keys() != CLAVES_RESPUESTAS:
+        return None
+    if type(respuestas["unico"]) is not str:
+        return None
+    mascaras = []
+    for campo, indice in INDICE_MULTIPLES.items():
+        seleccion = respuestas[campo]
+        if type(seleccion) is not list:
+            return None
+        mascara = 0
+        for opcion in seleccion:
+            bit = indice.get(opcion) if type(opcion) is str else None
+            if bit is None or mascara & bit:
+                return None
+            mascara |= bit
+        mascaras.append(mascara)
+    codigos = []
+    for campo, indice in INDICE_UNICOS.items():
+        opcion = respuestas[campo]
+        codigo = indice.get(opcion) if type(opcion) is str else None
+        if codigo is None:
+            return None
+        codigos.append(codigo)
+    niveles = respuestas["niveles"]
+    if type(niveles) is not dict or len(niveles) != len(TEMAS_NIVELES):
+        return None
+    empaquetados = 0
+    for k, tema in enumerate(TEMAS_NIVELES):
+        nivel = niveles.get(tema)
+        codigo = INDICE_NIVELES.get(nivel) if type(nivel) is str else None
+        if codigo is None:
+            return None
+        empaquetados |= codigo << (2 * k)
+    return mascaras, codigos, empaquetados
+
+class ColumnaTexto:
+    """Textos de una columna en un único bytearray UTF-8 con la posición de fin de cada fila"""
+    __slots__ = ("_datos", "_fines", "_presentes", "num_filas")
+
+    def __init__(self):
+        self._datos = bytearray()
+        self._fines = np.zeros(16, dtype=np.int64)
+        self._presentes = np.zeros(16, dtype=bool)
+        self.num_filas = 0
+
+    def extender(self, textos):
+        """Agrega una fila por texto; lo que no es str se marca como ausente"""
+        codificados = [t.encode("utf-8") if type(t) is str else b"" for t in textos]
+        desde, hasta = self.num_filas, self.num_filas + len(codificados)
+        self._fines = ampliar(self._fines, hasta)
+        self._presentes = ampliar(self._presentes, hasta)
+        base = self._fines[desde - 1] if desde else 0
+        self._fines[desde:hasta] = base + np.cumsum([len(c) for c in codificados], dtype=np.int64)
+        self._presentes[desde:hasta] = [type(t) is str for t in textos]
+        self._datos += b"".join(codificados)
+        self.num_filas = hasta
+
+    def obtener(self, fila):
+        """Texto de la fila, o None si no tenía"""
+        if not self._presentes[fila]:
+            return None
+        inicio = self._fines[fila - 1] if fila else 0
+        return self._datos[inicio:self._fines[fila]].decode("utf-8")
+
+    def obtener_varios(self, filas):
+        """Textos de varias filas (arreglo de enteros), en el mismo orden"""
+        fines = self._fines[filas].tolist()
+        inicios = np.where(filas > 0, self._fines[filas - 1], 0).tolist()
+        datos = self._datos
+        return [datos[inicio:fin].decode("utf-8") if presente else None
+                for inicio, fin, presente in zip(inicios, fines, self._presentes[filas].tolist())]
+
+    def recortar(self):
+        """Libera la capacidad sobrante"""
+        self._fines = self._fines[:self.num_filas].copy()
+        self._presentes = self._presentes[:self.num_filas].copy()
+
+class TablaCandidatos:
+    """Candidatos en columnas: ~10 veces menos memoria que la lista de diccionarios
+
+    - Respuestas: una máscara uint16 por campo de selección múltiple, un código
+      uint8 por campo de selección única y los cuatro niveles empaquetados en un
+      uint8; el texto libre ("unico") va en una columna de texto.
+    - Puntuaciones: matriz float32 (filas x puestos); como se guardan con dos
+      decimales, al decodificar se redondean y salen idénticas.
+    - Lo que no se puede representar así (opciones desconocidas, campos extra
+      como los datos cifrados, puntuaciones con más decimales) se guarda tal
+      cual en un diccionario disperso por fila.
+    Los candidatos se reconstruyen como diccionarios solo al pedirlos.
+    """
+    __slots__ = ("puestos", "num_filas", "_textos", "_unico", "_mascaras", "_codigos", "_niveles",
+                 "_puntuaciones", "_versiones", "_codigo_version", "_indicadores", "_extra")
+
+    def __init__(self, candidatos=(), puestos=None):
+        self.puestos = list(PUESTOS.keys()) if puestos is None else list(puestos)
+        self.num_filas = 0
+        self._textos = {campo: ColumnaTexto() for campo in CAMPOS_TEXTO}
+        self._unico = ColumnaTexto()
+        self._mascaras = np.zeros((16, len(CAMPOS_MULTIPLES)), dtype=np.uint16)
+        self._codigos = np.zeros((16, len(CAMPOS_UNICOS)), dtype=np.uint8)
+        self._niveles = np.zeros(16, dtype=np.uint8)
+        self._puntuaciones = np.zeros((16, len(self.puestos)), dtype=np.float32)
+        self._versiones = []
+        self._codigo_version = np.zeros(16, dtype=np.uint16)
+        self._indicadores = np.zeros(16, dtype=np.uint8)
+        self._extra = {}
+        self.extender(candidatos)
+
+    def __len__(self):
+        return self.num_filas
+
+    def __iter__(self):
+        for desde in range(0, self.num_filas, TAM_LOTE):
+            yield from self.obtener(range(desde, min(desde + TAM_LOTE, self.num_filas)))
+
+    # --- Escritura ---
+
+    def extender(self, candidatos):
+        """Agrega candidatos (cualquier iterable, se consume por lotes); devuelve cuántos"""
+        agregados = 0
+        lote = []
+        for candidato in candidatos:
+            lote.append(candidato)
+            if len(lote) >= TAM_LOTE:
+                agregados += self._agregar_lote(lote)
+                lote = []
+        if lote:
+            agregados += self._agregar_lote(lote)
+        return agregados
+
+    def agregar(self, candidato):
+        """Agrega un candidato; devuelve su fila"""
+        self._agregar_lote([candidato])
+        return self.num_filas - 1
+
+    def _codigo_de_version(self, version):
+        if type(version) is not str:
+            return None
+        try:
+            return self._versiones.index(version)
+        except ValueError:
+            if len(self._versiones) >= SIN_VERSION:
+                return None
+            self._versiones.append(version)
+            return len(self._versiones) - 1
+
+    def _agregar_lote(self, candidatos):
+        desde, cantidad = self.num_filas, len(candidatos)
+        hasta = desde + cantidad
+        for nombre in ("_mascaras", "_codigos", "_niveles", "_puntuaciones", "_codigo_version", "_indicadores"):
+            setattr(self, nombre, ampliar(getattr(self, nombre), hasta))
+
+        for campo, columna in self._textos.items():
+            columna.extender([c.get(campo) for c in candidatos])
+
+        # Puntuaciones: se comprueba en bloque que float32 + redondeo a 2 decimales las conserva
+        posiciones = {puesto: j for j, puesto in enumerate(self.puestos)}
+        valores = np.full((cantidad, len(self.puestos)), np.nan)
+        representables = np.zeros(cantidad, dtype=bool)
+        for i, candidato in enumerate(candidatos):
+            puntuaciones = candidato.get("puntuaciones")
+            if type(puntuaciones) is not dict:
+                continue
+            try:
+                for puesto, valor in puntuaciones.items():
+                    if type(valor) not in (int, float):
+                        raise TypeError
+                    valores[i, posiciones[puesto]] = valor
+            except (KeyError, TypeError, OverflowError):
+                valores[i] = np.nan
+                continue
+            representables[i] = len(puntuaciones) == np.count_nonzero(~np.isnan(valores[i]))
+        en_float32 = valores.astype(np.float32)
+        recuperados = np.round(en_float32.astype(np.float64), 2)
+        conservados = ((recuperados == valores) | np.isnan(valores)).all(axis=1)
+        representables &= conservados
+        self._puntuaciones[desde:hasta] = np.where(representables[:, None], en_float32, np.nan)
+
+        unicos = []
+        for i, candidato in enumerate(candidatos):
+            fila = desde + i
+            indicadores = 0
+            extra = {}
+            for clave, valor in candidato.items():
+                if clave in CAMPOS_TEXTO:
+                    if type(valor) is not str:
+                        extra[clave] = valor
+                elif clave == "respuestas_cuestionario":
+                    codificadas = codificar_respuestas(valor)
+                    if codificadas is None:
+                        extra[clave] = valor
+                    else:
+                        mascaras, codigos, niveles = codificadas
+                        self._mascaras[fila] = mascaras
+                        self._codigos[fila] = codigos
+                        self._niveles[fila] = niveles
+                        indicadores |= CON_RESPUESTAS
+                elif clave == "puntuaciones" and representables[i]:
+                    indicadores |= CON_PUNTUACIONES
+                elif clave == "version_modelo":
+                    codigo = self._codigo_de_version(valor)
+                    if codigo is None:
+                        extra[clave] = valor
+                    else:
+                        self._codigo_version[fila] = codigo
+                        indicadores |= CON_VERSION
+                else:
+                    extra[clave] = valor
+            unicos.append(candidato["respuestas_cuestionario"]["unico"] if indicadores & CON_RESPUESTAS else None)
+            self._indicadores[fila] = indicadores
+            if extra:
+                self._extra[fila] = extra
+        self._unico.extender(unicos)
+        self.num_filas = hasta
+        return cantidad
+
+    def recortar(self):
+        """Libera la capacidad sobrante de las columnas (antes de serializar o tras cargar)"""
+        for nombre in ("_mascaras", "_codigos", "_niveles", "_puntuaciones", "_codigo_version", "_indicadores"):
+            setattr(self, nombre, getattr(self, nombre)[:self.num_filas].copy())
+        for columna in (*self._textos.values(), self._unico):
+            columna.recortar()
+
+    def __getstate__(self):
+        self.recortar()
+        return {nombre: getattr(self, nombre) for nombre in self.__slots__}
+
+    def __setstate__(self, estado):
+        for nombre, valor in estado.items():
+            setattr(self, nombre, valor)
+
+    # --- Lectura ---
+
+    def obtener(self, filas):
+        """Candidatos de las filas dadas como diccionarios (decodificados en bloque), en el mismo orden"""
+        filas = np.asarray(list(filas) if not isinstance(filas, (range, np.ndarray)) else filas, dtype=np.int64)
+        if len(filas) and (filas.min() < 0 or filas.max() >= self.num_filas):
+            raise IndexError("fila fuera de la tabla")
+        indicadores = self._indicadores[filas].tolist()
+        mascaras = self._mascaras[filas].tolist()
+        codigos = self._codigos[filas].tolist()
+        niveles = self._niveles[filas].tolist()
+        puntuaciones = np.round(self._puntuaciones[filas].astype(np.float64), 2).tolist()
+        versiones = self._codigo_version[filas].tolist()
+        textos = {campo: columna.obtener_varios(filas) for campo, columna in self._textos.items()}
+        unicos = self._unico.obtener_varios(filas)
+
+        candidatos = []
+        for i, fila in enumerate(filas.tolist()):
+            extra = self._extra.get(fila)
+            marca = indicadores[i]
+            valores = {campo: columna[i] for campo, columna in textos.items()}
+            if marca & CON_RESPUESTAS:
+                respuestas = {campo: list(tabla[mascara]) for (campo, tabla), mascara
+                              in zip(OPCIONES_POR_MASCARA.items(), mascaras[i])}
+                respuestas.update({campo: opciones[codigo] for (campo, opciones), codigo
+                                   in zip(CAMPOS_UNICOS.items(), codigos[i])})
+                respuestas["niveles"] = dict(NIVELES_POR_CODIGO[niveles[i]])
+                respuestas["unico"] = unicos[i]
+                valores["respuestas_cuestionario"] = {campo: respuestas[campo] for campo in ORDEN_RESPUESTAS}
+            if marca & CON_PUNTUACIONES:
+                valores["puntuaciones"] = {puesto: valor for puesto, valor in zip(self.puestos, puntuaciones[i])
+                                           if valor == valor}
+            if marca & CON_VERSION:
+                valores["version_modelo"] = self._versiones[versiones[i]]
+            if extra:
+                valores.update(extra)
+            candidato = {campo: valores[campo] for campo in ORDEN_CAMPOS if valores.get(campo) is not None
+                         or (extra and campo in extra)}
+            if extra:
+                for campo, valor in extra.items():
+                    candidato.setdefault(campo, valor)
+            candidatos.append(candidato)
+        return candidatos
+
+    def candidato(self, fila):
+        """Diccionario completo del candidato de una fila"""
+        return self.obtener([fila])[0]
+
+    def respuestas(self, fila):
+        """Diccionario de respuestas de una fila"""
+        return self.candidato(fila).get("respuestas_cuestionario")
+
+    def respuestas_codificadas(self):
+        """(máscaras, códigos, niveles empaquetados, codificadas) de todas las filas, sin decodificar
+
+        `codificadas` indica qué filas tienen las respuestas en columnas; las
+        demás (si las tienen) se obtienen con respuestas(fila).
+        """
+        n = self.num_filas
+        codificadas = (self._indicadores[:n] & CON_RESPUESTAS).astype(bool)
+        return self._mascaras[:n], self._codigos[:n], self._niveles[:n], codificadas
+
+    def valores_puntuaciones(self):
+        """Matriz float64 filas x puestos con las puntuaciones (0 si falta), como .get(puesto, 0)"""
+        valores = np.round(self._puntuaciones[:self.num_filas].astype(np.float64), 2)
+        valores[np.isnan(valores)] = 0
+        for fila, extra in self._extra.items():
+            puntuaciones = extra.get("puntuaciones")
+            if puntuaciones is not None:
+                valores[fila] = [puntuaciones.get(puesto, 0) if isinstance(puntuaciones, dict) else 0
+                                 for puesto in self.puestos]
+        return valores
+
+    def filas_excepcionales(self):
+        """Número de filas con algún dato guardado tal cual (fuera de las columnas)"""
+        return len(self._extra)
@@ -0,0 +1,122 @@
+"""
+Servidor SMTP local de prueba para verificar envíos sin un servidor real
+Se usa desde las pruebas; ejecutado directamente queda escuchando e imprime los correos recibidos
+"""
+import argparse
+import socketserver
+import threading
+import time
+
+class _SesionSMTP(socketserver.StreamRequestHandler):
+    """Diálogo SMTP mínimo (EHLO/HELO, MAIL, RCPT, DATA, NOOP, RSET, QUIT) sin TLS ni autenticación"""
+    def responder(self, linea):
+        self.wfile.write((linea + "\r\n").encode("utf-8"))
+
+    def handle(self):
+        servidor = self.server
+        with servidor.candado:
+            servidor.conexiones += 1
+        self.responder("220 linkenchamba-prueba ESMTP")
+        remitente, destinatarios = None, []
+        for linea in self.rfile:
+            comando = linea.decode("utf-8", "replace").strip()
+            verbo = comando[:4].upper()
+            if verbo == "EHLO":
+                self.responder("250-linkenchamba-prueba")
+                self.responder("250 8BITMIME")
+            elif verbo == "HELO":
+                self.responder("250 linkenchamba-prueba")
+            elif verbo == "MAIL":
+                remitente, destinatarios = comando.split(":", 1)[1].strip(), []
+                self.responder("250 OK")
+            elif verbo == "RCPT":
+                destinatario = comando.split(":", 1)[1].strip().strip("<>")
+                if destinatario in servidor.rechazados:
+                    self.responder("550 Buzón no disponible")
+                elif destinatario in servidor.temporales:
+                    with servidor.candado:
+                        servidor.temporales.discard(destinatario)
+                    self.responder("451 Inténtalo más tarde")
+                else:
+                    destinatarios.append(destinatario)
+                    self.responder("250 OK")
+            elif verbo == "DATA":
+                self.responder("354 Termina con <CRLF>.<CRLF>")
+                lineas = []
+                for dato in self.rfile:
+                    if dato in (b".\r\n", b".\n"):
+                        break
+                    lineas.append(dato)
+                if servidor.demora:
+                    time.sleep(servidor.demora)
+                with servidor.candado:
+                    servidor.mensajes.append((remitente, destinatarios, b"".join(lineas)))
+                self.responder("250 OK")
+            elif verbo == "NOOP":
+                self.responder("250 OK")
+            elif verbo == "RSET":
+                remitente, destinatarios = None, []
+                self.responder("250 OK")
+            elif verbo == "QUIT":
+                self.responder("221 Adiós")
+                return
+            else:
+                self.responder("502 Comando no implementado")
+
+class ServidorSMTPPrueba(socketserver.ThreadingTCPServer):
+    """Servidor SMTP local que guarda los mensajes recibidos en memoria
+
+    `demora` simula un servidor lento (segundos por mensaje), `rechazados`
+    es un conjunto de direcciones que responden 550 y `temporales` las que
+    responden 451 la primera vez.
+    """
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, puerto=0, demora=0.0):
+        super().__init__(("127.0.0.1", puerto), _SesionSMTP)
+        self.candado = threading.Lock()
+        self.mensajes = []
+        self.conexiones = 0
+        self.demora = demora
+        self.rechazados = set()
+        self.temporales = set()
+
+    @property
+    def puerto(self):
+        return self.server_address[1]
+
+    def iniciar(self):
+        """Atiende en un hilo en segundo plano; devuelve el servidor"""
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def entorno(self):
+        """Variables de entorno para que ConfiguracionSMTP apunte a este servidor"""
+        return {"SMTP_SERVER": "127.0.0.1", "SMTP_PORT": str(self.puerto),
+                "SMTP_STARTTLS": "0", "SMTP_AUTENTICAR": "0"}
+
+def main():
+    """Deja el servidor de prueba escuchando para usarlo con la app"""
+    parser = argparse.ArgumentParser(description="Servidor SMTP de prueba de LinkenChamba")
+    parser.add_argument("--puerto", type=int, default=1025)
+    parser.add_argument("--demora", type=float, default=0.0, help="Segundos de espera por mensaje (servidor lento)")
+    args = parser.parse_args()
+
+    servidor = ServidorSMTPPrueba(args.puerto, demora=args.demora).iniciar()
+    print(f"Servidor SMTP de prueba en 127.0.0.1:{servidor.puerto}; usa "
+          + " ".join(f"{k}={v}" for k, v in servidor.entorno().items()))
+    try:
+        ultimo = 0
+        while True:
+            time.sleep(0.5)
+            with servidor.candado:
+                nuevos = servidor.mensajes[ultimo:]
+                ultimo = len(servidor.mensajes)
+            for remitente, destinatarios, _ in nuevos:
+                print(f"   {remitente} -> {', '.join(destinatarios)}")
+    except KeyboardInterrupt:
+        servidor.shutdown()
+
+if __name__ == "__main__":
+    main()
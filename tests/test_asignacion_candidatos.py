@@ -0,0 +1,76 @@
+"""
+La asignación por programación lineal contra la búsqueda exhaustiva en instancias pequeñas
+"""
+import itertools
+import numpy as np
+import pytest
+from asignacion_candidatos import asignar_vacantes, candidatos_necesarios, resumen_asignacion
+
+def instancia(semilla, candidatos, puestos):
+    """Puntuaciones al azar (con empates) y qué candidatos son elegibles para cada puesto"""
+    rng = np.random.default_rng(semilla)
+    valores = rng.integers(0, 6, size=(candidatos, len(puestos))) * 10.0
+    elegibles = rng.random((candidatos, len(puestos))) < 0.8
+    return {puesto: (np.flatnonzero(elegibles[:, j]), valores[elegibles[:, j], j]) for j, puesto in enumerate(puestos)}
+
+def mejores_de(todos, cantidad):
+    """Los `cantidad` mejores de cada puesto, de mayor a menor puntuación"""
+    mejores = {}
+    for puesto, (filas, puntuaciones) in todos.items():
+        orden = np.lexsort((filas, -puntuaciones))[:cantidad]
+        mejores[puesto] = (filas[orden], puntuaciones[orden])
+    return mejores
+
+def optimo_exhaustivo(todos, vacantes, candidatos):
+    """Mayor suma de puntuaciones probando todas las formas de repartir a cada candidato (o dejarlo fuera)"""
+    puntuacion = {(puesto, fila): valor for puesto, (filas, valores) in todos.items()
+                  for fila, valor in zip(filas.tolist(), valores.tolist())}
+    mejor = 0.0
+    for eleccion in itertools.product([None, *vacantes], repeat=candidatos):
+        if any(eleccion.count(puesto) > cantidad for puesto, cantidad in vacantes.items()):
+            continue
+        if all(puesto is None or (puesto, fila) in puntuacion for fila, puesto in enumerate(eleccion)):
+            mejor = max(mejor, sum(puntuacion[(puesto, fila)] for fila, puesto in enumerate(eleccion) if puesto))
+    return mejor
+
+def comprobar_valida(asignaciones, todos, vacantes):
+    filas = [fila for _, fila, _ in asignaciones]
+    assert len(filas) == len(set(filas))
+    for puesto, cantidad in vacantes.items():
+        assert sum(1 for p, _, _ in asignaciones if p == puesto) <= cantidad
+    for puesto, fila, valor in asignaciones:
+        elegibles = dict(zip(todos[puesto][0].tolist(), todos[puesto][1].tolist()))
+        assert elegibles[fila] == valor
+
+@pytest.mark.parametrize("semilla", range(8))
+@pytest.mark.parametrize("vacantes", [
+    {"A": 2, "B": 2},
+    {"A": 3, "B": 1, "C": 2},
+    {"A": 1, "B": 0, "C": 1},
+])
+def test_optima_frente_a_busqueda_exhaustiva(semilla, vacantes):
+    candidatos = 6
+    todos = instancia(semilla, candidatos, list(vacantes))
+    # Solo los candidatos_necesarios mejores de cada puesto, como en la aplicación
+    asignaciones = asignar_vacantes(mejores_de(todos, candidatos_necesarios(vacantes)), vacantes)
+    comprobar_valida(asignaciones, todos, vacantes)
+    assert resumen_asignacion(asignaciones, vacantes)["total"] == pytest.approx(
+        optimo_exhaustivo(todos, vacantes, candidatos))
+
+def test_mas_vacantes_que_candidatos():
+    vacantes = {"A": 5, "B": 4}
+    todos = {"A": (np.array([0, 1, 2]), np.array([90.0, 80.0, 10.0])),
+             "B": (np.array([1, 2]), np.array([85.0, 70.0]))}
+    asignaciones = asignar_vacantes(todos, vacantes)
+    comprobar_valida(asignaciones, todos, vacantes)
+    assert asignaciones == [("A", 0, 90.0), ("B", 1, 85.0), ("B", 2, 70.0)]
+    resumen = resumen_asignacion(asignaciones, vacantes)
+    assert resumen["cubiertas"] == 3 and resumen["sin_cubrir"] == {"A": 4, "B": 2}
+
+def test_sin_vacantes():
+    todos = {"A": (np.array([0, 1]), np.array([90.0, 80.0])), "B": (np.array([0, 1]), np.array([50.0, 95.0]))}
+    assert asignar_vacantes(todos, {"A": 0, "B": 0}) == []
+    assert asignar_vacantes(todos, {}) == []
+    assert asignar_vacantes(todos, {"A": 0, "B": 1}) == [("B", 1, 95.0)]
+    assert asignar_vacantes({"A": (np.array([], dtype=np.int64), np.array([]))}, {"A": 2}) == []
+    assert resumen_asignacion([], {"A": 0, "B": 1}) == {"total": 0, "cubiertas": 0, "sin_cubrir": {"B": 1}}
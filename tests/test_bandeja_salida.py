@@ -0,0 +1,64 @@
+"""
+Bandeja de salida contra un servidor SMTP local lento: encolado inmediato, reintentos y reclamo sin duplicados
+"""
+import collections
+import threading
+import time
+import pytest
+from bandeja_salida import BandejaSalida
+from correo import ConfiguracionSMTP, TransporteCorreo
+from servidor_smtp import ServidorSMTPPrueba
+
+@pytest.fixture
+def servidor():
+    servidor = ServidorSMTPPrueba(demora=0.1).iniciar()
+    yield servidor
+    servidor.shutdown()
+
+def transporte_de(servidor):
+    return TransporteCorreo(ConfiguracionSMTP(servidor.entorno()))
+
+def test_encolado_inmediato_reintento_y_fallido(servidor, tmp_path):
+    cantidad = 10
+    servidor.rechazados.add("rechazado@example.com")
+    servidor.temporales.add("temporal@example.com")
+    bandeja = BandejaSalida(str(tmp_path / "bandeja.sqlite"), transporte=transporte_de(servidor),
+                            por_minuto=600, espera_base=0.5).iniciar()
+    try:
+        destinatarios = [f"candidato{i}@example.com" for i in range(cantidad)]
+        destinatarios += ["temporal@example.com", "rechazado@example.com"]
+        tiempos, ids = [], []
+        for destinatario in destinatarios:
+            inicio = time.perf_counter()
+            ids.append(bandeja.encolar(destinatario, "Prueba", "Hola"))
+            tiempos.append(time.perf_counter() - inicio)
+        assert bandeja.esperar_vacia(cantidad * (servidor.demora + 0.2) + 10)
+    finally:
+        bandeja.detener()
+
+    # Encolar no espera al servidor SMTP
+    assert max(tiempos) < servidor.demora
+    resumen = bandeja.resumen()
+    assert resumen["enviado"] == cantidad + 1 and resumen["fallido"] == 1
+    estados = bandeja.estados(ids)
+    temporal, rechazado = estados[ids[-2]], estados[ids[-1]]
+    assert temporal["estado"] == "enviado" and temporal["intentos"] == 1
+    assert rechazado["estado"] == "fallido" and rechazado["intentos"] == 1
+    assert "550" in rechazado["ultimo_error"]
+
+def test_varios_trabajadores_no_envian_dos_veces(tmp_path):
+    servidor = ServidorSMTPPrueba().iniciar()
+    ruta = str(tmp_path / "bandeja.sqlite")
+    BandejaSalida(ruta).encolar_lote([(f"c{i}@example.com", "Prueba", "Hola") for i in range(200)])
+    # Cada trabajador con su propia bandeja (y conexión SQLite) sobre el mismo archivo
+    bandejas = [BandejaSalida(ruta, transporte=transporte_de(servidor), por_minuto=0) for _ in range(4)]
+    hilos = [threading.Thread(target=bandeja.procesar_pendientes) for bandeja in bandejas]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    servidor.shutdown()
+
+    entregas = collections.Counter(d for _, destinatarios, _ in servidor.mensajes for d in destinatarios)
+    assert len(entregas) == 200 and max(entregas.values()) == 1
+    assert bandejas[0].resumen()["enviado"] == 200
@@ -0,0 +1,154 @@
+"""
+El codificador precompilado de características debe coincidir bit a bit con la versión difusa
+La versión difusa (el codificador original) vive solo aquí, como referencia congelada
+"""
+import random
+import numpy as np
+import pytest
+import red_neuronal_puntuacion as rn
+from generar_base_datos import fake, generar_respuestas_aleatorias
+
+def base_generada(cantidad, semilla):
+    """Respuestas de una base pequeña generada con el mismo generador que generar_base_datos"""
+    random.seed(semilla)
+    fake.seed_instance(semilla)
+    return [generar_respuestas_aleatorias() for _ in range(cantidad)]
+
+def extraer_caracteristicas_difusa(respuestas):
+    """Codificador original con búsqueda de subcadenas, tal como era antes de precompilarlo"""
+    features = []
+
+    # Habilidades prácticas (10 características binarias)
+    habilidades_opciones = [
+        "Atender clientes", "Manejar caja", "Organizar archivos",
+        "Usar computadora", "Empacar productos", "Limpiar y mantener",
+        "Ayudar en preparación", "Tomar mensajes", "Resolver quejas",
+        "Ayudar a compañeros"
+    ]
+    for hab in habilidades_opciones:
+        hab_seleccionadas = respuestas.get("habilidades_practicas", [])
+        features.append(1 if any(hab.lower() in h.lower() for h in hab_seleccionadas) else 0)
+
+    # Herramientas (7 características binarias)
+    herramientas_opciones = [
+        "Computadora", "Teléfono", "Caja registradora",
+        "Herramientas básicas", "Equipo de cocina", "Vehículo",
+        "aprendo rápido"
+    ]
+    herramientas_seleccionadas = respuestas.get("herramientas", [])
+    for herr in herramientas_opciones:
+        features.append(1 if any(herr.lower() in h.lower() for h in herramientas_seleccionadas) else 0)
+
+    # Ambiente (5 características one-hot)
+    ambiente = respuestas.get("ambiente", "")
+    ambientes_opciones = [
+        "movimiento", "tranquilo", "interactuar", "concentrado", "adapto"
+    ]
+    for amb in ambientes_opciones:
+        features.append(1 if amb.lower() in ambiente.lower() else 0)
+
+    # Actividades (5 características binarias)
+    actividades_opciones = [
+        "Ayudar directamente", "Crear o arreglar", "Organizar",
+        "Aprender cosas nuevas", "Resolver problemas"
+    ]
+    actividades_seleccionadas = respuestas.get("actividades", [])
+    for act in actividades_opciones:
+        features.append(1 if any(act.lower() in a.lower() for a in actividades_seleccionadas) else 0)
+
+    # Conocimientos (6 características binarias)
+    conocimientos_opciones = [
+        "Matemáticas", "Lectura rápida", "Escritura clara",
+        "Conceptos básicos de ventas", "Conocimiento de productos", "aprendo viendo"
+    ]
+    conocimientos_seleccionados = respuestas.get("conocimientos", [])
+    for con in conocimientos_opciones:
+        features.append(1 if any(con.lower() in c.lower() for c in conocimientos_seleccionados) else 0)
+
+    # Niveles de conocimiento (4 características: 0=Nada, 1=Básico, 2=Intermedio, 3=Avanzado)
+    niveles = respuestas.get("niveles", {})
+    nivel_map = {"Nada": 0, "Básico": 1, "Intermedio": 2, "Avanzado": 3}
+    for tema in ["Productividad", "Organización", "Atención clientes", "Trabajo equipo"]:
+        nivel = niveles.get(tema, "Nada")
+        features.append(nivel_map.get(nivel, 0) / 3.0)  # Normalizar a 0-1
+
+    # Tipo de trabajo (1 característica)
+    tipo_trabajo = respuestas.get("tipo_trabajo", "")
+    if tipo_trabajo:
+        features.append(1 if "tiempo completo" in tipo_trabajo.lower() else 0.5)
+    else:
+        features.append(0.5)  # Valor por defecto
+
+    # Logros (5 características binarias)
+    logros_opciones = [
+        "Aprender un oficio", "Ingreso estable", "Ganar experiencia",
+        "Desarrollarme dentro", "Descubrir en qué soy bueno"
+    ]
+    logros_seleccionados = respuestas.get("logros", [])
+    for logro in logros_opciones:
+        features.append(1 if any(logro.lower() in l.lower() for l in logros_seleccionados) else 0)
+
+    # Reacción (5 características one-hot)
+    reaccion = respuestas.get("reaccion", "")
+    reacciones_opciones = [
+        "pregunto", "busco", "organizo", "actúo", "mantengo"
+    ]
+    for reac in reacciones_opciones:
+        features.append(1 if reac.lower() in reaccion.lower() else 0)
+
+    # Destaca (6 características binarias)
+    destaca_opciones = [
+        "ayudar a otros", "encontrar errores", "aprender algo nuevo",
+        "mantener el orden", "motivar al equipo", "necesito oportunidad"
+    ]
+    destaca_seleccionados = respuestas.get("destaca", [])
+    for dest in destaca_opciones:
+        features.append(1 if any(dest.lower() in d.lower() for d in destaca_seleccionados) else 0)
+
+    # Motivación (1 característica)
+    motivacion = respuestas.get("motivacion", "")
+    if motivacion:
+        if "todas" in motivacion.lower():
+            features.append(1.0)
+        elif "aprender" in motivacion.lower():
+            features.append(0.8)
+        elif "estabilidad" in motivacion.lower():
+            features.append(0.6)
+        else:
+            features.append(0.4)
+    else:
+        features.append(0.5)  # Valor por defecto
+
+    # Asegurar que tenemos exactamente 55 características (ajustar si es necesario)
+    # Si tenemos más, tomar las primeras 55; si menos, rellenar con 0
+    if len(features) > 55:
+        features = features[:55]
+    elif len(features) < 55:
+        features.extend([0.0] * (55 - len(features)))
+
+    return features
+
+def referencia(lista_respuestas):
+    return np.array([extraer_caracteristicas_difusa(r) for r in lista_respuestas], dtype=np.float64)
+
+@pytest.mark.parametrize("semilla", [0, 1, 2])
+def test_codificador_identico_en_base_generada(semilla):
+    lista_respuestas = base_generada(300, semilla)
+    X = rn.extraer_caracteristicas_lote(lista_respuestas)
+    esperado = referencia(lista_respuestas)
+    assert X.shape == (300, rn.NUM_CARACTERISTICAS)
+    for i in range(len(lista_respuestas)):
+        assert X[i].tobytes() == esperado[i].tobytes(), f"candidato {i}"
+
+def test_codificador_identico_con_respuestas_fuera_del_cuestionario():
+    # Texto libre, mayúsculas, campos ausentes y valores desconocidos usan la búsqueda de subcadenas
+    lista_respuestas = [
+        {},
+        {"habilidades_practicas": ["ATENDER CLIENTES y manejar caja"], "ambiente": "Me adapto a todo"},
+        {"herramientas": ["Uso computadora y teléfono"], "reaccion": "Pregunto y luego actúo"},
+        {"niveles": {"Productividad": "Experto", "Organización": "Intermedio"}, "tipo_trabajo": "Medio tiempo"},
+        {"motivacion": "Quiero aprender y tener estabilidad", "destaca": ["Motivar al equipo"]},
+        {"tipo_trabajo": "", "motivacion": ""},
+    ]
+    X = rn.extraer_caracteristicas_lote(lista_respuestas)
+    assert X.tobytes() == referencia(lista_respuestas).tobytes()
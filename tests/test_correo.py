@@ -0,0 +1,41 @@
+"""
+Transporte SMTP contra el servidor local de prueba: conexión reutilizada, reconexión y rechazos
+"""
+import socket
+import pytest
+from correo import ConfiguracionSMTP, TransporteCorreo
+from servidor_smtp import ServidorSMTPPrueba
+
+@pytest.fixture
+def servidor():
+    servidor = ServidorSMTPPrueba().iniciar()
+    yield servidor
+    servidor.shutdown()
+
+def test_lote_reutiliza_la_conexion(servidor):
+    cantidad = 50
+    servidor.rechazados.add("rechazado@example.com")
+    transporte = TransporteCorreo(ConfiguracionSMTP(servidor.entorno()))
+    correos = [(f"candidato{i}@example.com", f"Prueba {i}", "Hola") for i in range(cantidad)]
+    correos.append(("rechazado@example.com", "Prueba", "Hola"))
+    try:
+        resultados = transporte.enviar_lote(correos)
+    finally:
+        transporte.cerrar()
+
+    assert [destinatario for destinatario, error in resultados if error is not None] == ["rechazado@example.com"]
+    assert len(servidor.mensajes) == cantidad
+    assert servidor.conexiones == 1
+
+def test_reconecta_si_el_servidor_corta(servidor):
+    transporte = TransporteCorreo(ConfiguracionSMTP(servidor.entorno()))
+    try:
+        transporte.enviar("antes@example.com", "Prueba", "Hola")
+        # Simula que el servidor cortó la conexión: el siguiente envío debe reconectar
+        transporte._smtp.sock.shutdown(socket.SHUT_RDWR)
+        transporte.enviar("despues@example.com", "Tras reconexión", "Hola")
+    finally:
+        transporte.cerrar()
+
+    assert [destinatarios for _, destinatarios, _ in servidor.mensajes] == [["antes@example.com"], ["despues@example.com"]]
+    assert servidor.conexiones == 2
@@ -0,0 +1,40 @@
+"""
+Lectura en streaming de bases JSON y JSONL: mismos candidatos y metadatos que cargando el documento entero
+"""
+import json
+import pytest
+from formato_candidatos import escribir_base_datos, leer_base_datos
+
+METADATOS = {"version": "1.0", "total_candidatos": 3, "puestos_definicion": {"Ayudante General": {"peso": 1.5}}}
+CANDIDATOS = [
+    {"id": f"cand_{i}", "nombre": f"Candidato {i}", "puntuaciones": {"Ayudante General": i * 10.5},
+     "respuestas_cuestionario": {"p1": "Sí", "p2": ["a", "b"]}}
+    for i in range(3)
+]
+
+@pytest.mark.parametrize("nombre", ["base.json", "base.jsonl", "base.json.gz", "base.jsonl.xz"])
+def test_lectura_igual_que_escritura(tmp_path, nombre):
+    ruta = str(tmp_path / nombre)
+    escribir_base_datos(ruta, METADATOS, iter(CANDIDATOS))
+    metadatos, candidatos = leer_base_datos(ruta)
+    # Los metadatos que preceden a los candidatos se conocen antes de iterar
+    assert {k: v for k, v in metadatos.items() if k not in ("formato", "version_formato")} == METADATOS
+    assert list(candidatos) == CANDIDATOS
+
+def test_json_por_bloques_con_metadatos_al_final(tmp_path):
+    ruta = tmp_path / "base.json"
+    documento = {"version": "1.0", "candidatos": CANDIDATOS * 1000, "total_candidatos": 3000}
+    ruta.write_text(json.dumps(documento, ensure_ascii=False, indent=2), encoding="utf-8")
+    metadatos, candidatos = leer_base_datos(str(ruta))
+    assert metadatos == {"version": "1.0"}
+    assert list(candidatos) == documento["candidatos"]
+    assert metadatos == {"version": "1.0", "total_candidatos": 3000}
+
+def test_json_vacio_o_sin_candidatos(tmp_path):
+    ruta = tmp_path / "base.json"
+    ruta.write_text('{"version": "1.0", "candidatos": []}', encoding="utf-8")
+    metadatos, candidatos = leer_base_datos(str(ruta))
+    assert metadatos == {"version": "1.0"} and list(candidatos) == []
+    ruta.write_text('{"version": "1.0"}', encoding="utf-8")
+    with pytest.raises(ValueError):
+        leer_base_datos(str(ruta))
@@ -0,0 +1,89 @@
+"""
+El índice de bits de respuestas contra el recorrido directo de las características de cada candidato
+Filtro Y/O/NO con niveles mínimos y búsqueda de similares
+"""
+import random
+import numpy as np
+import pytest
+import red_neuronal_puntuacion as rn
+from almacen_candidatos import AlmacenCandidatos
+from generar_base_datos import fake, generar_candidatos
+from indice_respuestas import (
+    COLUMNAS_BINARIAS, NOMBRES_CARACTERISTICAS, FiltroRespuestas, IndiceRespuestas, similitud
+)
+from tabla_candidatos import TablaCandidatos
+
+@pytest.fixture(scope="module")
+def candidatos():
+    """Base pequeña con copias de algunos candidatos (empates de distancia) y respuestas de texto libre"""
+    random.seed(1)
+    fake.seed_instance(1)
+    candidatos = generar_candidatos(120)
+    copias = [{**candidatos[i], "id": f"copia_{i}_{n}"} for i in (3, 40, 40, 77) for n in range(2)]
+    libre = {**candidatos[5], "id": "libre",
+             "respuestas_cuestionario": {**candidatos[5]["respuestas_cuestionario"], "ambiente": "Me gusta el movimiento"}}
+    return candidatos + copias + [libre]
+
+@pytest.fixture(scope="module")
+def caracteristicas(candidatos):
+    return rn.extraer_caracteristicas_lote(c["respuestas_cuestionario"] for c in candidatos)
+
+def cumple_directo(filtro, x):
+    """El filtro evaluado directamente sobre el vector de 55 características, sin bits"""
+    marcada = {nombre: x[columna] > 0 for nombre, columna in zip(NOMBRES_CARACTERISTICAS, COLUMNAS_BINARIAS)}
+    return (all(marcada[n] for n in filtro.todas)
+            and (not filtro.alguna or any(marcada[n] for n in filtro.alguna))
+            and not any(marcada[n] for n in filtro.ninguna)
+            and all(round(x[rn.COLUMNA_NIVELES + rn.TEMAS_NIVELES.index(tema)] * 3) >= minimo
+                    for tema, minimo in filtro.niveles_minimos.items()))
+
+FILTROS = [
+    FiltroRespuestas(),
+    FiltroRespuestas(todas=["Herramientas: Computadora", "Herramientas: Teléfono"]),
+    FiltroRespuestas(alguna=["Habilidades: Manejar caja", "Conocimientos: Matemáticas"],
+                     ninguna=["Herramientas: Vehículo"]),
+    FiltroRespuestas(todas=["Habilidades: Atender clientes"], niveles_minimos={"Atención clientes": 2, "Productividad": 1}),
+    FiltroRespuestas(ninguna=["Habilidades: Atender clientes", "Habilidades: Atender clientes"],
+                     niveles_minimos={"Trabajo equipo": 3}),
+]
+
+@pytest.mark.parametrize("filtro", FILTROS, ids=lambda filtro: filtro.describir())
+def test_filtro_igual_que_recorrido_directo(candidatos, caracteristicas, filtro):
+    esperada = np.array([cumple_directo(filtro, x) for x in caracteristicas])
+    assert esperada.any()
+    # Desde las columnas de la tabla y desde el codificador completo
+    assert (IndiceRespuestas.desde_tabla(TablaCandidatos(candidatos)).seleccionar(filtro) == esperada).all()
+    assert (IndiceRespuestas(candidatos).seleccionar(filtro) == esperada).all()
+
+    puesto, minimo = "Atención a Clientes/Ventas", 40
+    total, encontrados = AlmacenCandidatos({"candidatos": candidatos}).buscar(puesto, minimo, 10, filtro)
+    directos = sorted((-c["puntuaciones"][puesto], fila) for fila, c in enumerate(candidatos)
+                      if esperada[fila] and c["puntuaciones"][puesto] >= minimo)
+    assert total == len(directos)
+    assert [c["id"] for c, _ in encontrados] == [candidatos[fila]["id"] for _, fila in directos[:10]]
+
+@pytest.mark.parametrize("fila", [0, 3, 40, 128])
+def test_vecinos_igual_que_distancia_directa(candidatos, caracteristicas, fila):
+    k = 8
+    indice = IndiceRespuestas.desde_tabla(TablaCandidatos(candidatos))
+    filas, distancias = indice.vecinos(candidatos[fila]["respuestas_cuestionario"], k)
+
+    directa = np.sqrt(((caracteristicas - caracteristicas[fila]) ** 2).sum(axis=1))
+    # A igual distancia gana la fila menor
+    esperadas = np.lexsort((np.arange(len(directa)), np.round(directa, 9)))[:k]
+    assert filas.tolist() == esperadas.tolist()
+    assert np.allclose(distancias, directa[esperadas])
+
+def test_similares_excluye_al_propio_candidato(candidatos, caracteristicas):
+    k = 5
+    almacen = AlmacenCandidatos({"candidatos": candidatos})
+    consulta = candidatos[40]
+    similares = almacen.similares(consulta, k)
+
+    directa = np.sqrt(((caracteristicas - caracteristicas[40]) ** 2).sum(axis=1))
+    orden = [fila for fila in np.lexsort((np.arange(len(directa)), np.round(directa, 9))).tolist() if fila != 40][:k]
+    assert [c["id"] for c, _ in similares] == [candidatos[fila]["id"] for fila in orden]
+    # Sus dos copias empatan a distancia cero con la consulta
+    assert [c["id"] for c, _ in similares[:2]] == ["copia_40_0", "copia_40_1"]
+    assert [s for _, s in similares[:2]] == [100, 100]
+    assert np.allclose([s for _, s in similares], similitud(directa[orden]))
@@ -0,0 +1,25 @@
+"""
+La puntuación por lotes coincide con calcular_puntuacion_puesto, candidato por candidato
+"""
+import random
+import pytest
+import red_neuronal_puntuacion as rn
+from generar_base_datos import fake, generar_respuestas_aleatorias
+
+@pytest.fixture(scope="module")
+def lista_respuestas():
+    random.seed(3)
+    fake.seed_instance(3)
+    lista = [generar_respuestas_aleatorias() for _ in range(200)]
+    # Texto libre, selecciones repetidas y respuestas vacías
+    lista[0]["habilidades_practicas"] = ["Sé atender clientes y manejar caja", "Atender clientes en mostrador o por teléfono"]
+    lista[1]["ambiente"] = "Me gusta el movimiento"
+    lista[2]["habilidades_practicas"] = lista[2]["habilidades_practicas"] * 2
+    lista[3]["habilidades_practicas"] = []
+    return lista + [{}]
+
+def test_lote_igual_que_uno_a_uno(lista_respuestas):
+    lote = rn.calcular_puntuaciones_lote(lista_respuestas, usar_cache=False)
+    for respuestas, puntuaciones in zip(lista_respuestas, lote):
+        assert puntuaciones == pytest.approx({puesto: rn.calcular_puntuacion_puesto(respuestas, puesto)
+                                              for puesto in rn.PUESTOS}, abs=1e-9)
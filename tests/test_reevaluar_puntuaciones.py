@@ -0,0 +1,39 @@
+"""
+Importación en streaming: los registros inválidos se saltan y se cuentan sin detener el resto
+"""
+import random
+from generar_base_datos import fake, generar_respuestas_aleatorias
+from red_neuronal_puntuacion import PUESTOS
+from reevaluar_puntuaciones import reevaluar_flujo
+
+def candidato(numero, **respuestas):
+    """Candidato válido con respuestas generadas, cambiando los campos dados"""
+    return {"id": f"cand_{numero}", "nombre": f"Candidato {numero}",
+            "respuestas_cuestionario": {**generar_respuestas_aleatorias(), **respuestas}}
+
+def test_flujo_salta_y_cuenta_los_invalidos():
+    random.seed(0)
+    fake.seed_instance(0)
+    sin_id = candidato(2)
+    del sin_id["id"]
+    registros = [
+        candidato(0),
+        {**candidato(1), "puntuaciones": None},
+        sin_id,
+        {**candidato(3), "puntuaciones": {"Ayudante General": "alto"}},
+        candidato(4, ambiente=None),
+        candidato(5, habilidades_practicas=5),
+        candidato(6, niveles="x"),
+        candidato(7, destaca=["Cuando hay que motivar al equipo", 3]),
+        {"nombre": "Sin respuestas"},
+        ["no", "es", "un", "objeto"],
+        candidato(8),
+    ]
+    informe = {}
+    validos = list(reevaluar_flujo({}, iter(registros), tam_lote=2, informe=informe))
+
+    assert informe["validos"] == 4 and informe["invalidos"] == 7
+    assert [numero for numero, _ in informe["errores"]] == [4, 5, 6, 7, 8, 9, 10]
+    assert [c["nombre"] for c in validos] == ["Candidato 0", "Candidato 1", "Candidato 2", "Candidato 8"]
+    for c in validos:
+        assert c["id"] and set(c["puntuaciones"]) == set(PUESTOS)
@@ -0,0 +1,57 @@
+"""
+La tabla compacta reconstruye cada candidato igual que el diccionario original
+Las selecciones múltiples salen en el orden de las opciones del cuestionario
+"""
+import pickle
+import random
+import pytest
+from generar_base_datos import fake, generar_candidatos
+from tabla_candidatos import CAMPOS_MULTIPLES, TablaCandidatos, codificar_respuestas
+
+def normalizar_candidato(candidato):
+    """Copia con las selecciones múltiples en el orden de las opciones (el de la tabla)"""
+    respuestas = candidato.get("respuestas_cuestionario")
+    if codificar_respuestas(respuestas) is None:
+        return candidato
+    ordenadas = {campo: [o for o in CAMPOS_MULTIPLES[campo] if o in respuestas[campo]] if campo in CAMPOS_MULTIPLES
+                 else valor for campo, valor in respuestas.items()}
+    return {**candidato, "respuestas_cuestionario": ordenadas}
+
+@pytest.fixture(scope="module")
+def candidatos():
+    random.seed(0)
+    fake.seed_instance(0)
+    return generar_candidatos(300)
+
+def test_ida_y_vuelta(candidatos):
+    tabla = TablaCandidatos(candidatos)
+    assert len(tabla) == len(candidatos)
+    assert tabla.filas_excepcionales() == 0
+    assert tabla.obtener(range(len(tabla))) == [normalizar_candidato(c) for c in candidatos]
+    assert list(pickle.loads(pickle.dumps(tabla))) == [normalizar_candidato(c) for c in candidatos]
+
+def test_selecciones_reordenadas(candidatos):
+    original = candidatos[0]
+    respuestas = dict(original["respuestas_cuestionario"])
+    respuestas["herramientas"] = list(reversed(CAMPOS_MULTIPLES["herramientas"][:3]))
+    tabla = TablaCandidatos([{**original, "respuestas_cuestionario": respuestas}])
+    assert tabla.filas_excepcionales() == 0
+    assert tabla.respuestas(0)["herramientas"] == CAMPOS_MULTIPLES["herramientas"][:3]
+    assert list(tabla.respuestas(0)) == list(respuestas)
+
+def test_lo_no_representable_se_guarda_tal_cual(candidatos):
+    original = candidatos[1]
+    respuestas = dict(original["respuestas_cuestionario"])
+    respuestas["ambiente"] = "Texto libre que no es una opción"
+    especiales = [
+        {**original, "respuestas_cuestionario": respuestas},
+        {**original, "puntuaciones": {puesto: 50.125 for puesto in original["puntuaciones"]}},
+        {**original, "datos_cifrados": "sobre", "clave_id": "k1", "telefono": None},
+        {**original, "respuestas_cuestionario": {**original["respuestas_cuestionario"],
+                                                 "herramientas": ["Vehículo para entregas"] * 2}},
+        {"nombre": "Solo nombre"},
+    ]
+    tabla = TablaCandidatos(candidatos[:2] + especiales)
+    assert tabla.filas_excepcionales() == 4
+    assert tabla.obtener(range(2, len(tabla))) == [normalizar_candidato(c) for c in especiales]
+    assert tabla.valores_puntuaciones()[3].tolist() == [50.125] * len(tabla.puestos)